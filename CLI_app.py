@@ -1,15 +1,29 @@
 """
 Smart Librarian - Command Line Interface (CLI) entrypoint.
 
-This script imports and runs the `run_cli()` function from `chatbot.interface`,
+Without arguments, this script runs the `run_cli()` function from `chatbot.interface`,
 which provides an interactive text-based conversation loop in the terminal.
 Use this file when you want to interact with Smart Librarian via CLI
 instead of the Streamlit web UI.
+
+With a command, it drives the warm daemon (`chatbot.daemon`), for scripts that ask
+many questions:
+
+    python CLI_app.py daemon            # keep one warm process on a Unix socket
+    python CLI_app.py ask "Vreau o carte despre prietenie"
+    python CLI_app.py status | stop
 """
 
-from chatbot.interface import run_cli
+import sys
 
 
 if __name__ == "__main__":
 
+    if len(sys.argv) > 1:
+        from chatbot.daemon import main
+
+        sys.exit(main())
+
+    from chatbot.interface import run_cli
+
     run_cli()
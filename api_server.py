@@ -0,0 +1,31 @@
+"""
+Smart Librarian - HTTP API entrypoint.
+
+Serves the ASGI app from `chatbot.api` with uvicorn. Each worker process keeps
+its own warm OpenAI client and indexes; scale out by raising `--workers` (or
+`WEB_CONCURRENCY`) or by running more instances behind a load balancer.
+
+Usage:
+    python api_server.py [--host 0.0.0.0] [--port 8000] [--workers 4]
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Librarian HTTP API")
+    parser.add_argument("--host", default=os.getenv("SMART_LIBRARIAN_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SMART_LIBRARIAN_API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    uvicorn.run("chatbot.api:app", host=args.host, port=args.port, workers=args.workers,
+                log_level=args.log_level, access_log=False)
+
+
+if __name__ == "__main__":
+    main()
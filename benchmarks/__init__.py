@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for Smart Librarian.
+
+Every benchmark runs without network access: OpenAI calls are replaced by the
+stubs in `benchmarks.fakes`. Run them from the project root, e.g.:
+
+    python -m benchmarks.bench_agent_fast_path
+"""
@@ -0,0 +1,96 @@
+"""
+Compare the classic three-call `run_agent` flow with the single-call `recommend` fast path.
+
+Both flows run against stubbed OpenAI/retrieval clients with a fixed simulated
+network latency, so the numbers reflect the number of round-trips, not the API.
+
+Usage:
+    python -m benchmarks.bench_agent_fast_path [--queries 50] [--latency 0.05]
+"""
+
+import argparse
+import statistics
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from chatbot import agent
+from chatbot.openai_clients import get_request_layer, set_client
+from benchmarks.fakes import FakeOpenAI, FakeSearch
+
+
+TITLES = ["1984", "Animal Farm"]
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _run(fn, queries, fake_client, warm_cache=False):
+    if not warm_cache:
+        agent.answer_cache.clear()
+    latencies = []
+    fake_client.calls = 0
+    with redirect_stdout(StringIO()):
+        for q in queries:
+            t0 = time.perf_counter()
+            fn(q)
+            latencies.append(time.perf_counter() - t0)
+    return latencies, fake_client.calls
+
+
+def _report(label, lat, calls, n_queries):
+    print(
+        f"  {label:<22} p50={_percentile(lat, 0.5) * 1000:7.1f} ms  "
+        f"p95={_percentile(lat, 0.95) * 1000:7.1f} ms  "
+        f"mean={statistics.mean(lat) * 1000:7.1f} ms  "
+        f"chat calls/query={calls / n_queries:.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per network call")
+    args = parser.parse_args()
+
+    queries = [f"Vreau o carte despre libertate #{i}" for i in range(args.queries)]
+    fake_client = FakeOpenAI(latency=args.latency)
+    set_client(fake_client)
+    get_request_layer().configure_rate_limits(None)
+    # The queries differ only by a number: measure the pipeline, not semantic cache hits
+    agent.SEMANTIC_CACHE_ENABLED = False
+
+    scenarios = {
+        # top hit is ambiguous -> fast path still needs one selector call
+        "ambiguous": [0.90, 0.92],
+        # top hit clearly ahead -> fast path needs no chat completion
+        "confident": [0.40, 0.80],
+    }
+
+    for name, distances in scenarios.items():
+        agent.search_books = FakeSearch(TITLES, distances, latency=args.latency)
+        print(f"\n[{name}] distances={distances}")
+        for label, fn in (("three-call run_agent", agent.run_agent), ("fast recommend", agent.recommend)):
+            lat, calls = _run(fn, queries, fake_client)
+            _report(label, lat, calls, len(queries))
+
+        lat, calls = _run(agent.recommend, queries, fake_client, warm_cache=True)
+        _report("answer cache (repeat)", lat, calls, len(queries))
+
+        for label, fast in (("stream_agent", False), ("stream_agent fast", True)):
+            agent.answer_cache.clear()
+            ttfb, total = [], []
+            for q in queries:
+                done = [e for e in agent.stream_agent(q, fast=fast) if e["type"] == "done"][0]
+                ttfb.append(done["ttfb"])
+                total.append(done["total"])
+            print(
+                f"  {label:<22} ttfb p50={_percentile(ttfb, 0.5) * 1000:7.1f} ms  "
+                f"total p50={_percentile(total, 0.5) * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
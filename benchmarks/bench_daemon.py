@@ -0,0 +1,135 @@
+"""
+Per-invocation latency of `python CLI_app.py ask`: cold (a new process does everything) vs. warm daemon.
+
+Starts the mock OpenAI server (`benchmarks/mock_openai_server.py`) in a subprocess
+and runs every command in a temporary working directory holding a copy of `data/`
+and the Chroma store, so nothing touches the repository. Three paths answer the
+same number of distinct queries (so no answer cache is hit):
+
+- cold:   `CLI_app.py ask --no-daemon` -- imports, clients, Chroma, BM25, summary
+          store and profanity matcher are loaded by every invocation;
+- warm:   `CLI_app.py ask` with `CLI_app.py daemon` running -- each invocation is a
+          fresh interpreter importing only `chatbot.daemon` and talking to the socket;
+- socket: `chatbot.daemon.ask` from this process -- the daemon's share alone,
+          without the client interpreter start-up.
+
+The daemon's own start-up (warm-up) is reported once; it is paid back after about
+start-up / (cold - warm) invocations.
+
+Usage:
+    python -m benchmarks.bench_daemon [--runs 10] [--latency 0.02]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_openai_server import MockOpenAIServer
+from chatbot.daemon import ask, is_running
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _workdir() -> str:
+    workdir = tempfile.mkdtemp(prefix="bench_daemon_")
+    shutil.copytree(os.path.join(ROOT, "data"), os.path.join(workdir, "data"))
+    shutil.copytree(os.path.join(ROOT, "db", "chroma_db"), os.path.join(workdir, "db", "chroma_db"))
+    return workdir
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(0.95 * (len(samples) - 1))] * 1000
+
+
+def _time_cli(args, workdir: str, env: dict, queries) -> list:
+    latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, os.path.join(ROOT, "CLI_app.py"), "ask", *args, query],
+                              cwd=workdir, env=env, capture_output=True, text=True)
+        latencies.append(time.perf_counter() - t0)
+        if proc.returncode != 0:
+            raise RuntimeError(f"CLI_app.py ask failed: {proc.stderr.strip()}")
+    return latencies
+
+
+def _start_daemon(workdir: str, env: dict, socket_path: str):
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "CLI_app.py"), "daemon", "--no-speech"],
+                            cwd=workdir, env=env)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Daemon exited during start-up")
+        if is_running(socket_path):
+            return proc, time.perf_counter() - t0
+        time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError(f"Daemon did not start on {socket_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10, help="Invocations per path")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock API latency per call (s)")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding size (must match the Chroma store)")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=0, latency=args.latency, dim=args.dim)
+    server_proc = server.start_in_subprocess()
+    workdir = _workdir()
+    socket_path = os.path.join(workdir, "librarian.sock")
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "mock"),
+        OPENAI_BASE_URL=server.base_url,
+        # The mock server has no quota; measure start-up, not the client-side throttling
+        OPENAI_RATE_LIMITS="off",
+        # The queries differ only by a number; measure the pipeline, not semantic cache hits
+        SMART_LIBRARIAN_SEMANTIC_CACHE="0",
+        # Offline, Chroma's telemetry thread retries its upload at exit and would inflate the cold path
+        ANONYMIZED_TELEMETRY="False",
+        SMART_LIBRARIAN_SOCKET=socket_path,
+        PYTHONPATH=ROOT,
+    )
+    queries = [f"Vreau o carte despre tema {i}" for i in range(3 * args.runs)]
+    daemon = None
+    try:
+        print(f"{args.runs} invocations per path, mock OpenAI latency {args.latency * 1000:.0f} ms, "
+              f"{os.cpu_count()} CPU(s)\n")
+        cold = _time_cli(["--no-daemon"], workdir, env, queries[:args.runs])
+
+        daemon, startup = _start_daemon(workdir, env, socket_path)
+        warm = _time_cli(["--require-daemon"], workdir, env, queries[args.runs:2 * args.runs])
+
+        direct = []
+        for query in queries[2 * args.runs:]:
+            t0 = time.perf_counter()
+            events = list(ask(query, path=socket_path, fallback=False))
+            direct.append(time.perf_counter() - t0)
+            assert events and events[-1]["type"] == "done", events[-1:]
+
+        print(f"{'path':<8} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, samples in (("cold", cold), ("warm", warm), ("socket", direct)):
+            p50, p95 = _percentiles(samples)
+            print(f"{name:<8} {p50:8.0f} {p95:8.0f}")
+
+        saved = _percentiles(cold)[0] - _percentiles(warm)[0]
+        print(f"\ndaemon start-up {startup * 1000:.0f} ms; saves {saved:.0f} ms per invocation "
+              f"(paid back after {startup * 1000 / max(saved, 1e-9):.1f} invocations)")
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+        server_proc.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Theme-filtered retrieval: cost of a theme-constrained query vs. a full scan as the catalogue grows.
+
+Synthetic catalogues of random unit vectors get 3 themes per book, drawn from a
+vocabulary that grows with the catalogue (`--books-per-theme`, as a real
+catalogue gains genres and subjects when it grows). For each size the benchmark
+reports the facet index build time, the cost of turning a filter into candidate
+rows (`FacetIndex.rows`, bitset AND + unpack), and the query latency of the NumPy
+backend scanning all rows vs. only the candidate rows of one or two themes.
+Catalogues up to `--chroma-max` books are also loaded into Chroma to compare an
+unfiltered query with a `where` pushdown of the same filter.
+
+Usage:
+    python -m benchmarks.bench_facets [--sizes 10000 100000 500000] [--dim 128]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from chatbot.facets import theme_flags, to_where
+from chatbot.vector_index import NumpyVectorIndex
+
+
+def _synthetic_catalogue(n: int, dim: int, n_themes: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    themes = [f"theme{t}" for t in range(n_themes)]
+    metadatas = [{"title": f"Book {i}", "language": "en", **theme_flags(pick.sample(themes, 3))} for i in range(n)]
+    ids = [f"book_{i}" for i in range(n)]
+    return ids, vectors, metadatas, themes
+
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def _chroma_latencies(ids, vectors, metadatas, queries, filters, repeat: int):
+    import chromadb
+
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        collection = client.get_or_create_collection(name="bench_facets")
+        batch = client.get_max_batch_size()
+        for start in range(0, len(ids), batch):
+            end = start + batch
+            collection.add(ids=ids[start:end], embeddings=vectors[start:end], metadatas=metadatas[start:end])
+        where = to_where(filters)
+        full = _median_ms(lambda: collection.query(query_embeddings=queries[:1], n_results=5), repeat)
+        filtered = _median_ms(lambda: collection.query(query_embeddings=queries[:1], n_results=5, where=where), repeat)
+        del collection, client
+    return full, filtered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--books-per-theme", type=int, default=1000,
+                        help="Catalogue size per theme of the vocabulary (at least 20 themes)")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--chroma-max", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'books':>8} {'themes':>6} {'build ms':>9} {'rows ms':>8} {'1 theme':>8} {'2 themes':>9} "
+          f"{'full ms':>8} {'1 theme ms':>11} {'2 themes ms':>12} {'chroma ms':>10} {'where ms':>9}")
+    for size in args.sizes:
+        n_themes = max(20, size // args.books_per_theme)
+        ids, vectors, metadatas, themes = _synthetic_catalogue(size, args.dim, n_themes)
+        index = NumpyVectorIndex(vectors, ids, [""] * size, metadatas)
+        queries = np.random.default_rng(1).standard_normal((1, args.dim), dtype=np.float32)
+
+        t0 = time.perf_counter()
+        facets = index.facet_index()
+        build = (time.perf_counter() - t0) * 1000
+
+        one = {"themes": [themes[0]]}
+        two = {"themes": themes[:2]}
+
+        def _cold_rows():
+            facets._rows_cache.clear()  # measure the bitset work, not the cache
+            return facets.rows(one)
+
+        rows_ms = _median_ms(_cold_rows, args.repeat)
+        rows_one, rows_two = facets.rows(one), facets.rows(two)
+
+        full = _median_ms(lambda: index.query(queries, n_results=5), args.repeat)
+        filtered_one = _median_ms(lambda: index.query(queries, n_results=5, candidate_rows=facets.rows(one)),
+                                  args.repeat)
+        filtered_two = _median_ms(lambda: index.query(queries, n_results=5, candidate_rows=facets.rows(two)),
+                                  args.repeat)
+
+        # A filtered scan must return exactly the best books among the candidates
+        top = index.query(queries, n_results=5, candidate_rows=rows_one)["ids"][0]
+        assert all(metadatas[int(i.split("_")[1])].get("theme_" + themes[0]) for i in top)
+
+        chroma = ("", "")
+        if size <= args.chroma_max:
+            chroma = tuple(f"{ms:.2f}" for ms in _chroma_latencies(ids, vectors, metadatas, queries, one,
+                                                                    max(5, args.repeat // 3)))
+        print(f"{size:>8} {n_themes:>6} {build:9.1f} {rows_ms:8.3f} {len(rows_one):>8} {len(rows_two):>9} "
+              f"{full:8.2f} {filtered_one:11.2f} {filtered_two:12.2f} {chroma[0]:>10} {chroma[1]:>9}")
+
+
+if __name__ == "__main__":
+    main()
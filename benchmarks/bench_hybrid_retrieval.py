@@ -0,0 +1,106 @@
+"""
+Hybrid (BM25 + vector) retrieval: embedding requests avoided and per-query latency.
+
+The real catalogue (`data/book_summaries.txt`) is padded with synthetic books, served
+by the NumPy backend with `FakeEmbeddingFunction` vectors; each embedding request
+sleeps `--latency` seconds to stand in for the network round-trip.
+
+Usage:
+    python -m benchmarks.bench_hybrid_retrieval [--books 10000] [--latency 0.05]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from chatbot import retriever
+from chatbot.bm25 import BM25Index
+from chatbot.embedding_cache import EmbeddingCache
+from chatbot.ingestion import book_id, iter_book_summaries
+from chatbot.vector_index import NumpyVectorIndex
+from benchmarks.fakes import FakeEmbeddingFunction
+
+
+THEMATIC = [
+    "Vreau o carte despre prietenie si magie.",
+    "Ce recomanzi pentru cineva care iubeste povestile de razboi?",
+    "O carte despre libertate si control social",
+    "Something about justice and prejudice",
+]
+
+
+def _catalogue(books: int, seed: int = 0):
+    records = list(iter_book_summaries(retriever.BOOK_SUMMARIES_PATH))
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    for i in range(max(0, books - len(records))):
+        title = f"Volume {i} " + " ".join(rng.sample(vocabulary, 2))
+        summary = " ".join(rng.choices(vocabulary, k=40))
+        records.append((book_id(title), summary, {"title": title}))
+    return records
+
+
+def _time(queries, runs=1):
+    latencies = []
+    for _ in range(runs):
+        for q in queries:
+            retriever.embedding_cache.clear()
+            t0 = time.perf_counter()
+            retriever.search_books(q)
+            latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per embedding request")
+    args = parser.parse_args()
+
+    records = _catalogue(args.books)
+    ids = [r[0] for r in records]
+    documents = [r[1] for r in records]
+    metadatas = [r[2] for r in records]
+
+    t0 = time.perf_counter()
+    bm25 = BM25Index(ids, documents, metadatas)
+    build_ms = (time.perf_counter() - t0) * 1000
+    postings_bytes = sum(a.itemsize * len(a) for a in (bm25.offsets, bm25.doc_ids, bm25.term_freqs,
+                                                       bm25.idf, bm25.doc_lengths))
+    print(f"BM25 index: {bm25.count()} books, {len(bm25.vocabulary)} terms, "
+          f"{len(bm25.doc_ids)} postings ({postings_bytes / 1e6:.1f} MB of arrays), built in {build_ms:.0f} ms")
+
+    embed = FakeEmbeddingFunction(dim=args.dim, latency=0.0)
+    vectors = [v for i in range(0, len(documents), 1000) for v in embed(documents[i:i + 1000])]
+    retriever._numpy_index = NumpyVectorIndex.build(tempfile.mkdtemp(prefix="bench_hybrid_"),
+                                                    ids, vectors, documents, metadatas)
+    retriever._bm25_index = bm25
+    retriever.RETRIEVER_BACKEND = "numpy"
+    retriever.embedding_cache = EmbeddingCache(path=None)
+    embed.latency = args.latency
+    retriever.set_embedding_function(embed)
+
+    real_titles = [m["title"] for m in metadatas[:10]]
+    title_queries = [f"Ce este {t}?" for t in real_titles] + [f"Vreau sa citesc {t.lower()}" for t in real_titles]
+
+    for label, queries in (("title queries", title_queries), ("thematic queries", THEMATIC)):
+        for hybrid in (False, True):
+            retriever.RETRIEVER_HYBRID = hybrid
+            embed.calls = 0
+            latencies = _time(queries)
+            calls = embed.calls / len(queries)
+            top1 = ""
+            if label == "title queries":
+                hits = sum(retriever.search_books(q, n_results=1)["metadatas"][0][0]["title"] == t
+                           for q, t in zip(title_queries, real_titles * 2))
+                top1 = f"  top-1 title={hits}/{len(title_queries)}"
+            mode = "hybrid     " if hybrid else "vector only"
+            print(f"  {label:<17}{mode}  p50={statistics.median(latencies):7.2f} ms  "
+                  f"max={max(latencies):7.2f} ms  embedding calls/query={calls:.2f}{top1}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Microbenchmark: precompiled trie-regex `is_clean` versus better_profanity.
+
+Inputs are synthetic Romanian/English texts of increasing length built from a
+fixed vocabulary (clean by construction), plus the same texts with one listed
+word inserted at the end (worst case for a scanning matcher). Both filters must
+first agree on `PARITY_CASES` (masked and leetspeak spellings, clean look-alikes),
+so the speedup is measured on equivalent behavior.
+
+Usage:
+    python -m benchmarks.bench_language_filter [--lengths 100 1000 10000] [--repeat 20]
+"""
+
+import argparse
+import random
+import time
+
+from better_profanity import profanity
+
+from tools.language_filter import is_clean, is_clean_many
+
+
+VOCABULARY = (
+    "vreau o carte despre prietenie si magie ce recomanzi pentru povesti de razboi "
+    "libertate adevar calatorie spiritualitate animale familie dragoste curaj "
+    "book about friendship war love courage journey truth freedom"
+).split()
+
+
+# Masked/substituted spellings both filters must flag, and clean texts neither may flag
+PARITY_CASES = [
+    ("f*ck", False), ("b*tch", False), ("f*cking", False), ("d*ck", False), ("p*ssy", False),
+    ("sh*t", False), ("f**k", False), ("fvck", False), ("sh1t", False), ("a$$", False),
+    ("(f*ck) asta", False), ("@ss", False), ("@sshole", False), ("you @ss", False), ("@$$", False),
+    ("*ss", False), ("shit*", False), ("Vreau o carte despre prietenie", True), ("Ce este 1984?", True),
+    ("scrie-mi la adresa @ acasa", True), ("*important* carte", True), ("wow!", True), ("@home", True),
+]
+
+
+def _texts(length: int, count: int, seed: int = 0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        words, size = [], 0
+        while size < length:
+            word = rng.choice(VOCABULARY)
+            words.append(word)
+            size += len(word) + 1
+        out.append(" ".join(words))
+    return out
+
+
+def _time(fn, texts, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - t0) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--count", type=int, default=20, help="Texts per length")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    profanity.load_censor_words()
+    print(f"better_profanity wordlist load: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    for text, clean in PARITY_CASES:
+        assert is_clean(text) == clean, f"is_clean({text!r}) != {clean}"
+        assert profanity.contains_profanity(text) != clean, f"better_profanity differs on {text!r}"
+    print(f"parity: {len(PARITY_CASES)} masked/clean cases agree")
+
+    print(f"{'chars':>7} {'case':>7} {'better_profanity':>17} {'is_clean':>10} {'is_clean_many':>14} {'speedup':>8}")
+    for length in args.lengths:
+        clean = _texts(length, args.count, seed=length)
+        dirty = [t + " shit" for t in clean]
+        for label, texts in (("clean", clean), ("dirty", dirty)):
+            baseline = _time(profanity.contains_profanity, texts, args.repeat)
+            ours = _time(is_clean, texts, args.repeat)
+
+            t_batch = time.perf_counter()
+            for _ in range(args.repeat):
+                is_clean_many(texts)
+            batch = (time.perf_counter() - t_batch) / (args.repeat * len(texts))
+
+            agree = all(is_clean(t) == (not profanity.contains_profanity(t)) for t in texts)
+            print(
+                f"{length:>7} {label:>7} {baseline * 1e3:>14.3f} ms {ours * 1e3:>7.3f} ms "
+                f"{batch * 1e3:>11.3f} ms {baseline / ours:>7.0f}x" + ("" if agree else "  (verdicts differ)")
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Conversation memory cost against chat length: per-turn time and session size stay flat.
+
+Feeds `--turns` synthetic exchanges (full-length replies) into one
+`ConversationMemory` and, at each checkpoint, reports the pickled size of the
+memory, the mean cost of `add_turn` and of `contextualize` for a follow-up query,
+next to the size an unbounded message list (the former Streamlit history) reaches.
+
+Usage:
+    python -m benchmarks.bench_memory [--turns 100000]
+"""
+
+import argparse
+import pickle
+import time
+
+from chatbot.memory import ConversationMemory
+
+
+REPLY = "Recomandare: {title}\n\n" + "O poveste despre prietenie, curaj si razboi. " * 30
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=100000)
+    args = parser.parse_args()
+
+    memory = ConversationMemory()
+    messages = []
+    checkpoints = {10 ** k for k in range(1, 10) if 10 ** k <= args.turns} | {args.turns}
+
+    print(f"{'turns':>8} {'memory KB':>10} {'history KB':>11} {'add_turn us':>12} {'contextualize us':>17}")
+    elapsed, done = 0.0, 0
+    for i in range(1, args.turns + 1):
+        query = f"Vreau o carte despre tema{i % 97} si locul{i % 13}"
+        reply = REPLY.format(title=f"Carte {i}")
+        t0 = time.perf_counter()
+        memory.add_turn(query, reply, f"Carte {i}")
+        elapsed += time.perf_counter() - t0
+        done += 1
+        messages += [{"role": "user", "content": query}, {"role": "assistant", "content": reply}]
+
+        if i in checkpoints:
+            t0 = time.perf_counter()
+            for _ in range(100):
+                memory.contextualize("Ceva asemanator cu ultima, dar mai sumbru")
+            ctx = (time.perf_counter() - t0) / 100
+            # The lock is not picklable; measure the state only
+            state = {k: v for k, v in vars(memory).items() if k != "_lock"}
+            print(f"{i:>8} {len(pickle.dumps(state)) / 1024:10.1f} {len(pickle.dumps(messages)) / 1024:11.1f} "
+                  f"{elapsed / done * 1e6:12.1f} {ctx * 1e6:17.1f}")
+            elapsed, done = 0.0, 0
+
+
+if __name__ == "__main__":
+    main()
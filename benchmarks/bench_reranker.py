@@ -0,0 +1,117 @@
+"""
+Selection strategies on a labeled synthetic catalogue: how often the LLM selector is needed, and how often the pick is right.
+
+Runs the real retrieval stack (Chroma, BM25 fusion) on a generated catalogue,
+embedded offline with `HashingEmbeddingFunction`, and compares:
+
+  distance   the former fast path: 2 candidates, picked locally when the top
+             distance is clearly ahead, otherwise sent to the LLM;
+  reranked   `recommend`'s current flow: `RERANK_CANDIDATES` candidates reranked
+             by similarity + lexical overlap, picked locally when the score margin
+             is clear, otherwise the top `SELECTOR_CANDIDATES` go to the LLM.
+
+No chat model is called: the LLM selector is scored as an oracle that is right
+whenever the expected book is among the titles it is shown, which is an upper
+bound on what any selector can do with those candidates.
+
+Usage:
+    python -m benchmarks.bench_reranker [--books 1000] [--queries 400] [--seed 0]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from chatbot import agent, retriever
+from chatbot.embedding_cache import EmbeddingCache
+from chatbot.reranker import RERANK_CANDIDATES, confident_pick, rerank
+from benchmarks.catalogue import generate_catalogue, labeled_queries
+from benchmarks.fakes import HashingEmbeddingFunction
+
+
+# Former fast-path rule: Chroma distance margin between top-1 and top-2
+DISTANCE_MIN_MARGIN = 0.05
+
+
+def _distance_strategy(query: str):
+    results = retriever.search_books(query)
+    titles = [m["title"] for m in results["metadatas"][0]]
+    distances = results["distances"][0]
+    if titles and distances[0] <= agent.FAST_PATH_MAX_DISTANCE and (
+            len(distances) < 2 or distances[1] - distances[0] >= DISTANCE_MIN_MARGIN):
+        return titles[0], titles
+    return None, titles
+
+
+def _reranked_strategy(query: str):
+    ranked = rerank(query, retriever.search_books(query, n_results=RERANK_CANDIDATES))
+    chosen = confident_pick(ranked, agent.FAST_PATH_MAX_DISTANCE, agent.FAST_PATH_MIN_MARGIN)
+    return chosen, [c["title"] for c in ranked[:agent.SELECTOR_CANDIDATES]]
+
+
+def _evaluate(strategy, queries):
+    stats = {"queries": 0, "llm_calls": 0, "local_right": 0, "llm_right": 0, "seconds": 0.0}
+    for q in queries:
+        retriever.embedding_cache.clear()
+        t0 = time.perf_counter()
+        chosen, shown = strategy(q["query"])
+        stats["seconds"] += time.perf_counter() - t0
+        stats["queries"] += 1
+        if chosen is None:
+            stats["llm_calls"] += 1
+            stats["llm_right"] += q["expected"] in shown
+        else:
+            stats["local_right"] += chosen == q["expected"]
+    return stats
+
+
+def _report(label, stats):
+    n, llm = stats["queries"], stats["llm_calls"]
+    local = n - llm
+    local_acc = stats["local_right"] / local if local else float("nan")
+    overall = (stats["local_right"] + stats["llm_right"]) / n
+    print(f"  {label:<10} llm calls={llm / n:6.1%}  local accuracy={local_acc:6.1%}  "
+          f"accuracy (oracle selector)={overall:6.1%}  selection={stats['seconds'] / n * 1000:6.2f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--dim", type=int, default=256, help="Hashing embedding size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bench_reranker_")
+    os.chdir(workdir)
+    try:
+        os.makedirs("data")
+        catalogue = generate_catalogue(retriever.BOOK_SUMMARIES_PATH, args.books, seed=args.seed)
+        queries = labeled_queries(catalogue, args.queries, seed=args.seed)
+
+        # Chroma caches clients by path string, hence the absolute path
+        retriever.CHROMA_PATH = os.path.abspath("db/chroma_db")
+        retriever._chroma_client = None
+        retriever._bm25_index = None
+        retriever.RETRIEVER_BACKEND = "chroma"
+        retriever.embedding_cache = EmbeddingCache(path=None)
+        retriever.set_embedding_function(HashingEmbeddingFunction(dim=args.dim))
+        with redirect_stdout(StringIO()):
+            retriever.populate_chroma(retriever.BOOK_SUMMARIES_PATH)
+
+        print(f"{args.books} books, {len(queries)} labeled queries")
+        for kind in ("title", "plot", None):
+            subset = [q for q in queries if kind is None or q["kind"] == kind]
+            print(f"\n[{kind or 'all'} queries: {len(subset)}]")
+            _report("distance", _evaluate(_distance_strategy, subset))
+            _report("reranked", _evaluate(_reranked_strategy, subset))
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
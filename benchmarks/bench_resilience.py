@@ -0,0 +1,108 @@
+"""
+Request layer under faults: retries on 429s, hedging of slow requests, singleflight and throttling.
+
+Each scenario starts the local mock OpenAI server (in a subprocess) with injected
+faults and sends embedding requests through a bare `AsyncOpenAI` client
+(no retries) and through the same client wrapped by `chatbot.resilience`.
+
+Usage:
+    python -m benchmarks.bench_resilience [--requests 300] [--concurrency 20] [--latency 0.02] [--hedge-ms 250]
+"""
+
+import argparse
+import asyncio
+import time
+
+from openai import AsyncOpenAI
+
+from chatbot.resilience import RequestLayer, ResilientClient
+from benchmarks.mock_openai_server import MockOpenAIServer
+
+
+MODEL = "text-embedding-3-small"
+
+
+async def _fire(client, inputs, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def _one(text):
+        nonlocal failures
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                await client.embeddings.create(model=MODEL, input=[text])
+                latencies.append(time.perf_counter() - t0)
+            except Exception:
+                failures += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one(text) for text in inputs))
+    return latencies, failures, time.perf_counter() - t0
+
+
+def _report(label, latencies, failures, elapsed, metrics=None):
+    ordered = sorted(latencies) or [float("nan")]
+    pct = lambda q: ordered[int(q * (len(ordered) - 1))] * 1000
+    line = (f"  {label:<22} ok={len(latencies):4d} failed={failures:4d} "
+            f"p50={pct(0.5):7.1f} ms p99={pct(0.99):7.1f} ms  total={elapsed:5.2f} s")
+    if metrics:
+        line += "  " + " ".join(f"{k}={v}" for k, v in metrics.items() if v)
+    print(line)
+
+
+async def _scenario(args, title, server_kwargs, inputs, variants):
+    server = MockOpenAIServer(port=0, latency=args.latency, **server_kwargs)
+    proc = server.start_in_subprocess()
+    print(f"\n[{title}]")
+    try:
+        for label, layer in variants:
+            raw = AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            client = raw if layer is None else ResilientClient(raw, layer, is_async=True)
+            latencies, failures, elapsed = await _fire(client, inputs, args.concurrency)
+            metrics = None if layer is None else {
+                k: v for k, v in layer.metrics.snapshot().items() if k != "requests"
+            }
+            _report(label, latencies, failures, elapsed, metrics)
+            await raw.close()
+    finally:
+        proc.terminate()
+
+
+async def _main(args):
+    unique = [f"cerere {i}" for i in range(args.requests)]
+
+    await _scenario(args, "20% of requests answered with 429", {"error_rate": 0.2}, unique, [
+        ("bare client", None),
+        ("with retries", RequestLayer(rate_limits=None)),
+    ])
+
+    await _scenario(args, "5% of requests take 1 s", {"slow_rate": 0.05, "slow_latency": 1.0}, unique, [
+        ("retries only", RequestLayer(rate_limits=None)),
+        (f"hedged after {args.hedge_ms:.0f} ms", RequestLayer(rate_limits=None, hedge_after_ms=args.hedge_ms)),
+    ])
+
+    await _scenario(args, "identical concurrent requests", {}, ["aceeasi cerere"] * args.requests, [
+        ("bare client", None),
+        ("singleflight", RequestLayer(rate_limits=None)),
+    ])
+
+    rpm = args.requests * 3
+    await _scenario(args, f"burst against a {rpm} RPM quota (10 s burst)", {}, unique, [
+        ("bare client", None),
+        ("token bucket", RequestLayer(rate_limits={MODEL: (rpm, None)})),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock API latency per call (s)")
+    parser.add_argument("--hedge-ms", type=float, default=250, help="Hedging delay (above the normal p95)")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Throughput of `search_books_batch` versus a loop of single `search_books` calls.
+
+Embeddings come from `FakeEmbeddingFunction` with a simulated per-request latency,
+the embedding cache is in-memory and cleared before each run, and the NumPy
+backend serves a synthetic catalogue.
+
+Usage:
+    python -m benchmarks.bench_search_batch [--queries 2000] [--books 10000] [--latency 0.05]
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from chatbot import retriever
+from chatbot.embedding_cache import EmbeddingCache
+from chatbot.vector_index import NumpyVectorIndex
+from benchmarks.fakes import FakeEmbeddingFunction
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per embedding request")
+    parser.add_argument("--loop-sample", type=int, default=100, help="Queries timed for the single-query loop")
+    args = parser.parse_args()
+
+    embed = FakeEmbeddingFunction(dim=args.dim, latency=args.latency)
+    vectors = np.random.default_rng(0).standard_normal((args.books, args.dim), dtype=np.float32)
+    workdir = tempfile.mkdtemp(prefix="bench_batch_")
+    retriever._numpy_index = NumpyVectorIndex.build(
+        workdir,
+        ids=[f"book_{i}" for i in range(args.books)],
+        embeddings=vectors,
+        documents=[""] * args.books,
+        metadatas=[{"title": f"Book {i}"} for i in range(args.books)],
+    )
+    retriever.RETRIEVER_BACKEND = "numpy"
+    # Measures embedding batching only; hybrid/BM25 retrieval has its own benchmark
+    retriever.RETRIEVER_HYBRID = False
+    retriever.set_embedding_function(embed)
+    retriever.embedding_cache = EmbeddingCache(path=None, max_memory_entries=args.queries)
+
+    queries = [f"Interes salvat #{i}" for i in range(args.queries)]
+
+    sample = queries[: args.loop_sample]
+    t0 = time.perf_counter()
+    looped = [retriever.search_books(q) for q in sample]
+    loop_qps = len(sample) / (time.perf_counter() - t0)
+
+    retriever.embedding_cache.clear()
+    embed.calls = 0
+    t0 = time.perf_counter()
+    batched = retriever.search_books_batch(queries)
+    batch_qps = len(queries) / (time.perf_counter() - t0)
+
+    assert [r["ids"] for r in batched[: len(sample)]] == [r["ids"] for r in looped], "batch/loop mismatch"
+    print(f"single-query loop : {loop_qps:10.1f} queries/s ({len(sample)} queries)")
+    print(f"search_books_batch: {batch_qps:10.1f} queries/s ({len(queries)} queries, {embed.calls} embedding requests)")
+    print(f"speedup           : {batch_qps / loop_qps:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Semantic cache: hit rate and false-hit rate on labeled paraphrases, and lookup cost by cache size.
+
+Queries of `benchmarks/paraphrases.py` are sent in a shuffled order through a
+`SemanticCache` (one per threshold): a miss stores the query's group as its
+answer, a hit is correct if the cached group is the query's own. The first
+query of each group can only miss, so the best possible hit rate is below 100%.
+
+By default queries are embedded offline with `HashingEmbeddingFunction` (lexical
+similarity only); `--embeddings openai` uses the configured OpenAI embedding
+model (needs `OPENAI_API_KEY` and network) to pick a threshold for production.
+
+Usage:
+    python -m benchmarks.bench_semantic_cache [--thresholds 0.8 0.85 0.9 0.95] [--embeddings hashing|openai]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from chatbot.semantic_cache import SemanticCache
+from benchmarks.fakes import HashingEmbeddingFunction
+from benchmarks.paraphrases import PARAPHRASE_GROUPS
+
+
+MODEL = "gpt-4o-mini"
+
+
+def _embed(texts, kind: str, dim: int):
+    if kind == "openai":
+        from chatbot.retriever import get_embedding_function
+        return get_embedding_function()(texts)
+    return HashingEmbeddingFunction(dim=dim)(texts)
+
+
+def _replay(labeled, vectors, threshold: float):
+    cache = SemanticCache(capacity=len(labeled), threshold=threshold)
+    hits = false_hits = 0
+    for (group, _), vector in zip(labeled, vectors):
+        found = cache.get(MODEL, vector)
+        if found is None:
+            cache.put(MODEL, vector, {"group": group})
+        else:
+            hits += 1
+            false_hits += found[0]["group"] != group
+    return hits, false_hits
+
+
+def _lookup_cost(sizes, dim: int, lookups: int = 200):
+    rng = np.random.default_rng(0)
+    print(f"\n[lookup cost, dim={dim}]")
+    for size in sizes:
+        cache = SemanticCache(capacity=size, threshold=2.0)  # never hits: every lookup scans all entries
+        for vector in rng.standard_normal((size, dim), dtype=np.float32):
+            cache.put(MODEL, vector, {})
+        queries = rng.standard_normal((lookups, dim), dtype=np.float32)
+        t0 = time.perf_counter()
+        for q in queries:
+            cache.get(MODEL, q)
+        per_lookup = (time.perf_counter() - t0) / lookups
+        print(f"  {size:>7} entries  {per_lookup * 1000:7.3f} ms/lookup  {size * dim * 4 / 2 ** 20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    parser.add_argument("--embeddings", choices=("hashing", "openai"), default="hashing")
+    parser.add_argument("--dim", type=int, default=1536, help="Hashing embedding size")
+    parser.add_argument("--shuffles", type=int, default=20, help="Query orders averaged per threshold")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 2048, 16384])
+    args = parser.parse_args()
+
+    labeled = [(group, q) for group, queries in PARAPHRASE_GROUPS.items() for q in queries]
+    vectors = _embed([q for _, q in labeled], args.embeddings, args.dim)
+    print(f"{len(labeled)} queries in {len(PARAPHRASE_GROUPS)} groups, {args.embeddings} embeddings")
+
+    print(f"\n{'threshold':>9} {'hit rate':>9} {'false hits':>11} {'false/hits':>11}")
+    for threshold in args.thresholds:
+        hits = false_hits = 0
+        for seed in range(args.shuffles):
+            order = list(range(len(labeled)))
+            random.Random(seed).shuffle(order)
+            h, f = _replay([labeled[i] for i in order], [vectors[i] for i in order], threshold)
+            hits += h
+            false_hits += f
+        lookups = len(labeled) * args.shuffles
+        print(f"{threshold:>9.2f} {hits / lookups:>9.1%} {false_hits / lookups:>11.1%} "
+              f"{false_hits / hits if hits else 0.0:>11.1%}")
+
+    _lookup_cost(args.sizes, args.dim)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Sharded retrieval: query latency as the catalogue is split over more shards, sequential vs parallel fan-out.
+
+A synthetic catalogue of random unit vectors is split by `hash_partition` into
+1, 2, 4, ... NumPy shards (`NumpyVectorIndex`, written to a temporary directory)
+and queried through `ShardedRetriever`, once with a one-thread pool (shards one
+after the other) and once with one thread per shard. `--shard-latency` adds a
+fixed delay to every shard query, standing for a shard behind I/O (a remote
+Chroma server, a cold persistent directory); with it the parallel fan-out stays
+flat as shards are added while the sequential one grows linearly. Without it,
+the shards only compete for CPU, so the gain is bounded by the core count.
+
+The last section makes one shard slower than `--timeout` and shows the
+fan-out answering from the other shards in bounded time.
+
+Usage:
+    python -m benchmarks.bench_sharding [--books 200000] [--shards 1 2 4 8] [--shard-latency 0.02]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from chatbot.sharding import ShardedRetriever, hash_partition
+from chatbot.vector_index import NumpyVectorIndex
+
+
+class DelayedShard:
+    """
+    Shard wrapper adding `delay` seconds to every query.
+    """
+
+    def __init__(self, shard, delay: float):
+        self.shard = shard
+        self.delay = delay
+
+    def query(self, query_embeddings, n_results: int = 2):
+        time.sleep(self.delay)
+        return self.shard.query(query_embeddings=query_embeddings, n_results=n_results)
+
+
+def _build_shards(workdir, vectors, n_shards: int):
+    names = [str(i) for i in range(n_shards)]
+    assign = hash_partition(names)
+    rows = {name: [] for name in names}
+    for i in range(len(vectors)):
+        rows[assign(f"book_{i}", {})].append(i)
+
+    shards = {}
+    for name, idx in rows.items():
+        shards[name] = NumpyVectorIndex.build(
+            f"{workdir}/{n_shards}_{name}",
+            [f"book_{i}" for i in idx],
+            vectors[idx],
+            [f"Synthetic summary {i}" for i in idx],
+            [{"title": f"Book {i}"} for i in idx],
+        )
+    return shards
+
+
+def _time_queries(retriever, queries, n_results: int):
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        retriever.query([q], n_results=n_results)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(0.95 * (len(latencies) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--shard-latency", type=float, default=0.0,
+                        help="Seconds added to every shard query (simulated I/O)")
+    parser.add_argument("--timeout", type=float, default=0.2,
+                        help="Shard timeout of the slow-shard scenario")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.books, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    print(f"{args.books} books, dim={args.dim}, {args.queries} queries, top-{args.n_results}, "
+          f"shard latency {args.shard_latency * 1000:.0f} ms, {os.cpu_count()} CPU(s)")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"\n{'shards':>6} {'seq p50 ms':>11} {'seq p95 ms':>11} {'par p50 ms':>11} {'par p95 ms':>11}")
+        reference = None
+        for n_shards in args.shards:
+            shards = _build_shards(workdir, vectors, n_shards)
+            if args.shard_latency:
+                shards = {name: DelayedShard(s, args.shard_latency) for name, s in shards.items()}
+
+            row = []
+            for workers in (1, n_shards):
+                retriever = ShardedRetriever(shards, timeout=60.0, max_workers=workers)
+                retriever.query([queries[0]], n_results=args.n_results)  # warm up
+                row += _time_queries(retriever, queries, args.n_results)
+                ids = retriever.query(queries[:10], n_results=args.n_results)["ids"]
+                retriever.close()
+                # Sharding must not change the answer
+                reference = reference or ids
+                assert ids == reference, "sharded top-k differs from the single-shard top-k"
+            print(f"{n_shards:>6} " + " ".join(f"{v * 1000:11.2f}" for v in row))
+
+        n_shards = max(args.shards)
+        if n_shards > 1:
+            shards = _build_shards(f"{workdir}/slow", vectors, n_shards)
+            slow = sorted(shards)[0]
+            shards[slow] = DelayedShard(shards[slow], args.timeout * 5)
+            retriever = ShardedRetriever(shards, timeout=args.timeout, max_workers=n_shards)
+            t0 = time.perf_counter()
+            found = retriever.query([queries[0]], n_results=args.n_results)
+            elapsed = time.perf_counter() - t0
+            retriever.close()
+            print(f"\n[slow shard] shard {slow!r} takes {args.timeout * 5:.2f}s, timeout {args.timeout:.2f}s: "
+                  f"answered in {elapsed:.2f}s with {len(found['ids'][0])} results "
+                  f"from {n_shards - 1}/{n_shards} shards")
+
+
+if __name__ == "__main__":
+    main()
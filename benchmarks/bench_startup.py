@@ -0,0 +1,151 @@
+"""
+Measure cold-start cost: `-X importtime` for the entry modules and wall time until the CLI prompt.
+
+Each measurement runs in a fresh interpreter. `--ref` repeats the measurements on
+another git revision (exported with `git archive` into a temporary directory),
+e.g. to compare against the commit before a change.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--top 8] [--ref HEAD~1]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+MODULES = ["chatbot.interface", "chatbot.agent", "chatbot.retriever", "tools.language_filter"]
+PROJECT_PACKAGES = {"chatbot", "tools"}
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # The clients only need a key to be constructed; no request is sent
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def _is_project(name: str) -> bool:
+    return name.split(".")[0] in PROJECT_PACKAGES
+
+
+def import_profile(module: str, cwd: str) -> Tuple[Optional[float], List[Tuple[float, str]]]:
+    """
+    Import `module` under `-X importtime`.
+
+    Interpreter startup (`site`, `encodings`, ...) is excluded from the total.
+
+    Returns:
+        (milliseconds spent importing the project's modules, or None if the import failed,
+        [(cumulative ms, package)] for the outside packages the project imports directly).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=_env(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None, []
+
+    # importtime prints children before their parent, one indentation level deeper
+    total, rows = 0.0, []
+    pending: Dict[int, List[Tuple[float, str]]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        ms = int(cumulative) / 1000
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+
+        children = pending.pop(depth + 1, [])
+        if _is_project(name):
+            rows.extend(child for child in children if not _is_project(child[1]))
+            if depth == 0:
+                total += ms
+        pending.setdefault(depth, []).append((ms, name))
+
+    return total, sorted(rows, reverse=True)
+
+
+def time_to_prompt(cwd: str, runs: int) -> Optional[float]:
+    """
+    Median wall time (ms) to start `CLI_app.py`, reach the prompt and exit straight away.
+    """
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "CLI_app.py"], cwd=cwd, env=_env(),
+            input="exit\n", capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return None
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    return statistics.median(samples)
+
+
+def measure(cwd: str, runs: int, top: int) -> Dict[str, Optional[float]]:
+    results: Dict[str, Optional[float]] = {}
+    for module in MODULES:
+        totals, heaviest = [], []
+        for _ in range(runs):
+            total, heaviest = import_profile(module, cwd)
+            if total is None:
+                break
+            totals.append(total)
+        results[module] = statistics.median(totals) if totals else None
+        status = f"{results[module]:8.1f} ms" if totals else "  import failed"
+        print(f"  import {module:<24}{status}")
+        if module == MODULES[0] and heaviest:
+            for ms, name in heaviest[:top]:
+                print(f"      {ms:8.1f} ms  {name}")
+
+    results["CLI_app.py"] = time_to_prompt(cwd, runs)
+    prompt = results["CLI_app.py"]
+    print(f"  CLI start -> prompt -> exit     {prompt:8.1f} ms" if prompt is not None
+          else "  CLI start -> prompt -> exit     failed")
+
+    return results
+
+
+def _export_ref(ref: str, target: str) -> None:
+    archive = subprocess.run(["git", "archive", ref], capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement (median)")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest third-party imports to list")
+    parser.add_argument("--ref", help="Also measure this git revision, for comparison")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    print("working tree:")
+    current = measure(root, args.runs, args.top)
+
+    if args.ref:
+        with tempfile.TemporaryDirectory(prefix="bench_startup_") as workdir:
+            _export_ref(args.ref, workdir)
+            print(f"\n{args.ref}:")
+            baseline = measure(workdir, args.runs, args.top)
+
+        print("\nspeedup:")
+        for name, value in current.items():
+            before = baseline.get(name)
+            if value and before:
+                print(f"  {name:<31}{before / value:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Summary store at catalogue scale: build time, file size, and exact / fuzzy title lookup latency.
+
+A synthetic catalogue in the `## Title:` format is generated into a temporary
+directory and built with `tools.summary_store.build_store`; lookups use exact
+titles, re-cased titles without punctuation, and titles with one typo.
+
+Usage:
+    python -m benchmarks.bench_summary_store [--books 100000] [--lookups 2000]
+"""
+
+import argparse
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+
+from tools.summary_store import SummaryStore, build_store
+
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "vas", "ul", "bre", "din", "sa", "che", "por",
+             "ne", "fi", "gra", "zu", "an", "wel", "ost", "ri", "ma", "ton", "el", "qui"]
+
+
+def _title(rng: random.Random) -> str:
+    words = ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(rng.randint(2, 5))]
+    return " ".join(w.capitalize() for w in words)
+
+
+def _typo(rng: random.Random, title: str) -> str:
+    i = rng.randrange(1, len(title) - 1)
+    return title[:i] + title[i + 1:] if rng.random() < 0.5 else title[:i] + "x" + title[i:]
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[int(0.95 * (len(ordered) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    workdir = tempfile.mkdtemp(prefix="bench_summary_store_")
+    source = os.path.join(workdir, "catalogue.txt")
+    titles = []
+    with open(source, "w", encoding="utf-8") as f:
+        for i in range(args.books):
+            title = f"{_title(rng)} {i}" if i % 7 == 0 else _title(rng)
+            titles.append(title)
+            f.write(f"## Title: {title}\nSummary of {title}. " + " ".join(rng.choices(SYLLABLES, k=30)) + "\n\n")
+
+    path = os.path.join(workdir, "store.sqlite3")
+    t0 = time.perf_counter()
+    build_store(source, path, localized=None)
+    build_s = time.perf_counter() - t0
+    print(f"built {args.books} books in {build_s:.1f} s, {os.path.getsize(path) / 1e6:.0f} MB on disk")
+
+    store = SummaryStore(path)
+    sample = rng.sample(titles, min(args.lookups, len(titles)))
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    for label, queries in (
+        ("exact", sample),
+        ("normalized", [t.upper() + "!" for t in sample]),
+        ("one typo", [_typo(rng, t) for t in sample]),
+    ):
+        latencies, found = [], 0
+        for query, expected in zip(queries, sample):
+            t0 = time.perf_counter()
+            match = store.find(query)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found += match is not None and match[0] == expected
+        p50, p95 = _percentiles(latencies)
+        print(f"  {label:<11} p50={p50:6.3f} ms  p95={p95:6.3f} ms  found={found}/{len(queries)}")
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"peak RSS growth during lookups: {(rss_after - rss_before) / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+TTS latency: a fresh `pyttsx3.init()` per request versus the warm worker pool and its audio cache.
+
+Needs pyttsx3 and a working speech driver (espeak, SAPI5 or NSSpeechSynthesizer);
+audio is written to a temporary directory.
+
+Usage:
+    python -m benchmarks.bench_tts [--texts 5]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from tools import tts
+
+
+TEXT = "Recomandare: {i}. O poveste despre prietenie, curaj si descoperirea de sine."
+
+
+def _cold(text: str, path: str) -> None:
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty("rate", tts.TTS_RATE)
+    engine.save_to_file(text, path)
+    engine.runAndWait()
+
+
+def _wait(queue: tts.TTSJobQueue, job_id: str) -> dict:
+    while True:
+        job = queue.status(job_id)
+        if job["status"] in ("done", "error"):
+            return job
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_tts_")
+    tts.CACHE_DIR = os.path.join(workdir, "cache")
+    tts.SESSIONS_DIR = os.path.join(workdir, "sessions")
+    texts = [TEXT.format(i=i) for i in range(args.texts)]
+
+    cold = []
+    for i, text in enumerate(texts):
+        t0 = time.perf_counter()
+        _cold(text, os.path.join(workdir, f"cold_{i}.wav"))
+        cold.append((time.perf_counter() - t0) * 1000)
+
+    queue = tts.TTSJobQueue(max_workers=1)
+    t0 = time.perf_counter()
+    _wait(queue, queue.submit("warm-up"))
+    startup = (time.perf_counter() - t0) * 1000
+
+    runs = {"warm worker": [], "cache replay": []}
+    for label in runs:
+        for text in texts:
+            t0 = time.perf_counter()
+            job_id = queue.submit(text, session_id="bench")
+            submit_ms = (time.perf_counter() - t0) * 1000
+            job = _wait(queue, job_id)
+            if job["status"] == "error":
+                raise SystemExit(f"TTS failed: {job['error']}")
+            runs[label].append(((time.perf_counter() - t0) * 1000, submit_ms))
+    queue.shutdown()
+
+    print(f"  pool start + first job   {startup:8.1f} ms")
+    print(f"  fresh engine per request p50={statistics.median(cold):8.1f} ms (blocking)")
+    for label, samples in runs.items():
+        total = statistics.median(s[0] for s in samples)
+        submit = statistics.median(s[1] for s in samples)
+        print(f"  {label:<24} p50={total:8.1f} ms (submit returns in {submit:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
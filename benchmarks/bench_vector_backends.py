@@ -0,0 +1,111 @@
+"""
+Compare query latency and cold-start time of the Chroma and NumPy retriever backends.
+
+Synthetic catalogues of random unit vectors are written to a temporary directory
+for each size; queries are embedded with the deterministic `FakeEmbeddingFunction`.
+Chroma is skipped above `--chroma-max` books because bulk-loading 1M rows into
+HNSW takes a long time.
+
+Usage:
+    python -m benchmarks.bench_vector_backends [--sizes 10 10000 1000000] [--dim 256]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from chatbot.vector_index import NumpyVectorIndex
+from benchmarks.fakes import FakeEmbeddingFunction
+
+
+def _synthetic_catalogue(n: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    ids = [f"book_{i}" for i in range(n)]
+    documents = [f"Synthetic summary {i}" for i in range(n)]
+    metadatas = [{"title": f"Book {i}"} for i in range(n)]
+    return ids, vectors, documents, metadatas
+
+
+def _time_queries(query_fn, queries, repeat: int = 1):
+    latencies = []
+    for _ in range(repeat):
+        for q in queries:
+            t0 = time.perf_counter()
+            query_fn([q])
+            latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(0.95 * (len(latencies) - 1))]
+
+
+def bench_numpy(workdir, ids, vectors, documents, metadatas, queries):
+    path = f"{workdir}/numpy_index"
+    NumpyVectorIndex.build(path, ids, vectors, documents, metadatas)
+
+    t0 = time.perf_counter()
+    index = NumpyVectorIndex.load(path)
+    index.query([queries[0]], n_results=2)
+    cold = time.perf_counter() - t0
+
+    p50, p95 = _time_queries(lambda q: index.query(q, n_results=2), queries)
+    return cold, p50, p95
+
+
+def bench_chroma(workdir, ids, vectors, documents, metadatas, queries):
+    import chromadb
+
+    path = f"{workdir}/chroma_db"
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection(name="bench")
+    batch = client.get_max_batch_size()
+    for start in range(0, len(ids), batch):
+        end = start + batch
+        collection.add(
+            ids=ids[start:end],
+            embeddings=vectors[start:end],
+            documents=documents[start:end],
+            metadatas=metadatas[start:end],
+        )
+    del collection, client
+
+    t0 = time.perf_counter()
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_collection(name="bench")
+    collection.query(query_embeddings=[queries[0]], n_results=2)
+    cold = time.perf_counter() - t0
+
+    p50, p95 = _time_queries(lambda q: collection.query(query_embeddings=q, n_results=2), queries)
+    return cold, p50, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 10_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--chroma-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    embed = FakeEmbeddingFunction(dim=args.dim)
+    queries = embed([f"Vreau o carte despre tema {i}" for i in range(args.queries)])
+
+    print(f"{'books':>9} {'backend':>7} {'cold start':>11} {'p50':>10} {'p95':>10}")
+    for n in args.sizes:
+        ids, vectors, documents, metadatas = _synthetic_catalogue(n, args.dim)
+        workdir = tempfile.mkdtemp(prefix="bench_backends_")
+        try:
+            backends = [("numpy", bench_numpy)]
+            if n <= args.chroma_max:
+                backends.append(("chroma", bench_chroma))
+            for name, fn in backends:
+                cold, p50, p95 = fn(workdir, ids, vectors, documents, metadatas, queries)
+                print(f"{n:>9} {name:>7} {cold * 1000:>8.1f} ms {p50 * 1000:>7.2f} ms {p95 * 1000:>7.2f} ms")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Deterministic synthetic catalogues and labeled queries for the offline benchmark suite.
+
+Every generated book has a unique title, a protagonist and a place (made-up words)
+and one theme; its summary mentions the protagonist, the place and theme words
+but never the title. Labeled queries name either the title ("title" queries) or
+the protagonist and place ("plot" queries), and know which book they expect.
+"""
+
+import random
+from typing import Dict, List
+
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "vas", "ul", "bre", "din", "sa", "che", "por",
+             "ne", "fi", "gra", "zu", "an", "wel", "ost", "ri", "ma", "ton", "el", "qui"]
+
+THEMES = {
+    "friendship": ["friendship", "loyalty", "companions", "trust"],
+    "war": ["war", "soldiers", "battle", "survival"],
+    "magic": ["magic", "wizards", "spells", "prophecy"],
+    "freedom": ["freedom", "oppression", "rebellion", "surveillance"],
+    "love": ["love", "romance", "longing", "marriage"],
+    "mystery": ["mystery", "detective", "crime", "secrets"],
+    "journey": ["journey", "voyage", "quest", "wilderness"],
+    "family": ["family", "siblings", "inheritance", "memory"],
+}
+
+FILLER = ["the", "story", "follows", "through", "years", "of", "change", "and", "a", "world",
+          "where", "every", "choice", "matters", "as", "old", "bonds", "are", "tested", "until",
+          "the", "end", "reveals", "what", "was", "lost", "along", "way"]
+
+TITLE_TEMPLATES = ["Ce stii despre {title}?", "Spune-mi despre cartea {title}", "Vreau sa citesc {title}"]
+PLOT_TEMPLATES = ["Vreau o carte despre {protagonist} din {place}",
+                  "O poveste cu {protagonist}, in {place}",
+                  "Ce carte are personajul {protagonist} si se petrece in {place}?"]
+
+
+def _word(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choices(SYLLABLES, k=rng.randint(low, high))).capitalize()
+
+
+def generate_catalogue(path: str, books: int, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Write `books` synthetic books to `path` in the `## Title:` format.
+
+    Returns:
+        One dict per book, in file order: title, protagonist, place, theme.
+    """
+    rng = random.Random(seed)
+    seen = set()
+    catalogue = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(books):
+            title = " ".join(_word(rng, 2, 3) for _ in range(rng.randint(2, 4)))
+            if title in seen:
+                title = f"{title} {i}"
+            seen.add(title)
+
+            book = {"title": title, "protagonist": _word(rng, 3, 4), "place": _word(rng, 2, 3) + "ia",
+                    "theme": rng.choice(list(THEMES))}
+            words = rng.sample(THEMES[book["theme"]], 3) + rng.choices(FILLER, k=24)
+            rng.shuffle(words)
+            summary = (f"{book['protagonist']} grows up in {book['place']}. " + " ".join(words) + ". "
+                       f"In the end {book['protagonist']} leaves {book['place']} behind.")
+            f.write(f"## Title: {title}\n{summary}\n\n")
+            catalogue.append(book)
+
+    return catalogue
+
+
+def labeled_queries(catalogue: List[Dict[str, str]], count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    `count` queries about random books of `catalogue`, half "title" and half "plot".
+
+    Returns:
+        Dicts with kind, query and expected (the title of the book asked about).
+    """
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        book = rng.choice(catalogue)
+        if i % 2 == 0:
+            queries.append({"kind": "title", "query": rng.choice(TITLE_TEMPLATES).format(**book),
+                            "expected": book["title"]})
+        else:
+            queries.append({"kind": "plot", "query": rng.choice(PLOT_TEMPLATES).format(**book),
+                            "expected": book["title"]})
+    return queries
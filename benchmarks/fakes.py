@@ -0,0 +1,193 @@
+"""
+Deterministic stand-ins for the OpenAI client and the retriever, used by the benchmarks.
+"""
+
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+
+class _FakeChatCompletions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str, messages: List[dict], tools=None, tool_choice=None, **kwargs):
+        """
+        Mimic `client.chat.completions.create`.
+
+        - With a forced `tool_choice`, echoes the title from the user message as tool arguments.
+        - Otherwise picks the first title listed under "Titles:" (selector prompt).
+        - With `stream=True`, returns the reply as an iterator of delta chunks.
+        """
+        self._owner.calls += 1
+        time.sleep(self._owner.latency)
+
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+
+        if tool_choice:
+            try:
+                title = json.loads(user).get("title", "")
+            except ValueError:
+                title = user
+            call = SimpleNamespace(
+                id="call_0",
+                type="function",
+                function=SimpleNamespace(
+                    name=tool_choice["function"]["name"],
+                    arguments=json.dumps({"title": title}, ensure_ascii=False),
+                ),
+            )
+            message = SimpleNamespace(role="assistant", content=None, tool_calls=[call])
+        else:
+            titles = re.findall(r"^- (.+)$", user, flags=re.MULTILINE)
+            message = SimpleNamespace(role="assistant", content=titles[0] if titles else "NONE", tool_calls=None)
+
+        if kwargs.get("stream"):
+            return self._stream(message.content or "")
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=_usage(prompt_tokens, 8),
+            model=model,
+        )
+
+
+    @staticmethod
+    def _stream(content: str):
+        # Emit the reply a few characters per chunk, like the streaming API
+        for i in range(0, len(content), 4):
+            delta = SimpleNamespace(content=content[i:i + 4], role=None, tool_calls=None)
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+
+
+class FakeOpenAI:
+    """
+    Minimal synchronous OpenAI client stub with a fixed per-request latency.
+
+    Args:
+        latency: Seconds slept on every request, to emulate a network round-trip.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(self))
+
+
+class FakeSearch:
+    """
+    Callable replacement for `chatbot.retriever.search_books`.
+
+    Returns a fixed Chroma-shaped result and sleeps `latency` seconds to emulate
+    the embedding request.
+
+    Args:
+        titles: Candidate titles, best first.
+        distances: Matching distances (same length as `titles`).
+        latency: Seconds slept per call.
+    """
+
+    def __init__(self, titles: List[str], distances: Optional[List[float]] = None, latency: float = 0.0):
+        self.titles = titles
+        self.distances = distances or [0.5 + 0.1 * i for i in range(len(titles))]
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, query: str, n_results: int = 2, exclude_titles=None, filters=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        exclude = set(exclude_titles or ())
+        kept = [i for i, t in enumerate(self.titles) if t not in exclude][:n_results]
+        return {
+            "ids": [[f"book_{i}" for i in kept]],
+            "documents": [["" for _ in kept]],
+            "metadatas": [[{"title": self.titles[i]} for i in kept]],
+            "distances": [[self.distances[i] for i in kept]],
+        }
+
+
+class FakeEmbeddingFunction:
+    """
+    Deterministic local embedding stub (no network).
+
+    Each text is mapped to a unit vector seeded by the sha256 of the text, so the
+    same text always yields the same vector. Compatible with Chroma's
+    `EmbeddingFunction` call signature.
+
+    Args:
+        dim: Embedding dimension.
+        latency: Seconds slept per call (per batch, not per text).
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, input: List[str]):
+        import hashlib
+        import numpy as np
+
+        self.calls += 1
+        time.sleep(self.latency)
+        out = []
+        for text in input:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vec = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            out.append(vec / np.linalg.norm(vec))
+        return out
+
+    @staticmethod
+    def name() -> str:
+        return "fake-embedding"
+
+
+class HashingEmbeddingFunction:
+    """
+    Deterministic lexical embedding stub (no network), for recall measurements.
+
+    Each token (see `chatbot.text_utils.tokenize`) is hashed to a signed bucket of a
+    `dim`-sized vector, so texts sharing words get nearby unit vectors, unlike
+    `FakeEmbeddingFunction`. Compatible with Chroma's `EmbeddingFunction` call signature.
+
+    Args:
+        dim: Embedding dimension.
+        latency: Seconds slept per call (per batch, not per text).
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, input: List[str]):
+        import hashlib
+        import numpy as np
+        from chatbot.text_utils import tokenize
+
+        self.calls += 1
+        time.sleep(self.latency)
+        out = []
+        for text in input:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for token in tokenize(text):
+                h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+                vec[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+            norm = np.linalg.norm(vec)
+            out.append(vec / norm if norm else vec)
+        return out
+
+    @staticmethod
+    def name() -> str:
+        return "hashing-embedding"
@@ -0,0 +1,150 @@
+"""
+HTTP load test for the API server (`api_server.py`) against the local mock OpenAI server.
+
+Starts the mock server and the API (with `--workers` uvicorn workers) as
+subprocesses. The API runs in a temporary working directory holding a copy of
+`data/` and the Chroma store, so caches written during the test never touch the
+repository. Batches of unique `/recommend` queries are then fired at increasing
+client concurrency levels, reporting throughput, latency percentiles and status
+codes; 429s show the per-worker admission limit shedding load.
+
+Usage:
+    python -m benchmarks.load_test_api [--levels 1 10 50 200] [--workers 2] [--limit 64] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.mock_openai_server import MockOpenAIServer
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _start_api(args, base_url: str) -> "tuple[subprocess.Popen, str]":
+    workdir = tempfile.mkdtemp(prefix="load_api_")
+    shutil.copytree(os.path.join(ROOT, "data"), os.path.join(workdir, "data"))
+    shutil.copytree(os.path.join(ROOT, "db", "chroma_db"), os.path.join(workdir, "db", "chroma_db"))
+
+    port = _free_port()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "mock"),
+        OPENAI_BASE_URL=base_url,
+        # The mock server has no quota; measure the API, not the client-side throttling
+        OPENAI_RATE_LIMITS="off",
+        # The queries differ only by a number; measure the pipeline, not semantic cache hits
+        SMART_LIBRARIAN_SEMANTIC_CACHE="0",
+        PYTHONPATH=ROOT,
+        SMART_LIBRARIAN_API_MAX_CONCURRENCY=str(args.limit),
+        SMART_LIBRARIAN_API_TIMEOUT=str(args.timeout),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "api_server.py"), "--port", str(port), "--workers", str(args.workers)],
+        cwd=workdir, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("API server exited during start-up")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"API server did not start on {url}")
+
+
+async def _run_level(client: httpx.AsyncClient, concurrency: int, n_queries: int, offset: int):
+    queries = [f"Vreau o carte despre tema {offset + i}" for i in range(n_queries)]
+    latencies, statuses = [], Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(q):
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                response = await client.post("/recommend", json={"query": q})
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                return
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one(q) for q in queries))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+
+    def _pct(p):
+        return latencies[int(p * (len(latencies) - 1))] * 1000 if latencies else float("nan")
+
+    return len(latencies) / elapsed, _pct(0.5), _pct(0.95), _pct(0.99), statuses
+
+
+async def _main(args, url: str):
+    limits = httpx.Limits(max_connections=max(args.levels), max_keepalive_connections=max(args.levels))
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout + 30) as client:
+        # Warm every worker's connection pool and indexes
+        await asyncio.gather(*(client.post("/recommend", json={"query": f"warm-up {i}"})
+                               for i in range(args.workers * 4)))
+
+        print(f"{'conc':>6} {'ok/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+        offset = 0
+        for level in args.levels:
+            n_queries = max(args.queries, level * 4)
+            qps, p50, p95, p99, statuses = await _run_level(client, level, n_queries, offset)
+            offset += n_queries
+            codes = " ".join(f"{code}={count}" for code, count in sorted(statuses.items(), key=str))
+            print(f"{level:>6} {qps:8.1f} {p50:8.1f} {p95:8.1f} {p99:8.1f}  {codes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--queries", type=int, default=200, help="Minimum queries per level")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=64, help="Per-worker max concurrent requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout of the API (s)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock API latency per call (s)")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding size (must match the Chroma store)")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=0, latency=args.latency, dim=args.dim)
+    server_proc = server.start_in_subprocess()
+    api_proc = None
+    try:
+        api_proc, url = _start_api(args, server.base_url)
+        print(f"API: {url} ({args.workers} workers, limit {args.limit}/worker); "
+              f"mock OpenAI: {server.base_url} (latency {args.latency * 1000:.0f} ms)")
+        asyncio.run(_main(args, url))
+    finally:
+        if api_proc is not None:
+            api_proc.terminate()
+            api_proc.wait(timeout=30)
+        server_proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Concurrency load test for the async agent (`chatbot.agent.arun_agent`).
+
+Starts the local mock OpenAI server in a subprocess, points the shared `AsyncOpenAI` client at it,
+serves a synthetic catalogue from the NumPy backend and fires batches of unique
+queries at increasing concurrency levels in a single process.
+
+Usage:
+    python -m benchmarks.load_test_async [--levels 1 10 50 100 200 500] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from chatbot import agent, retriever
+from chatbot.embedding_cache import EmbeddingCache
+from chatbot.openai_clients import get_request_layer, set_async_client
+from chatbot.vector_index import NumpyVectorIndex
+from benchmarks.mock_openai_server import MockOpenAIServer
+
+
+async def _run_level(concurrency: int, n_queries: int, offset: int):
+    queries = [f"Vreau o carte despre tema {offset + i}" for i in range(n_queries)]
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(q):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await agent.arun_agent(q)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one(q) for q in queries))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return n_queries / elapsed, latencies[len(latencies) // 2], latencies[int(0.95 * (len(latencies) - 1))]
+
+
+async def _main(args):
+    server = MockOpenAIServer(port=0, latency=args.latency, dim=args.dim)
+    server_proc = server.start_in_subprocess()
+    # The shared client picks up OPENAI_BASE_URL when it is (re)created
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    # The mock server accepts any key; without one the client refuses to start
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    set_async_client(None)
+    get_request_layer().configure_rate_limits(None)
+    # Near-identical queries would be served by the semantic cache
+    agent.SEMANTIC_CACHE_ENABLED = False
+
+    vectors = np.random.default_rng(0).standard_normal((args.books, args.dim), dtype=np.float32)
+    retriever._numpy_index = NumpyVectorIndex.build(
+        tempfile.mkdtemp(prefix="load_async_"),
+        ids=[f"book_{i}" for i in range(args.books)],
+        embeddings=vectors,
+        documents=[""] * args.books,
+        metadatas=[{"title": f"Book {i}"} for i in range(args.books)],
+    )
+    retriever.RETRIEVER_BACKEND = "numpy"
+    retriever.embedding_cache = EmbeddingCache(path=None)
+
+    print(f"mock latency={args.latency * 1000:.0f} ms per call, {args.books} books")
+    print(f"{'concurrency':>11} {'queries/s':>10} {'p50':>9} {'p95':>9}")
+    offset = 0
+    try:
+        for level in args.levels:
+            n = max(args.queries, level * 2)
+            qps, p50, p95 = await _run_level(level, n, offset)
+            offset += n
+            print(f"{level:>11} {qps:>10.1f} {p50 * 1000:>6.0f} ms {p95 * 1000:>6.0f} ms")
+    finally:
+        server_proc.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50, 100, 200, 500])
+    parser.add_argument("--queries", type=int, default=200, help="Minimum queries per level")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=256)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
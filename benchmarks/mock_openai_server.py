@@ -0,0 +1,230 @@
+"""
+Local mock of the OpenAI REST API for load tests (stdlib asyncio, HTTP/1.1 keep-alive).
+
+Implemented endpoints (enough for the Smart Librarian pipeline):
+    POST /v1/embeddings          deterministic unit vectors of `--dim` floats
+    POST /v1/chat/completions    selector replies (first listed title) and forced tool calls
+    POST /v1/images/generations  a 1x1 PNG as b64_json
+
+Every request sleeps `--latency` seconds before answering, without blocking other requests.
+Faults can be injected: `--error-rate` answers that share of requests with 429 (and a
+`Retry-After-Ms` header), and `--slow-rate` makes that share take `--slow-latency` seconds.
+
+Usage:
+    python -m benchmarks.mock_openai_server --port 8765 --latency 0.05
+    export OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import random
+import re
+import socket
+import threading
+import time
+
+
+# 1x1 transparent PNG
+TINY_PNG_B64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+class MockOpenAIServer:
+    """
+    Minimal OpenAI-compatible HTTP server.
+
+    Args:
+        host: Interface to bind.
+        port: TCP port (0 picks a free port; read it back from `port` after `start`).
+        latency: Seconds slept per request.
+        dim: Embedding dimension.
+        error_rate: Share of requests answered with 429.
+        slow_rate: Share of requests delayed by `slow_latency` instead of `latency`.
+        slow_latency: Seconds slept by slow requests.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, latency: float = 0.05, dim: int = 256,
+                 error_rate: float = 0.0, slow_rate: float = 0.0, slow_latency: float = 1.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.dim = dim
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.requests = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _embedding(self, text: str):
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vec = [rng.gauss(0.0, 1.0) for _ in range(self.dim)]
+        norm = sum(v * v for v in vec) ** 0.5
+        return [v / norm for v in vec]
+
+    def _embeddings(self, body: dict) -> dict:
+        inputs = body.get("input")
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        tokens = sum(len(t) for t in inputs) // 4
+        return {
+            "object": "list",
+            "model": body.get("model", "mock-embedding"),
+            "data": [{"object": "embedding", "index": i, "embedding": self._embedding(t)} for i, t in enumerate(inputs)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _chat(self, body: dict) -> dict:
+        messages = body.get("messages", [])
+        user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        message = {"role": "assistant", "content": None}
+        tool_choice = body.get("tool_choice")
+
+        if isinstance(tool_choice, dict):
+            message["tool_calls"] = [{
+                "id": "call_0",
+                "type": "function",
+                "function": {"name": tool_choice["function"]["name"], "arguments": user},
+            }]
+        else:
+            titles = re.findall(r"^- (.+)$", user, flags=re.MULTILINE)
+            message["content"] = titles[0] if titles else "NONE"
+
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        return {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock-chat"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 8, "total_tokens": prompt_tokens + 8},
+        }
+
+    def _images(self, body: dict) -> dict:
+        return {"created": int(time.time()), "data": [{"b64_json": TINY_PNG_B64, "revised_prompt": body.get("prompt")}]}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        routes = {
+            "/v1/embeddings": self._embeddings,
+            "/v1/chat/completions": self._chat,
+            "/v1/images/generations": self._images,
+        }
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {k.strip().lower(): v.strip() for k, v in
+                           (line.split(":", 1) for line in header_lines if ":" in line)}
+                raw = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                self.requests += 1
+                slow = self.slow_rate and random.random() < self.slow_rate
+                await asyncio.sleep(self.slow_latency if slow else self.latency)
+
+                handler = routes.get(path.split("?", 1)[0])
+                extra_headers = ""
+                if self.error_rate and random.random() < self.error_rate:
+                    status, payload = "429 Too Many Requests", {"error": {"message": "Rate limit reached (mock)",
+                                                                          "type": "requests", "code": "rate_limit_exceeded"}}
+                    extra_headers = "Retry-After-Ms: 20\r\n"
+                elif method != "POST" or handler is None:
+                    status, payload = "404 Not Found", {"error": {"message": f"No route {method} {path}"}}
+                else:
+                    status, payload = "200 OK", handler(json.loads(raw or b"{}"))
+
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n{extra_headers}\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=2048)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self) -> "MockOpenAIServer":
+        """
+        Run the server on its own event loop in a daemon thread; returns once it is listening.
+        """
+        ready = threading.Event()
+
+        def _run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=_run, daemon=True).start()
+        ready.wait()
+        return self
+
+    def start_in_subprocess(self) -> multiprocessing.Process:
+        """
+        Run the server in a separate process (so it does not compete for the GIL
+        with the code under test); returns once it accepts connections.
+        Terminate the returned process when done.
+        """
+        if not self.port:
+            with socket.socket() as probe:
+                probe.bind((self.host, 0))
+                self.port = probe.getsockname()[1]
+
+        proc = multiprocessing.Process(
+            target=_serve,
+            args=(self.host, self.port, self.latency, self.dim, self.error_rate, self.slow_rate, self.slow_latency),
+            daemon=True,
+        )
+        proc.start()
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                socket.create_connection((self.host, self.port), timeout=0.2).close()
+                return proc
+            except OSError:
+                time.sleep(0.05)
+        proc.terminate()
+        raise RuntimeError(f"Mock OpenAI server did not start on {self.base_url}")
+
+
+def _serve(host: str, port: int, latency: float, dim: int, error_rate: float, slow_rate: float,
+           slow_latency: float) -> None:
+    asyncio.run(MockOpenAIServer(host, port, latency, dim, error_rate, slow_rate, slow_latency).serve_forever())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock OpenAI API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, args.latency, args.dim, args.error_rate, args.slow_rate,
+                              args.slow_latency)
+    print(f"Mock OpenAI API listening on {server.base_url} (latency={args.latency}s)")
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Labeled paraphrase set for the semantic cache benchmark.
+
+Each group holds paraphrases of one request; a cache hit is correct only if
+the cached answer came from a query of the same group. Several groups share
+wording but ask for different things ("razboi" vs "pace", "magie" vs
+"magie si prietenie"), so a threshold that is too low shows up as false hits.
+"""
+
+PARAPHRASE_GROUPS = {
+    "war": [
+        "carte despre razboi",
+        "Ce recomanzi pentru povesti de razboi?",
+        "Vreau o carte despre război",
+        "o poveste din timpul razboiului",
+        "recomanda-mi un roman despre razboi",
+    ],
+    "peace": [
+        "carte despre pace",
+        "Ce recomanzi despre pace si impacare?",
+        "Vreau o carte despre pace",
+        "o poveste despre pace dupa conflict",
+    ],
+    "magic_friendship": [
+        "Vreau o carte despre prietenie și magie",
+        "o poveste cu magie si prieteni",
+        "carte despre vrajitori si prietenie",
+        "Ce recomanzi despre magie si prietenie?",
+    ],
+    "magic": [
+        "carte despre magie",
+        "Vreau o carte cu vrajitori",
+        "o poveste plina de magie",
+        "Ce recomanzi despre vraji si magie?",
+    ],
+    "dystopia": [
+        "carte despre o societate totalitara",
+        "Vreau o distopie despre supraveghere",
+        "o poveste despre un stat care controleaza totul",
+        "Ce recomanzi despre regimuri totalitare?",
+    ],
+    "love": [
+        "Vreau o carte de dragoste",
+        "o poveste romantica",
+        "carte despre iubire si casatorie",
+        "Ce recomanzi pentru o poveste de dragoste?",
+    ],
+    "friendship": [
+        "carte despre prietenie",
+        "Vreau o carte despre prieteni adevarati",
+        "o poveste despre prietenie",
+        "Ce recomanzi despre prietenie?",
+    ],
+    "spirituality": [
+        "Vreau o carte despre spiritualitate",
+        "carte despre cautarea sensului vietii",
+        "o poveste despre destin si vise",
+        "Ce recomanzi despre spiritualitate?",
+    ],
+    "justice": [
+        "carte despre nedreptate si rasism",
+        "Vreau o carte despre justitie",
+        "o poveste despre un proces nedrept",
+        "Ce recomanzi despre discriminare?",
+    ],
+    "animals": [
+        "Ai o carte despre animale?",
+        "carte cu animale",
+        "Vreau o poveste cu animale care vorbesc",
+        "o carte despre animalele unei ferme",
+    ],
+    "adventure": [
+        "carte de aventuri",
+        "Vreau o poveste de aventura",
+        "o calatorie plina de aventuri",
+        "Ce recomanzi pentru aventuri si calatorii?",
+    ],
+    "children": [
+        "carte pentru copii",
+        "Vreau o carte pentru copilul meu",
+        "o poveste potrivita pentru copii",
+        "Ce recomanzi pentru cei mici?",
+    ],
+}
@@ -0,0 +1,304 @@
+"""
+Offline benchmark and regression suite for the retrieval + selection pipeline.
+
+`run` generates deterministic catalogues (`benchmarks.catalogue`) of each size in a
+temporary working directory, so the repository's `db/` is never touched. It then
+measures the pipeline with `HashingEmbeddingFunction` embeddings and the `FakeOpenAI`
+chat client, without any network access:
+
+- parse_book_summaries and populate_chroma (first sync and no-op re-sync): duration and books/s;
+- search_books: latency percentiles, throughput, and recall@k on labeled title and plot queries;
+- run_agent: latency percentiles and accuracy@1 of the recommended title;
+- is_clean and extract_chosen_title: latency percentiles and throughput.
+
+Results are written as JSON (with the git commit), and `compare` diffs two result
+files, exiting with status 1 when a gated metric regressed beyond the thresholds.
+Gated metrics are p50/p95 latencies, batch durations, recall@k and accuracy@1.
+Chroma's approximate (HNSW) search makes recall vary slightly between identical runs.
+
+Usage:
+    python -m benchmarks.suite run [--sizes 10 1000 10000] [--queries 200] [--out results.json]
+    python -m benchmarks.suite compare base.json new.json [--threshold 0.20] [--recall-tolerance 0.02]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from typing import Dict, List
+
+from chatbot import agent, retriever
+from chatbot.embedding_cache import EmbeddingCache
+from chatbot.openai_clients import get_request_layer, set_client
+from tools.image_generator import extract_chosen_title
+from tools.language_filter import get_matcher, is_clean
+from benchmarks.catalogue import generate_catalogue, labeled_queries
+from benchmarks.fakes import FakeOpenAI, HashingEmbeddingFunction
+
+
+RECALL_K = (1, 5, 10)
+# Metrics that can fail `compare`; the others (means, p99, throughput) are informational
+GATED_SUFFIXES = ("p50_ms", "p95_ms", "duration_s")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    pct = lambda q: round(ordered[int(q * (len(ordered) - 1))] * 1000, 4)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "throughput_per_s": round(len(ordered) / sum(ordered), 1) if sum(ordered) else 0.0,
+    }
+
+
+def _batch_stats(seconds: List[float], books: int) -> Dict[str, float]:
+    best = min(seconds)
+    return {"duration_s": round(best, 4), "books_per_s": round(books / best, 1) if best else 0.0}
+
+
+def _timed(fn, items) -> List[float]:
+    samples = []
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(RESULTS_DIR), timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=os.path.dirname(RESULTS_DIR), timeout=30)
+        return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "") if out.returncode == 0 else "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def _reset_pipeline(dim: int) -> None:
+    # Fresh Chroma client, indexes and caches for the catalogue in the current directory
+    # (Chroma caches clients by path string, hence the absolute path)
+    retriever.CHROMA_PATH = os.path.abspath("db/chroma_db")
+    retriever._chroma_client = None
+    retriever._bm25_index = None
+    retriever._numpy_index = None
+    retriever.RETRIEVER_BACKEND = "chroma"
+    retriever.embedding_cache = EmbeddingCache(path=None)
+    retriever.set_embedding_function(HashingEmbeddingFunction(dim=dim))
+    agent.answer_cache.clear()
+
+
+def _run_size(books: int, args) -> Dict:
+    path = retriever.BOOK_SUMMARIES_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    catalogue = generate_catalogue(path, books, seed=args.seed)
+    queries = labeled_queries(catalogue, args.queries, seed=args.seed)
+    _reset_pipeline(args.dim)
+    results = {}
+
+    results["parse_book_summaries"] = _batch_stats(
+        _timed(retriever.parse_book_summaries, [path] * args.repeat), books)
+
+    with redirect_stdout(StringIO()):
+        results["populate_chroma"] = _batch_stats(_timed(lambda p: retriever.populate_chroma(p), [path]), books)
+        results["populate_chroma_unchanged"] = _batch_stats(
+            _timed(lambda p: retriever.populate_chroma(p), [path] * args.repeat), books)
+
+    # Search: every query is embedded (no cache hits), ranks feed recall@k
+    ranks, latencies = [], []
+    for q in queries:
+        retriever.embedding_cache.clear()
+        t0 = time.perf_counter()
+        found = retriever.search_books(q["query"], n_results=max(RECALL_K))
+        latencies.append(time.perf_counter() - t0)
+        titles = [m["title"] for m in found["metadatas"][0]]
+        ranks.append(titles.index(q["expected"]) + 1 if q["expected"] in titles else None)
+    results["search_books"] = _latency_stats(latencies)
+
+    recall = {}
+    for kind in ("title", "plot", "all"):
+        kind_ranks = [r for r, q in zip(ranks, queries) if kind == "all" or q["kind"] == kind]
+        if kind_ranks:
+            recall[kind] = {f"recall@{k}": round(sum(r is not None and r <= k for r in kind_ranks) / len(kind_ranks), 4)
+                            for k in RECALL_K}
+    results["recall"] = recall
+
+    agent_queries = queries[:args.agent_queries]
+    agent.answer_cache.clear()
+    replies = []
+    with redirect_stdout(StringIO()):
+        latencies = _timed(lambda q: replies.append(agent.run_agent(q["query"])), agent_queries)
+    correct = sum(extract_chosen_title(r) == q["expected"] for r, q in zip(replies, agent_queries))
+    results["run_agent"] = {**_latency_stats(latencies), "accuracy@1": round(correct / len(agent_queries), 4)}
+
+    get_matcher()
+    texts = [q["query"] for q in queries]
+    results["is_clean"] = _latency_stats(_timed(is_clean, texts * args.repeat))
+
+    fake_replies = [f"Recomandare: {b['title']}\n\nRezumat: {b['protagonist']} din {b['place']}."
+                    for b in catalogue[:args.queries]]
+    results["extract_chosen_title"] = _latency_stats(_timed(extract_chosen_title, fake_replies * args.repeat))
+
+    return results
+
+
+def _print_size(books: int, results: Dict) -> None:
+    print(f"\n[{books} books]")
+    for name in ("parse_book_summaries", "populate_chroma", "populate_chroma_unchanged"):
+        r = results[name]
+        print(f"  {name:<26} {r['duration_s'] * 1000:10.1f} ms  {r['books_per_s']:12.0f} books/s")
+    for name in ("search_books", "run_agent", "is_clean", "extract_chosen_title"):
+        r = results[name]
+        extra = f"  accuracy@1={r['accuracy@1']:.3f}" if "accuracy@1" in r else ""
+        print(f"  {name:<26} p50={r['p50_ms']:8.3f} ms  p95={r['p95_ms']:8.3f} ms  "
+              f"p99={r['p99_ms']:8.3f} ms  {r['throughput_per_s']:10.0f}/s{extra}")
+    for kind, values in results["recall"].items():
+        print(f"  recall ({kind:<5})             " + "  ".join(f"{k}={v:.3f}" for k, v in values.items()))
+
+
+def run(args) -> None:
+    out = os.path.abspath(args.out or os.path.join(RESULTS_DIR, f"suite-{_git_commit()}.json"))
+    set_client(FakeOpenAI(latency=0.0))
+    get_request_layer().configure_rate_limits(None)
+    # run_agent is measured uncached (see benchmarks.bench_semantic_cache for the semantic cache)
+    agent.SEMANTIC_CACHE_ENABLED = False
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k != "func"},
+        },
+        "sizes": {},
+    }
+
+    cwd = os.getcwd()
+    workdirs = []
+    try:
+        for books in args.sizes:
+            workdir = tempfile.mkdtemp(prefix=f"bench_suite_{books}_")
+            workdirs.append(workdir)
+            os.chdir(workdir)
+            report["sizes"][str(books)] = _run_size(books, args)
+            _print_size(books, report["sizes"][str(books)])
+    finally:
+        os.chdir(cwd)
+        for workdir in workdirs:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+
+def _flatten(report: Dict) -> Dict[str, float]:
+    flat = {}
+
+    def _walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                _walk(f"{prefix}/{key}" if prefix else key, child)
+        elif isinstance(value, (int, float)) and not prefix.endswith("/n"):
+            flat[prefix] = float(value)
+
+    _walk("", report["sizes"])
+    return flat
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("per_s") or "recall@" in metric or "accuracy@" in metric
+
+
+def _is_quality(metric: str) -> bool:
+    return "recall@" in metric or "accuracy@" in metric
+
+
+def compare(args) -> int:
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"base: {base['meta']['commit']} ({base['meta']['timestamp']})")
+    print(f"new:  {new['meta']['commit']} ({new['meta']['timestamp']})\n")
+
+    old_values, new_values = _flatten(base), _flatten(new)
+    regressions = 0
+    for metric in sorted(set(old_values) & set(new_values), key=lambda m: (int(m.split("/")[0]), m)):
+        old, value = old_values[metric], new_values[metric]
+        gated = _is_quality(metric) or metric.endswith(GATED_SUFFIXES)
+        if _is_quality(metric):
+            change = round(value - old, 6)
+            worse = change < -args.recall_tolerance
+            better = change > args.recall_tolerance
+            shown = f"{change:+.3f}"
+        else:
+            change = (value - old) / old if old else 0.0
+            if _higher_is_better(metric):
+                change = -change
+            # Sub-`min_delta_ms` differences are timer noise
+            significant = not metric.endswith("_ms") or abs(value - old) >= args.min_delta_ms
+            worse = significant and change > args.threshold
+            better = significant and change < -args.threshold
+            shown = f"{(value - old) / old * 100 if old else 0.0:+7.1f}%"
+        mark = "REGRESSION" if worse and gated else ("improved" if better and gated else "")
+        regressions += bool(worse and gated)
+        if mark or args.all:
+            print(f"  {metric:<58} {old:12.4f} -> {value:12.4f}  {shown:>9}  {mark}")
+
+    only = set(old_values) ^ set(new_values)
+    if only:
+        print(f"\n  {len(only)} metrics present in only one file (e.g. different --sizes)")
+    print(f"\n{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and write a JSON result file")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000],
+                            help="Catalogue sizes (e.g. 10 1000 100000 1000000)")
+    run_parser.add_argument("--queries", type=int, default=200, help="Labeled search queries per size")
+    run_parser.add_argument("--agent-queries", type=int, default=50, help="Queries answered with run_agent")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Repetitions of the cheap measurements")
+    run_parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--out", help="Result file (default: benchmarks/results/suite-<commit>.json)")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Diff two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.20,
+                                help="Relative slowdown (or throughput drop) counted as a regression")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                                help="Latency differences below this are ignored")
+    compare_parser.add_argument("--recall-tolerance", type=float, default=0.02,
+                                help="Absolute drop of recall@k / accuracy@1 counted as a regression")
+    compare_parser.add_argument("--all", action="store_true", help="Also list unchanged and informational metrics")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    status = args.func(args)
+    sys.exit(status or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,37 @@
-import os, json
-from typing import List, Optional
-from openai import OpenAI
-from chatbot.retriever import search_books
+import json, time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from chatbot.answer_cache import AnswerCache
+from chatbot.memory import ConversationMemory
+from chatbot.openai_clients import get_async_client, get_client
+from chatbot.reranker import RERANK_CANDIDATES, confident_pick, rerank
+from chatbot.retriever import aembed_query, asearch_books, embed_query, get_bm25_index, on_reingest, search_books
+from chatbot.semantic_cache import SEMANTIC_CACHE_ENABLED, SemanticCache
+from chatbot.tracing import current_span, span, traced
+from tools.summary_store import edit_distance, title_key
 from tools.summary_tool import get_summary_by_title
 
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
+# Answers and title selections are cached per model; re-ingesting the corpus clears them
+answer_cache = AnswerCache(maxsize=2048, ttl=3600)
+on_reingest(answer_cache.clear)
 
-client = OpenAI(api_key=openai_api_key)
+# Answers for paraphrased queries ("carte despre razboi" / "Ce recomanzi pentru povesti de razboi?")
+semantic_cache = SemanticCache()
+on_reingest(semantic_cache.clear)
+
+# Fast path: if the best reranked candidate is this close (Chroma L2 distance on normalized
+# embeddings, i.e. 2 - 2*cosine) and its rerank score clearly ahead of the runner-up, skip the
+# LLM. Scores are in cosine units: a 0.025 margin equals the former 0.05 distance margin.
+FAST_PATH_MAX_DISTANCE = 0.75
+FAST_PATH_MIN_MARGIN = 0.025
+
+# Replies without a recommendation (never cached)
+NO_RESULTS_REPLY = "Nu am gasit nicio carte relevanta in baza de date."
+NO_MATCH_REPLY = "Nu am gasit o potrivire suficient de buna pentru cererea ta."
+
+# Ambiguous picks go to the LLM selector with the top reranked titles and a summary excerpt each
+SELECTOR_CANDIDATES = 3
+SELECTOR_SNIPPET_CHARS = 300
 
 # Tool definition for the summary retrieval function
 # This is the OpenAI "function calling" format
@@ -25,56 +49,132 @@ summary_tool_definition = {
 }
 
 
-def choose_title_llm(query: str, candidates: List[str], model: str = "gpt-4o-mini") -> Optional[str]:
+def _snippet(summary: str, limit: int = SELECTOR_SNIPPET_CHARS) -> str:
     """
-    Model returns exactly ONE title from candidates or 'NONE'.
+    First `limit` characters of `summary` on one line, cut at a word boundary.
+    """
+    text = " ".join((summary or "").split())
+    if len(text) <= limit:
+        return text
+
+    return text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def _selector_messages(query: str, candidates: List[str], summaries: Optional[List[str]] = None) -> List[dict]:
+    """
+    Chat messages asking the model to pick exactly ONE of `candidates` (or 'NONE').
+
+    With `summaries` (parallel to `candidates`), each title is followed by an
+    indented summary excerpt so the model can judge plot queries, not just titles.
     """
-    if not candidates:
-        return None
-    
     system = (
-        "You are a strict selector. From the provided list of titles, choose EXACTLY ONE that best matches "
-        "the user query. If none fit, reply with EXACTLY 'NONE'. Reply with the title string only."
+        "You are a strict selector. From the provided list of titles (each may be followed by an excerpt "
+        "of its summary), choose EXACTLY ONE that best matches the user query. If none fit, reply with "
+        "EXACTLY 'NONE'. Reply with the title string only."
     )
 
-    titles_block = "\n".join(f"- {t}" for t in candidates)
+    lines = []
+    for i, title in enumerate(candidates):
+        lines.append(f"- {title}")
+        if summaries and i < len(summaries) and summaries[i]:
+            lines.append(f"  {_snippet(summaries[i])}")
+    titles_block = "\n".join(lines)
     user = f"User query: {query}\n\nTitles:\n{titles_block}\n\nAnswer with one title or NONE."
 
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=0,
-        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-    )
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+def _parse_selection(content: Optional[str], candidates: List[str]) -> Optional[str]:
+    """
+    Map the selector's raw reply to a candidate title (None for 'NONE' or unknown titles).
 
-    raw = (resp.choices[0].message.content or "").strip()
+    The reply does not have to match exactly: quotes, markdown emphasis, a trailing
+    period, a "Title:" prefix, case, diacritics and punctuation are ignored; a reply
+    that mentions exactly one candidate, is part of exactly one, or is within 2 edits
+    of exactly one, maps to it.
+    """
+    raw = (content or "").strip().strip("\"'`*«»„“” ").rstrip(".").strip()
+    for prefix in ("title:", "titlu:", "recomandare:"):
+        if raw.lower().startswith(prefix):
+            raw = raw[len(prefix):].strip().strip("\"'`*«»„“” ")
 
-    if raw == "NONE":
+    if raw in candidates:
+        return raw
+    if not raw or raw.upper() == "NONE":
         return None
-    
-    return raw if raw in candidates else None
 
+    key = title_key(raw)
+    keys = {title_key(c): c for c in candidates}
+    if key in keys:
+        return keys[key]
 
-def run_agent(user_query: str, model: str = "gpt-4o-mini") -> str:
+    # "I recommend 1984 by George Orwell": a unique mention, ignoring titles inside a longer mentioned one
+    padded = f" {key} "
+    mentioned = [k for k in keys if k and f" {k} " in padded]
+    mentioned = [k for k in mentioned if not any(k != other and f" {k} " in f" {other} " for other in mentioned)]
+    if len(mentioned) == 1:
+        return keys[mentioned[0]]
+
+    # A shortened title ("Hobbit" for "The Hobbit")
+    if len(key) >= 5:
+        containing = [k for k in keys if f" {key} " in f" {k} "]
+        if len(containing) == 1:
+            return keys[containing[0]]
+
+    # Small typos ("The Hobit")
+    if len(key) >= 5:
+        close = [k for k in keys if len(k) >= 5 and edit_distance(key, k, 2) <= 2]
+        if len(close) == 1:
+            return keys[close[0]]
+
+    return None
+
+
+def choose_title_llm(query: str, candidates: List[str], model: str = "gpt-4o-mini",
+                     summaries: Optional[List[str]] = None) -> Optional[str]:
     """
-    Agent that finds and summarizes a book based on user query.
+    Model returns exactly ONE title from candidates or 'NONE'.
+
+    `summaries`, parallel to `candidates`, are shown to the model as short excerpts.
     """
-    # 1) Retrieve candidates
-    results = search_books(user_query)
-    matched_titles = [m["title"] for m in results.get("metadatas", [[]])[0]]
-    print("Matched titles:", matched_titles)
+    if not candidates:
+        return None
 
-    if not matched_titles:
-        return "Nu am gasit nicio carte relevanta in baza de date."
+    with span("choose_title_llm", model=model) as s:
+        resp = get_client().chat.completions.create(
+            model=model,
+            temperature=0,
+            messages=_selector_messages(query, candidates, summaries),
+        )
+        s.record_usage(getattr(resp, "usage", None))
 
-    # 2) Choose ONE title (no tools here)
-    chosen = choose_title_llm(user_query, matched_titles, model=model)
-    print("Chosen title:", chosen)
+    return _parse_selection(resp.choices[0].message.content, candidates)
 
-    if not chosen:
-        return "Nu am gasit o potrivire suficient de buna pentru cererea ta."
 
-    # 3) Force the tool call to get the summary for that exact title
-    messages = [
+async def achoose_title_llm(query: str, candidates: List[str], model: str = "gpt-4o-mini",
+                            summaries: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Async `choose_title_llm`, using the shared `AsyncOpenAI` client.
+    """
+    if not candidates:
+        return None
+
+    with span("choose_title_llm", model=model) as s:
+        resp = await get_async_client().chat.completions.create(
+            model=model,
+            temperature=0,
+            messages=_selector_messages(query, candidates, summaries),
+        )
+        s.record_usage(getattr(resp, "usage", None))
+
+    return _parse_selection(resp.choices[0].message.content, candidates)
+
+
+def _tool_call_messages(chosen: str) -> List[dict]:
+    """
+    Chat messages making the model call `get_summary_by_title` with exactly `chosen`.
+    """
+    return [
         {
             "role": "system",
             "content": (
@@ -88,26 +188,565 @@ def run_agent(user_query: str, model: str = "gpt-4o-mini") -> str:
         },
     ]
 
-    # Force the tool call here (no 'auto'):
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        tools=[summary_tool_definition],
-        tool_choice={"type": "function", "function": {"name": "get_summary_by_title"}},
-        temperature=0,
-    )
 
-    msg = response.choices[0].message
+def _tool_call_request(chosen: str, model: str) -> dict:
+    # Force the tool call here (no 'auto')
+    return {
+        "model": model,
+        "messages": _tool_call_messages(chosen),
+        "tools": [summary_tool_definition],
+        "tool_choice": {"type": "function", "function": {"name": "get_summary_by_title"}},
+        "temperature": 0,
+    }
+
 
+def _run_tool_call(msg, chosen: str) -> str:
+    """
+    Execute the `get_summary_by_title` call of the model's message `msg`.
+    """
     # It must contain a tool call now
     if not msg.tool_calls:
         # Defensive fallback – but with forced tool_choice this shouldn't happen
-        summary = get_summary_by_title(chosen)
-        return f"Recomandare: {chosen}\n\n{summary}"
+        return get_summary_by_title(chosen)
 
     tool_call = msg.tool_calls[0]
     args = json.loads(tool_call.function.arguments or "{}")
     title_arg = args.get("title") or chosen
-    summary = get_summary_by_title(title_arg)
 
-    return f"Recomandare: {chosen}\n\n{summary}"
+    return get_summary_by_title(title_arg)
+
+
+def _summary_via_tool_call(chosen: str, model: str) -> str:
+    """
+    Fetch the summary of `chosen` through a forced `get_summary_by_title` tool call.
+    """
+    with span("tool_call", model=model) as s:
+        response = get_client().chat.completions.create(**_tool_call_request(chosen, model))
+        s.record_usage(getattr(response, "usage", None))
+
+    return _run_tool_call(response.choices[0].message, chosen)
+
+
+async def _asummary_via_tool_call(chosen: str, model: str) -> str:
+    """
+    Async `_summary_via_tool_call`, using the shared `AsyncOpenAI` client.
+    """
+    with span("tool_call", model=model) as s:
+        response = await get_async_client().chat.completions.create(**_tool_call_request(chosen, model))
+        s.record_usage(getattr(response, "usage", None))
+
+    return _run_tool_call(response.choices[0].message, chosen)
+
+
+def _semantic_lookup(model: str, user_query: str, vector: List[float]) -> Optional[Dict]:
+    with span("semantic_cache", model=model) as s:
+        found = semantic_cache.get(model, vector)
+        s.set(cache_hit=found is not None, similarity=found[1] if found else None)
+    if found is None:
+        return None
+
+    # Later repeats of this exact query are served by the exact-match level
+    answer_cache.put_reply(model, user_query, found[0])
+    return found[0]
+
+
+def _store_answer(model: str, user_query: str, vector: Optional[List[float]], answer: Dict) -> None:
+    """
+    Cache a final answer by exact query and, if the query was embedded, by meaning.
+    """
+    answer_cache.put_reply(model, user_query, answer)
+    if vector is not None:
+        semantic_cache.put(model, vector, answer)
+
+
+def _selector_input(ranked: List[Dict]) -> Tuple[List[str], List[str]]:
+    """
+    Titles and summaries of the top `SELECTOR_CANDIDATES` reranked candidates, for the LLM selector.
+    """
+    top = ranked[:SELECTOR_CANDIDATES]
+
+    return [c["title"] for c in top], [c["document"] for c in top]
+
+
+def _with_memory(user_query: str, memory: Optional[ConversationMemory]) -> Tuple[str, List[str]]:
+    """
+    Retrieval/selection query for `user_query` in the conversation held by `memory`, and the titles to exclude.
+
+    A book the user names explicitly ("Ce este 1984?") is never excluded.
+    """
+    if memory is None:
+        return user_query, []
+
+    exclude = memory.excluded_titles()
+    if exclude:
+        index = get_bm25_index()
+        row = index.match_title(user_query)
+        if row is not None:
+            exclude = [title for title in exclude if title != index.metadatas[row]["title"]]
+
+    return memory.contextualize(user_query), exclude
+
+
+def _recommendation_header(title: str) -> str:
+    """
+    First line(s) of a recommendation reply, followed by the summary.
+    """
+    return f"Recomandare: {title}\n\n"
+
+
+class _Turn:
+    """
+    One query through the steps shared by `run_agent`, `recommend`, `arecommend` and `stream_agent`.
+
+    The entry points keep only their own I/O (embedding, search, selection and summary
+    calls: sync, async or streamed). Everything around it lives here: the conversation
+    context, the answer and semantic cache lookups, reranking, the no-LLM pick, the
+    reply text, and the cache and memory writes.
+
+    Args:
+        user_query: Query as typed by the user.
+        model: Chat model (part of every cache key).
+        memory: Conversation memory of the session (see `recommend`).
+        semantic_cache: Look up paraphrases in `semantic_cache` (None: `SEMANTIC_CACHE_ENABLED`).
+    """
+
+    def __init__(self, user_query: str, model: str, memory: Optional[ConversationMemory] = None,
+                 semantic_cache: Optional[bool] = None):
+        self.user_query = user_query
+        self.model = model
+        self.memory = memory
+        # Contextualized queries and exclusions depend on the conversation: no reply cache then
+        self.query, self.exclude = _with_memory(user_query, memory)
+        self.cacheable = self.query == user_query and not self.exclude
+        enabled = SEMANTIC_CACHE_ENABLED if semantic_cache is None else semantic_cache
+        # Queries naming a title are answered from the BM25 index without an embedding request
+        self.semantic = self.cacheable and enabled and get_bm25_index().match_title(user_query) is None
+        self.vector: Optional[List[float]] = None
+        self.ranked: List[Dict] = []
+        self.candidates: List[str] = []
+        self.selector_titles: List[str] = []
+        self.selector_summaries: List[str] = []
+
+    def cached(self) -> Optional[Dict]:
+        """
+        Answer cached for the exact query, or None (also when the query depends on the conversation).
+        """
+        return answer_cache.get_reply(self.model, self.user_query) if self.cacheable else None
+
+    def semantic_cached(self, vector: List[float]) -> Optional[Dict]:
+        """
+        Answer cached for a paraphrase, given the query embedding (kept for caching the new answer).
+
+        Only called when `semantic` is set; the embedding is cached, so the retrieval that
+        follows a miss reuses it.
+        """
+        self.vector = vector
+        return _semantic_lookup(self.model, self.user_query, vector)
+
+    def use_candidates(self, titles: List[str], summaries: List[str]) -> None:
+        """
+        Take the retrieved books as they are: all of them are candidates for the selector.
+        """
+        self.candidates = self.selector_titles = titles
+        self.selector_summaries = summaries
+
+    def rank(self, results: dict) -> List[str]:
+        """
+        Rerank the retrieved books (see `chatbot.reranker.rerank`); returns their titles, best first.
+        """
+        self.ranked = rerank(self.query, results)
+        self.candidates = [c["title"] for c in self.ranked]
+        self.selector_titles, self.selector_summaries = _selector_input(self.ranked)
+        return self.candidates
+
+    def pick(self, max_distance: Optional[float] = None, min_margin: float = FAST_PATH_MIN_MARGIN) -> Optional[str]:
+        """
+        Title chosen without a selector call, or None if the selector is needed.
+
+        With `max_distance`, a confident reranked pick (see `confident_pick`); otherwise, or
+        if none, an earlier selection for the same query and candidates.
+        """
+        chosen = confident_pick(self.ranked, max_distance, min_margin) if max_distance is not None else None
+        if chosen is None:
+            chosen = answer_cache.get_selection(self.model, self.selector_titles, self.query)
+
+        return chosen
+
+    def selected(self, chosen: Optional[str]) -> Optional[str]:
+        """
+        Remember the selector's choice for the same query and candidates; returns it.
+        """
+        if chosen:
+            answer_cache.put_selection(self.model, self.selector_titles, self.query, chosen)
+
+        return chosen
+
+    def remember(self, reply: str, title: Optional[str]) -> None:
+        """
+        Record the answer in the conversation memory, if any.
+        """
+        if self.memory is not None:
+            self.memory.add_turn(self.user_query, reply, title)
+
+    def reply(self, chosen: Optional[str], summary: str = "") -> str:
+        """
+        Final reply for `chosen` (or the no-result / no-match message), cached if it is a
+        recommendation for a cacheable query, and recorded in memory.
+        """
+        if not self.candidates:
+            reply = NO_RESULTS_REPLY
+        elif not chosen:
+            reply = NO_MATCH_REPLY
+        else:
+            reply = _recommendation_header(chosen) + summary
+            if self.cacheable:
+                _store_answer(self.model, self.user_query, self.vector,
+                              {"reply": reply, "title": chosen, "candidates": self.candidates})
+        self.remember(reply, chosen)
+
+        return reply
+
+    def cached_result(self, cached: Dict, timings: Dict[str, float], start: float) -> Dict:
+        """
+        `recommend` result for a cache hit.
+        """
+        self.remember(cached["reply"], cached["title"])
+        timings["total"] = time.perf_counter() - start
+
+        return {**cached, "llm_calls": 0, "cached": True, "timings": timings}
+
+    def result(self, chosen: Optional[str], summary: str, llm_calls: int, timings: Dict[str, float],
+               start: float) -> Dict:
+        """
+        `recommend` result for a computed answer.
+        """
+        reply = self.reply(chosen, summary)
+        timings["total"] = time.perf_counter() - start
+
+        return {"reply": reply, "title": chosen, "candidates": self.candidates, "llm_calls": llm_calls,
+                "cached": False, "timings": timings}
+
+
+@traced("run_agent")
+def run_agent(user_query: str, model: str = "gpt-4o-mini") -> str:
+    """
+    Agent that finds and summarizes a book based on user query.
+    """
+    turn = _Turn(user_query, model)
+    cached = turn.cached()
+    if cached is None and turn.semantic:
+        cached = turn.semantic_cached(embed_query(user_query))
+    current_span().set(model=model, cache_hit=cached is not None)
+    if cached is not None:
+        print("Answer cache hit:", cached["title"])
+        return cached["reply"]
+
+    # 1) Retrieve candidates
+    results = search_books(user_query)
+    turn.use_candidates([m["title"] for m in results.get("metadatas", [[]])[0]],
+                        (results.get("documents") or [[]])[0])
+    print("Matched titles:", turn.candidates)
+
+    if not turn.candidates:
+        return turn.reply(None)
+
+    # 2) Choose ONE title (no tools here); reuse a previous choice for the same candidates
+    chosen = turn.pick()
+    if chosen is None:
+        chosen = turn.selected(choose_title_llm(user_query, turn.selector_titles, model=model,
+                                                summaries=turn.selector_summaries))
+    print("Chosen title:", chosen)
+
+    if not chosen:
+        return turn.reply(None)
+
+    # 3) Force the tool call to get the summary for that exact title
+    return turn.reply(chosen, _summary_via_tool_call(chosen, model=model))
+
+
+@traced("recommend")
+def recommend(
+    user_query: str,
+    model: str = "gpt-4o-mini",
+    max_distance: float = FAST_PATH_MAX_DISTANCE,
+    min_margin: float = FAST_PATH_MIN_MARGIN,
+    memory: Optional[ConversationMemory] = None,
+    semantic_cache: Optional[bool] = None,
+) -> Dict:
+    """
+    Single-call agent: retrieve candidates, choose ONE title and fetch its summary locally.
+
+    Needs at most one chat completion per query. `RERANK_CANDIDATES` books are
+    retrieved and reranked locally (see `chatbot.reranker.rerank`); when the top one
+    is within `max_distance` and its score ahead of the runner-up by at least
+    `min_margin`, the title is picked deterministically and no LLM call is made.
+    Otherwise the LLM chooses among the top `SELECTOR_CANDIDATES`, seeing summary
+    excerpts. The summary is always read from `get_summary_by_title` directly (no
+    forced tool call round-trip).
+    Answers and selections are served from `answer_cache` when possible.
+
+    Args:
+        user_query: Natural language request from the user.
+        model: Chat model used when the selection is ambiguous.
+        max_distance: Highest top-1 distance accepted for the no-LLM path.
+        min_margin: Minimum rerank score gap between top-1 and top-2 for the no-LLM path.
+        memory: Conversation memory of the session. Follow-up queries ("ceva asemanator
+            cu ultima") are extended with its context, recently recommended books are
+            excluded from retrieval, and the answer is recorded in it.
+        semantic_cache: Serve paraphrases from the semantic cache (None: `SEMANTIC_CACHE_ENABLED`).
+
+    Returns:
+        dict with keys:
+            reply (str): Final answer text (same format as `run_agent`).
+            title (Optional[str]): Chosen title, or None.
+            candidates (List[str]): Retrieved titles, best reranked first.
+            llm_calls (int): Number of chat completions made (0 or 1).
+            cached (bool): True if the whole answer came from `answer_cache`.
+            timings (Dict[str, float]): Per-stage wall time in seconds
+                ("search", "select" including the rerank, "summary", "total"; only "total" on a cache hit).
+    """
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+
+    turn = _Turn(user_query, model, memory, semantic_cache)
+    cached = turn.cached()
+    if cached is None and turn.semantic:
+        cached = turn.semantic_cached(embed_query(user_query))
+    current_span().set(model=model, cache_hit=cached is not None)
+    if cached is not None:
+        return turn.cached_result(cached, timings, start)
+
+    # 1) Retrieve candidates (one embedding request)
+    t0 = time.perf_counter()
+    results = search_books(turn.query, n_results=RERANK_CANDIDATES, exclude_titles=turn.exclude)
+    timings["search"] = time.perf_counter() - t0
+
+    # 2) Choose ONE title: deterministic when the top reranked hit is clearly the best
+    t0 = time.perf_counter()
+    chosen, llm_calls, summary = None, 0, ""
+    if turn.rank(results):
+        chosen = turn.pick(max_distance, min_margin)
+        if chosen is None:
+            chosen = turn.selected(choose_title_llm(turn.query, turn.selector_titles, model=model,
+                                                    summaries=turn.selector_summaries))
+            llm_calls = 1
+        timings["select"] = time.perf_counter() - t0
+
+    # 3) Local summary lookup (no tool-call round-trip)
+    if chosen:
+        t0 = time.perf_counter()
+        summary = get_summary_by_title(chosen)
+        timings["summary"] = time.perf_counter() - t0
+
+    return turn.result(chosen, summary, llm_calls, timings, start)
+
+
+def run_agent_fast(user_query: str, model: str = "gpt-4o-mini") -> str:
+    """
+    Drop-in replacement for `run_agent` backed by `recommend` (at most one chat completion).
+    """
+    result = recommend(user_query, model=model)
+    print("Matched titles:", result["candidates"])
+    print("Chosen title:", result["title"])
+    print("Stage timings:", {k: round(v * 1000, 1) for k, v in result["timings"].items()}, "ms")
+
+    return result["reply"]
+
+
+def _stream_selection(query: str, candidates: List[str], model: str,
+                      summaries: Optional[List[str]] = None) -> Optional[str]:
+    """
+    `choose_title_llm` over the streaming chat API (the title is assembled from deltas).
+    """
+    if not candidates:
+        return None
+
+    parts = []
+    with span("choose_title_llm", model=model, stream=True) as s:
+        stream = get_client().chat.completions.create(
+            model=model,
+            temperature=0,
+            messages=_selector_messages(query, candidates, summaries),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for chunk in stream:
+            s.record_usage(getattr(chunk, "usage", None))
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+
+    return _parse_selection("".join(parts), candidates)
+
+
+@traced("stream_agent")
+def stream_agent(user_query: str, model: str = "gpt-4o-mini", fast: bool = False,
+                 memory: Optional[ConversationMemory] = None) -> Iterator[Dict]:
+    """
+    Generator version of the agent that yields progress events as soon as they are known.
+
+    Events (dicts, in order):
+        {"type": "candidates", "titles": [...]}       retrieved titles, best first
+        {"type": "title", "title": str | None}         chosen title
+        {"type": "text", "text": str}                  reply text chunks (join them for the full reply)
+        {"type": "done", "reply": str, "ttfb": float, "total": float, "cached": bool}
+
+    `ttfb` is the time (seconds) until the first "text" event and `total` the full
+    latency, so perceived responsiveness can be tracked separately.
+
+    Args:
+        user_query: Natural language request from the user.
+        model: Chat model used for selection.
+        fast: Use the single-call flow of `recommend` (reranking, confident pick, local summary)
+            instead of the `run_agent` flow (its retrieved candidates, LLM selection + forced tool call).
+        memory: Conversation memory of the session (see `recommend`).
+    """
+    start = time.perf_counter()
+    first_byte = None
+
+    def _text(text: str) -> Dict:
+        nonlocal first_byte
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        return {"type": "text", "text": text}
+
+    def _done(reply: str, cached: bool = False) -> Dict:
+        return {"type": "done", "reply": reply, "ttfb": first_byte, "total": time.perf_counter() - start,
+                "cached": cached}
+
+    turn = _Turn(user_query, model, memory)
+    cached = turn.cached()
+    if cached is None and turn.semantic:
+        cached = turn.semantic_cached(embed_query(user_query))
+    current_span().set(model=model, fast=fast, cache_hit=cached is not None)
+    if cached is not None:
+        turn.remember(cached["reply"], cached["title"])
+        yield {"type": "candidates", "titles": cached["candidates"]}
+        yield {"type": "title", "title": cached["title"]}
+        yield _text(cached["reply"])
+        yield _done(cached["reply"], cached=True)
+        return
+
+    if fast:
+        turn.rank(search_books(turn.query, n_results=RERANK_CANDIDATES, exclude_titles=turn.exclude))
+    else:
+        results = search_books(turn.query, exclude_titles=turn.exclude)
+        turn.use_candidates([m["title"] for m in results.get("metadatas", [[]])[0]],
+                            (results.get("documents") or [[]])[0])
+    yield {"type": "candidates", "titles": turn.candidates}
+
+    chosen = None
+    if turn.candidates:
+        chosen = turn.pick(FAST_PATH_MAX_DISTANCE if fast else None)
+        if chosen is None:
+            chosen = turn.selected(_stream_selection(turn.query, turn.selector_titles, model,
+                                                     summaries=turn.selector_summaries))
+    yield {"type": "title", "title": chosen}
+
+    if not chosen:
+        reply = turn.reply(None)
+        yield _text(reply)
+        yield _done(reply)
+        return
+
+    # The header goes out before the summary is fetched
+    yield _text(_recommendation_header(chosen))
+    summary = get_summary_by_title(chosen) if fast else _summary_via_tool_call(chosen, model=model)
+    reply = turn.reply(chosen, summary)
+
+    yield _text(summary)
+    yield _done(reply)
+
+
+def stream_text(events: Iterable[Dict], on_event: Optional[Callable[[Dict], None]] = None) -> Iterator[str]:
+    """
+    Reduce `stream_agent` events to their text chunks (e.g. for `st.write_stream`).
+
+    Every non-text event is passed to `on_event`, if given.
+    """
+    for event in events:
+        if event["type"] == "text":
+            yield event["text"]
+        elif on_event is not None:
+            on_event(event)
+
+
+@traced("recommend")
+async def arecommend(
+    user_query: str,
+    model: str = "gpt-4o-mini",
+    max_distance: float = FAST_PATH_MAX_DISTANCE,
+    min_margin: float = FAST_PATH_MIN_MARGIN,
+    memory: Optional[ConversationMemory] = None,
+    semantic_cache: Optional[bool] = None,
+) -> Dict:
+    """
+    Async `recommend`: same flow and return value, without blocking the event loop.
+
+    The embedding and selector calls go through the shared `AsyncOpenAI` client;
+    the vector query runs in the default executor (see `asearch_books`). `memory`
+    and `semantic_cache` work as in `recommend`.
+    """
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+
+    turn = _Turn(user_query, model, memory, semantic_cache)
+    cached = turn.cached()
+    if cached is None and turn.semantic:
+        cached = turn.semantic_cached(await aembed_query(user_query))
+    current_span().set(model=model, cache_hit=cached is not None)
+    if cached is not None:
+        return turn.cached_result(cached, timings, start)
+
+    t0 = time.perf_counter()
+    results = await asearch_books(turn.query, n_results=RERANK_CANDIDATES, exclude_titles=turn.exclude)
+    timings["search"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    chosen, llm_calls, summary = None, 0, ""
+    if turn.rank(results):
+        chosen = turn.pick(max_distance, min_margin)
+        if chosen is None:
+            chosen = turn.selected(await achoose_title_llm(turn.query, turn.selector_titles, model=model,
+                                                           summaries=turn.selector_summaries))
+            llm_calls = 1
+        timings["select"] = time.perf_counter() - t0
+
+    if chosen:
+        t0 = time.perf_counter()
+        summary = get_summary_by_title(chosen)
+        timings["summary"] = time.perf_counter() - t0
+
+    return turn.result(chosen, summary, llm_calls, timings, start)
+
+
+@traced("run_agent")
+async def arun_agent(user_query: str, model: str = "gpt-4o-mini") -> str:
+    """
+    Async `run_agent` (same flow and reply, no prints): LLM selection, then a forced tool call.
+
+    The embedding, selector and tool calls go through the shared `AsyncOpenAI` client;
+    the vector query runs in the default executor (see `asearch_books`). For the
+    single-call flow, use `arecommend`.
+    """
+    turn = _Turn(user_query, model)
+    cached = turn.cached()
+    if cached is None and turn.semantic:
+        cached = turn.semantic_cached(await aembed_query(user_query))
+    current_span().set(model=model, cache_hit=cached is not None)
+    if cached is not None:
+        return cached["reply"]
+
+    results = await asearch_books(user_query)
+    turn.use_candidates([m["title"] for m in results.get("metadatas", [[]])[0]],
+                        (results.get("documents") or [[]])[0])
+    if not turn.candidates:
+        return turn.reply(None)
+
+    chosen = turn.pick()
+    if chosen is None:
+        chosen = turn.selected(await achoose_title_llm(user_query, turn.selector_titles, model=model,
+                                                       summaries=turn.selector_summaries))
+    if not chosen:
+        return turn.reply(None)
+
+    return turn.reply(chosen, await _asummary_via_tool_call(chosen, model=model))
@@ -0,0 +1,77 @@
+import threading
+from typing import Dict, Optional, Sequence
+
+from cachetools import TTLCache
+
+from chatbot.text_utils import query_fingerprint
+
+
+class AnswerCache:
+    """
+    Two-level, TTL- and size-bounded cache for agent answers.
+
+    Level 1 ("replies"): (model, query fingerprint) -> final answer dict.
+    Level 2 ("selections"): (model, candidate title set, query fingerprint) -> chosen title,
+    so a query whose reply is not cached at level 1 but retrieves the same candidates skips
+    `choose_title_llm`: follow-ups rewritten by the conversation memory (their replies are
+    never cached) and queries whose reply expired or was evicted.
+
+    Both levels must be cleared when the corpus is re-ingested (see `clear`).
+
+    Args:
+        maxsize: Maximum entries per level.
+        ttl: Seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 3600):
+        self.replies = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.selections = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._counters = {"reply_hits": 0, "reply_misses": 0, "selection_hits": 0, "selection_misses": 0}
+
+    def _lookup(self, cache: TTLCache, key, counter: str):
+        with self._lock:
+            value = cache.get(key)
+            self._counters[f"{counter}_hits" if value is not None else f"{counter}_misses"] += 1
+            return value
+
+    def get_reply(self, model: str, query: str) -> Optional[Dict]:
+        """
+        Cached answer dict (reply, title, candidates) for `query`, or None.
+        """
+        return self._lookup(self.replies, (model, query_fingerprint(query)), "reply")
+
+    def put_reply(self, model: str, query: str, answer: Dict) -> None:
+        with self._lock:
+            self.replies[(model, query_fingerprint(query))] = answer
+
+    def get_selection(self, model: str, candidates: Sequence[str], query: str) -> Optional[str]:
+        """
+        Title previously chosen for this query among the same candidates, or None.
+        """
+        return self._lookup(self.selections, (model, frozenset(candidates), query_fingerprint(query)), "selection")
+
+    def put_selection(self, model: str, candidates: Sequence[str], query: str, title: str) -> None:
+        with self._lock:
+            self.selections[(model, frozenset(candidates), query_fingerprint(query))] = title
+
+    def clear(self) -> None:
+        """
+        Drop every cached answer and selection (called after re-ingestion).
+        """
+        with self._lock:
+            self.replies.clear()
+            self.selections.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss counters per level, plus hit rates and current sizes.
+        """
+        with self._lock:
+            out = dict(self._counters)
+            out["reply_entries"] = len(self.replies)
+            out["selection_entries"] = len(self.selections)
+        for level in ("reply", "selection"):
+            lookups = out[f"{level}_hits"] + out[f"{level}_misses"]
+            out[f"{level}_hit_rate"] = out[f"{level}_hits"] / lookups if lookups else 0.0
+        return out
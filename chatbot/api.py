@@ -0,0 +1,365 @@
+"""
+Headless HTTP API (ASGI, Starlette) for Smart Librarian.
+
+Every uvicorn worker process imports this module once and keeps its own warm
+clients (pooled `AsyncOpenAI`, Chroma/NumPy index, BM25 index, summary store),
+so workers can be added behind a load balancer. Run it with `api_server.py`.
+
+Endpoints (JSON in, JSON out):
+    GET  /health                      liveness and current load
+    GET  /metrics                     admission and OpenAI request-layer counters of this worker
+    POST /recommend                   {"query", "model"?} -> reply, title, candidates, timings
+    POST /recommend/batch             {"queries": [...], "model"?} -> {"results": [...]}
+    POST /search                      {"query" | "queries", "n_results"?, "filters"?} -> Chroma-shaped results
+    POST /images                      {"title", "themes"?, "size"?, "lang"?} -> 202 {"job_id"}
+    GET  /images/{job_id}             job status; GET /images/{job_id}/file -> PNG
+    POST /tts                         {"text", "session_id"?} -> 202 {"job_id"}
+    GET  /tts/{job_id}                job status; GET /tts/{job_id}/file -> WAV
+
+Requests that call the models are bounded: at most `API_MAX_CONCURRENCY` run at
+once per worker (more get 429 with Retry-After) and each one is cancelled after
+`API_REQUEST_TIMEOUT` seconds (504); a batch search thread keeps its slot until it ends.
+"""
+
+import asyncio
+import contextvars
+import os
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse
+from starlette.routing import Route
+
+from chatbot import retriever
+from chatbot.agent import arecommend
+from chatbot.facets import normalize_filters
+from chatbot.openai_clients import client_metrics, get_async_client, set_async_client
+from tools.image_jobs import image_queue
+from tools.language_filter import get_matcher, is_clean, is_clean_many
+from tools.summary_store import get_store
+from tools.tts import tts_queue
+
+
+ALLOWED_MODELS = ("gpt-4o-mini", "gpt-4.1-mini", "gpt-4.1-nano")
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Sizes supported by the image model (`tools.image_generator.IMAGE_MODEL`) and prompt languages
+ALLOWED_IMAGE_SIZES = ("1024x1024", "1792x1024", "1024x1792")
+ALLOWED_IMAGE_LANGS = ("ro", "en")
+
+# Per-worker limits
+API_MAX_CONCURRENCY = int(os.getenv("SMART_LIBRARIAN_API_MAX_CONCURRENCY", "64"))
+API_REQUEST_TIMEOUT = float(os.getenv("SMART_LIBRARIAN_API_TIMEOUT", "60"))
+API_MAX_BATCH = 100
+# Queries of one batch request processed at the same time
+API_BATCH_CONCURRENCY = 8
+
+PROFANITY_MESSAGE = "Te rog pastreaza un limbaj respectuos. Iti pot recomanda carti pe orice tema."
+
+
+class ApiError(Exception):
+    """
+    Error returned to the client as `{"error": message}` with the given status code.
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class RequestLimiter:
+    """
+    Admission control for one worker: at most `limit` requests in flight, no queueing.
+
+    All handlers run on the worker's single event loop, so a plain counter suffices.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.rejected = 0
+
+    def _admit(self) -> None:
+        if self.active >= self.limit:
+            self.rejected += 1
+            raise ApiError(429, "Serverul este ocupat, incearca din nou.")
+        self.active += 1
+
+    def _release(self, future=None) -> None:
+        self.active -= 1
+        if future is not None and not future.cancelled():
+            future.exception()  # retrieved, so an abandoned failure is not logged as unhandled
+
+    async def run(self, coro, timeout: float = API_REQUEST_TIMEOUT):
+        """
+        Await `coro` if a slot is free, under `timeout`.
+
+        Raises:
+            ApiError: 429 when saturated, 504 when the timeout expires.
+        """
+        try:
+            self._admit()
+        except ApiError:
+            coro.close()
+            raise
+
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            raise ApiError(504, "Cererea a depasit timpul maxim de raspuns.")
+        finally:
+            self._release()
+
+    async def run_in_thread(self, fn, *args, timeout: float = API_REQUEST_TIMEOUT, **kwargs):
+        """
+        Run the blocking `fn(*args, **kwargs)` in the default executor if a slot is free, under `timeout`.
+
+        A thread cannot be cancelled, so its slot is released when `fn` returns, not when
+        the timeout expires: abandoned work keeps counting against `limit`.
+
+        Raises:
+            ApiError: 429 when saturated, 504 when the timeout expires.
+        """
+        self._admit()
+        call = partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        future = asyncio.get_running_loop().run_in_executor(None, call)
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise ApiError(504, "Cererea a depasit timpul maxim de raspuns.")
+
+
+limiter = RequestLimiter(API_MAX_CONCURRENCY)
+
+
+async def _json_body(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError(400, "Corpul cererii trebuie sa fie JSON valid.")
+    if not isinstance(body, dict):
+        raise ApiError(400, "Corpul cererii trebuie sa fie un obiect JSON.")
+    return body
+
+
+def _text_field(body: dict, name: str) -> str:
+    value = body.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(422, f"Campul '{name}' este obligatoriu.")
+    return value
+
+
+def _model_field(body: dict) -> str:
+    model = body.get("model") or DEFAULT_MODEL
+    if model not in ALLOWED_MODELS:
+        raise ApiError(422, f"Model necunoscut: {model}. Modele permise: {', '.join(ALLOWED_MODELS)}.")
+    return model
+
+
+def _filters_field(body: dict) -> Optional[dict]:
+    filters = body.get("filters")
+    if filters is None:
+        return None
+    if not isinstance(filters, dict):
+        raise ApiError(422, "Campul 'filters' trebuie sa fie un obiect (themes, language, author).")
+    try:
+        normalize_filters(filters)
+    except ValueError:
+        raise ApiError(422, "Filtre permise: themes, language, author.")
+    return filters
+
+
+def _handle_errors(handler):
+    async def wrapper(request: Request):
+        try:
+            return await handler(request)
+        except ApiError as e:
+            headers = {"Retry-After": "1"} if e.status_code == 429 else None
+            return JSONResponse({"error": e.message}, status_code=e.status_code, headers=headers)
+    return wrapper
+
+
+def _blocked_reply() -> dict:
+    return {"reply": PROFANITY_MESSAGE, "title": None, "candidates": [], "llm_calls": 0, "cached": False,
+            "timings": {}, "blocked": True}
+
+
+@_handle_errors
+async def health(request: Request):
+    return JSONResponse({"status": "ok", "active": limiter.active, "limit": limiter.limit,
+                         "rejected": limiter.rejected})
+
+
+@_handle_errors
+async def metrics(request: Request):
+    return JSONResponse({"worker": os.getpid(), "active": limiter.active, "rejected": limiter.rejected,
+                         "openai": client_metrics()})
+
+
+@_handle_errors
+async def recommend(request: Request):
+    body = await _json_body(request)
+    query = _text_field(body, "query")
+    model = _model_field(body)
+
+    if not is_clean(query):
+        return JSONResponse(_blocked_reply())
+
+    return JSONResponse(await limiter.run(arecommend(query, model=model)))
+
+
+async def _recommend_many(queries, model):
+    semaphore = asyncio.Semaphore(API_BATCH_CONCURRENCY)
+    clean = is_clean_many(queries)
+
+    async def _one(query, ok):
+        if not ok:
+            return _blocked_reply()
+        async with semaphore:
+            return await arecommend(query, model=model)
+
+    return await asyncio.gather(*(_one(q, ok) for q, ok in zip(queries, clean)))
+
+
+@_handle_errors
+async def recommend_batch(request: Request):
+    body = await _json_body(request)
+    queries = body.get("queries")
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        raise ApiError(422, "Campul 'queries' trebuie sa fie o lista nevida de texte.")
+    if len(queries) > API_MAX_BATCH:
+        raise ApiError(413, f"Cel mult {API_MAX_BATCH} cereri pe lot.")
+    model = _model_field(body)
+
+    results = await limiter.run(_recommend_many(queries, model))
+    return JSONResponse({"results": results})
+
+
+@_handle_errors
+async def search(request: Request):
+    body = await _json_body(request)
+    n_results = body.get("n_results", 2)
+    if not isinstance(n_results, int) or not 1 <= n_results <= 50:
+        raise ApiError(422, "Campul 'n_results' trebuie sa fie un numar intre 1 si 50.")
+    filters = _filters_field(body)
+
+    if "queries" in body:
+        queries = body["queries"]
+        if not isinstance(queries, list) or not queries or not all(isinstance(q, str) for q in queries):
+            raise ApiError(422, "Campul 'queries' trebuie sa fie o lista nevida de texte.")
+        if len(queries) > API_MAX_BATCH:
+            raise ApiError(413, f"Cel mult {API_MAX_BATCH} cereri pe lot.")
+        results = await limiter.run_in_thread(retriever.search_books_batch, queries, n_results=n_results,
+                                              filters=filters)
+        return JSONResponse({"results": results})
+
+    query = _text_field(body, "query")
+    return JSONResponse(await limiter.run(retriever.asearch_books(query, n_results=n_results, filters=filters)))
+
+
+def _job_or_404(job):
+    if job is None:
+        raise ApiError(404, "Job necunoscut.")
+    return job
+
+
+@_handle_errors
+async def submit_image(request: Request):
+    body = await _json_body(request)
+    title = _text_field(body, "title")
+    themes = body.get("themes")
+    if themes is not None and not (isinstance(themes, list) and all(isinstance(t, str) for t in themes)):
+        raise ApiError(422, "Campul 'themes' trebuie sa fie o lista de texte.")
+    size = body.get("size", "1024x1024")
+    if size not in ALLOWED_IMAGE_SIZES:
+        raise ApiError(422, f"Dimensiune necunoscuta: {size}. Dimensiuni permise: {', '.join(ALLOWED_IMAGE_SIZES)}.")
+    lang = body.get("lang", "ro")
+    if lang not in ALLOWED_IMAGE_LANGS:
+        raise ApiError(422, f"Limba necunoscuta: {lang}. Limbi permise: {', '.join(ALLOWED_IMAGE_LANGS)}.")
+    job_id = image_queue.submit(title, themes=themes, size=size, lang=lang)
+    return JSONResponse({"job_id": job_id}, status_code=202)
+
+
+@_handle_errors
+async def image_status(request: Request):
+    return JSONResponse(_job_or_404(image_queue.status(request.path_params["job_id"])))
+
+
+@_handle_errors
+async def image_file(request: Request):
+    job = _job_or_404(image_queue.status(request.path_params["job_id"]))
+    if job["status"] != "done":
+        raise ApiError(409, f"Imaginea nu este gata ({job['status']}).")
+    return FileResponse(job["path"], media_type="image/png")
+
+
+@_handle_errors
+async def submit_tts(request: Request):
+    body = await _json_body(request)
+    text = _text_field(body, "text")
+    session_id = body.get("session_id")
+    if session_id is not None and not (isinstance(session_id, str) and session_id.isalnum()):
+        raise ApiError(422, "Campul 'session_id' trebuie sa fie alfanumeric.")
+    job_id = tts_queue.submit(text, session_id=session_id)
+    return JSONResponse({"job_id": job_id}, status_code=202)
+
+
+@_handle_errors
+async def tts_status(request: Request):
+    return JSONResponse(_job_or_404(tts_queue.status(request.path_params["job_id"])))
+
+
+@_handle_errors
+async def tts_file(request: Request):
+    job = _job_or_404(tts_queue.status(request.path_params["job_id"]))
+    if job["status"] != "done":
+        raise ApiError(409, f"Audio nu este gata ({job['status']}).")
+    return FileResponse(job["path"], media_type="audio/wav")
+
+
+def warm_up() -> None:
+    """
+    Load everything a first request would otherwise pay for (runs once per worker).
+    """
+    get_matcher()
+    retriever.get_bm25_index()
+    get_store()
+    if retriever.RETRIEVER_BACKEND == "numpy":
+        retriever.get_numpy_index()
+    elif retriever.RETRIEVER_BACKEND == "sharded":
+        retriever.get_sharded_retriever()
+    else:
+        retriever.get_collection()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    get_async_client()
+    await asyncio.get_running_loop().run_in_executor(None, warm_up)
+    print(f"Smart Librarian API worker {os.getpid()} ready "
+          f"(max concurrency {limiter.limit}, timeout {API_REQUEST_TIMEOUT:.0f}s).")
+    yield
+    await get_async_client().close()
+    set_async_client(None)
+
+
+routes = [
+    Route("/health", health, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/recommend", recommend, methods=["POST"]),
+    Route("/recommend/batch", recommend_batch, methods=["POST"]),
+    Route("/search", search, methods=["POST"]),
+    Route("/images", submit_image, methods=["POST"]),
+    Route("/images/{job_id}", image_status, methods=["GET"]),
+    Route("/images/{job_id}/file", image_file, methods=["GET"]),
+    Route("/tts", submit_tts, methods=["POST"]),
+    Route("/tts/{job_id}", tts_status, methods=["GET"]),
+    Route("/tts/{job_id}/file", tts_file, methods=["GET"]),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
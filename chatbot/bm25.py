@@ -0,0 +1,172 @@
+import heapq
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chatbot.text_utils import tokenize
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over book titles and summaries.
+
+    Postings are stored CSR-style in flat `array`s: the postings of term `t`
+    are `doc_ids[offsets[t]:offsets[t + 1]]` with matching `term_freqs`, so the
+    index costs a few bytes per posting instead of a Python object each.
+    Title words count `TITLE_WEIGHT` times, so a query naming a book ranks it first.
+
+    Titles are also indexed as token sequences for `match_title`, which finds a
+    title quoted inside a query ("Ce este 1984?") without any scoring.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    TITLE_WEIGHT = 3
+
+    # Leading articles dropped to form a second title key ("The Hobbit" -> "hobbit")
+    ARTICLES = {"the", "a", "an"}
+    # A one-word title key must be a number or at least this long to match inside a query
+    MIN_SINGLE_WORD_TITLE = 4
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[dict]):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.rows = {rid: row for row, rid in enumerate(self.ids)}
+
+        postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths = array("I")
+        self._titles: Dict[Tuple[str, ...], int] = {}
+        self._max_title_words = 0
+
+        for row, (document, metadata) in enumerate(zip(self.documents, self.metadatas)):
+            title_tokens = tokenize(metadata.get("title", ""))
+            counts: Dict[str, int] = {}
+            for token in title_tokens:
+                counts[token] = counts.get(token, 0) + self.TITLE_WEIGHT
+            for token in tokenize(document):
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, {})[row] = tf
+            self.doc_lengths.append(sum(counts.values()))
+            self._add_title_keys(title_tokens, row)
+
+        self.vocabulary: Dict[str, int] = {}
+        self.offsets = array("I", [0])
+        self.doc_ids = array("I")
+        self.term_freqs = array("I")
+        self.idf = array("d")
+
+        n_docs = len(self.ids)
+        for term_id, (term, docs) in enumerate(sorted(postings.items())):
+            self.vocabulary[term] = term_id
+            for row in sorted(docs):
+                self.doc_ids.append(row)
+                self.term_freqs.append(docs[row])
+            self.offsets.append(len(self.doc_ids))
+            df = len(docs)
+            self.idf.append(math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)))
+
+        self.avg_doc_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+
+    def _add_title_keys(self, tokens: List[str], row: int) -> None:
+        keys = [tuple(tokens)]
+        if len(tokens) > 1 and tokens[0] in self.ARTICLES:
+            keys.append(tuple(tokens[1:]))
+        for key in keys:
+            if len(key) == 1 and not (key[0].isdigit() or len(key[0]) >= self.MIN_SINGLE_WORD_TITLE):
+                continue
+            # Two books sharing a key make it ambiguous; keep neither
+            if key in self._titles and self._titles[key] != row:
+                self._titles[key] = -1
+            else:
+                self._titles[key] = row
+            self._max_title_words = max(self._max_title_words, len(key))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str, dict]]) -> "BM25Index":
+        """
+        Build an index from `(id, summary, metadata)` records (see `iter_book_summaries`).
+        """
+        ids, documents, metadatas = [], [], []
+        for rid, document, metadata in records:
+            ids.append(rid)
+            documents.append(document)
+            metadatas.append(metadata)
+
+        return cls(ids, documents, metadatas)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def match_title(self, query: str) -> Optional[int]:
+        """
+        Return the row of the one book whose title appears in `query`, if exactly one does.
+
+        Titles are compared as whole token sequences after normalization, so
+        "Ce este 1984?" and "vreau sa citesc the hobbit" match, while "1985" does not.
+        A title found only inside a longer matched title is ignored; if two different
+        books are named, there is no match.
+        """
+        tokens = tokenize(query)
+        spans = []
+        for start in range(len(tokens)):
+            for size in range(min(self._max_title_words, len(tokens) - start), 0, -1):
+                row = self._titles.get(tuple(tokens[start:start + size]))
+                if row is not None:
+                    spans.append((start, start + size, row))
+                    break
+
+        rows = {
+            row for start, end, row in spans
+            if not any(s <= start and end <= e and (s, e) != (start, end) for s, e, _ in spans)
+        }
+        if len(rows) != 1:
+            return None
+        row = rows.pop()
+
+        return row if row >= 0 else None
+
+    def term_idf(self, term: str) -> float:
+        """
+        IDF of a (tokenized) term, or 0.0 if no book contains it.
+        """
+        term_id = self.vocabulary.get(term)
+        return self.idf[term_id] if term_id is not None else 0.0
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[int, float]]:
+        """
+        Score every book sharing a term with `query`.
+
+        Returns:
+            Up to `n_results` `(row, score)` pairs, best first.
+        """
+        scores: Dict[int, float] = {}
+        k1, b, avg = self.K1, self.B, self.avg_doc_length or 1.0
+
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            idf = self.idf[term_id]
+            for i in range(self.offsets[term_id], self.offsets[term_id + 1]):
+                row, tf = self.doc_ids[i], self.term_freqs[i]
+                norm = k1 * (1.0 - b + b * self.doc_lengths[row] / avg)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+
+        return heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[str]:
+    """
+    Merge several best-first rankings of IDs with reciprocal rank fusion.
+
+    Each ID scores `sum(1 / (k + rank))` over the rankings it appears in (rank
+    starting at 1); ties keep the order in which IDs were first seen.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, rid in enumerate(ranking, start=1):
+            scores[rid] = scores.get(rid, 0.0) + 1.0 / (k + rank)
+
+    return sorted(scores, key=lambda rid: -scores[rid])
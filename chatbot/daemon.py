@@ -0,0 +1,393 @@
+"""
+Warm daemon: one long-lived process answering CLI queries over a Unix domain socket.
+
+Every `python CLI_app.py` run otherwise pays again for the interpreter, the imports
+(OpenAI SDK, Chroma, NumPy), the OpenAI clients and their connection pool, the
+Chroma collection or NumPy index, the BM25 index, the summary store, the profanity
+matcher and the pyttsx3 engine. `python CLI_app.py daemon` loads all of them once
+(`warm_up`) and serves queries from `SOCKET_PATH`; `python CLI_app.py ask "..."`
+is a thin client that only imports this module (standard library only), sends the
+query and prints the reply as it streams back. Without a running daemon, `ask`
+answers in-process (the cold path), so scripts work either way.
+
+Protocol: one request per connection, a JSON line {"op": ..., ...}; the daemon
+answers with JSON lines, one event per line, and closes the connection.
+
+    {"op": "ask", "query": str, "session"?: str, "model"?: str, "speak"?: bool}
+        -> the `chatbot.agent.stream_agent` events ("candidates", "title", "text", "done")
+    {"op": "ping"}      -> {"type": "pong", "pid", "uptime"}
+    {"op": "stats"}     -> {"type": "stats", "pid", "uptime", "requests", "sessions", "warm_up", "clients"}
+    {"op": "shutdown"}  -> {"type": "bye"}
+
+A failed request gets {"type": "error", "error": message}. Queries with the same
+"session" share a `ConversationMemory`, so follow-ups work across invocations.
+The socket is created with mode 0600: only its owner can query the daemon.
+
+Usage:
+    python CLI_app.py daemon [--socket PATH] [--no-speech]
+    python CLI_app.py ask "Vreau o carte despre prietenie" [--session ID] [--speak] [--timings]
+    python CLI_app.py status | stop
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+
+# The chatbot modules are imported on first use: the thin client needs none of them
+
+SOCKET_PATH = os.getenv("SMART_LIBRARIAN_SOCKET") or os.path.join(
+    tempfile.gettempdir(), f"smart_librarian-{os.getuid()}.sock")
+DEFAULT_MODEL = "gpt-4o-mini"
+# Session memories kept by the daemon (least recently used are dropped first)
+MAX_SESSIONS = 256
+# Longest request line accepted
+MAX_REQUEST_BYTES = 64 * 1024
+# Seconds a client waits for the daemon to accept a connection
+CONNECT_TIMEOUT = 1.0
+
+PROFANITY_MESSAGE = "Te rog pastreaza un limbaj respectuos. Iti pot recomanda carti pe orice tema."
+
+
+def warm_up(speech: bool = True) -> Dict[str, float]:
+    """
+    Load everything a first query would otherwise pay for.
+
+    Args:
+        speech: Also start the pyttsx3 worker engine (skipped with a warning if it cannot start).
+
+    Returns:
+        Seconds spent per stage.
+    """
+    stages = {}
+
+    def _stage(name, load):
+        t0 = time.perf_counter()
+        load()
+        stages[name] = time.perf_counter() - t0
+
+    _stage("imports", lambda: __import__("chatbot.agent"))
+    from chatbot import retriever
+    from chatbot.openai_clients import get_client
+    from tools.language_filter import get_matcher
+    from tools.summary_store import get_store
+
+    _stage("clients", get_client)
+    _stage("embeddings", retriever.get_embedding_function)
+    if retriever.RETRIEVER_BACKEND == "numpy":
+        _stage("index", retriever.get_numpy_index)
+    elif retriever.RETRIEVER_BACKEND == "sharded":
+        _stage("index", retriever.get_sharded_retriever)
+    else:
+        _stage("index", retriever.get_collection)
+    _stage("bm25", retriever.get_bm25_index)
+    _stage("summaries", get_store)
+    _stage("profanity", get_matcher)
+    if speech:
+        from tools.tts import tts_queue
+
+        try:
+            _stage("tts", tts_queue.warm)
+        except Exception as e:
+            print(f"Text-to-speech unavailable, continuing without it: {e}")
+
+    return stages
+
+
+def answer_events(query: str, model: str = DEFAULT_MODEL, memory=None, speak: bool = False) -> Iterator[Dict]:
+    """
+    Answer one query as `stream_agent` events, behind the profanity filter (as the CLI does).
+
+    Args:
+        query: Natural language request from the user.
+        model: Chat model used for selection.
+        memory: `ConversationMemory` of the session, or None.
+        speak: Read the reply aloud once it is complete.
+    """
+    from chatbot.agent import stream_agent
+    from tools.language_filter import is_clean
+
+    if not is_clean(query):
+        yield {"type": "text", "text": PROFANITY_MESSAGE}
+        yield {"type": "done", "reply": PROFANITY_MESSAGE, "ttfb": 0.0, "total": 0.0, "cached": False}
+        return
+
+    for event in stream_agent(query, model=model, memory=memory):
+        if event["type"] == "done" and speak:
+            from tools.tts import tts_queue
+
+            tts_queue.speak(event["reply"])
+        yield event
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _send(self, event: dict) -> None:
+        self.wfile.write(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline(MAX_REQUEST_BYTES))
+            if not isinstance(message, dict):
+                raise ValueError("Cererea trebuie sa fie un obiect JSON.")
+            for event in self.server.librarian.dispatch(message):
+                self._send(event)
+        except (BrokenPipeError, ConnectionResetError):
+            return  # the client went away; nothing left to answer
+        except Exception as e:
+            try:
+                self._send({"type": "error", "error": str(e) or type(e).__name__})
+            except OSError:
+                pass
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class LibrarianDaemon:
+    """
+    The warm process: serves requests from a Unix domain socket on one thread per connection.
+
+    Args:
+        path: Socket path.
+        max_sessions: Conversation memories kept (least recently used are dropped first).
+        speech: Start the text-to-speech engine during `warm_up`.
+    """
+
+    def __init__(self, path: str = SOCKET_PATH, max_sessions: int = MAX_SESSIONS, speech: bool = True):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.speech = speech
+        self.started = time.time()
+        self.requests = 0
+        self.warm_up: Dict[str, float] = {}
+        self.sessions: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+
+    def memory(self, session: Optional[str]):
+        """
+        Conversation memory of `session` (created on first use), or None without a session.
+        """
+        if not session:
+            return None
+        from chatbot.memory import ConversationMemory
+
+        with self._lock:
+            memory = self.sessions.pop(session, None) or ConversationMemory()
+            self.sessions[session] = memory
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        return memory
+
+    def dispatch(self, message: dict) -> Iterator[Dict]:
+        """
+        Events answering one protocol request (see the module docstring).
+
+        Raises:
+            ValueError: For an unknown "op" or an invalid field.
+        """
+        op = message.get("op")
+        with self._lock:
+            self.requests += 1
+
+        if op == "ask":
+            query = message.get("query")
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("Campul 'query' trebuie sa fie un text nevid.")
+            session = message.get("session")
+            if session is not None and not isinstance(session, str):
+                raise ValueError("Campul 'session' trebuie sa fie un text.")
+            yield from answer_events(query, model=message.get("model") or DEFAULT_MODEL,
+                                     memory=self.memory(session), speak=bool(message.get("speak")))
+        elif op == "ping":
+            yield {"type": "pong", "pid": os.getpid(), "uptime": time.time() - self.started}
+        elif op == "stats":
+            from chatbot.openai_clients import client_metrics
+
+            with self._lock:
+                counts = {"requests": self.requests, "sessions": len(self.sessions)}
+            yield {"type": "stats", "pid": os.getpid(), "uptime": time.time() - self.started, **counts,
+                   "warm_up": self.warm_up, "clients": client_metrics()}
+        elif op == "shutdown":
+            yield {"type": "bye"}
+            # `shutdown` waits for the serve loop, so it cannot run on the loop's own thread
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+        else:
+            raise ValueError(f"Operatie necunoscuta: {op!r}.")
+
+    def _bind(self) -> _Server:
+        if os.path.exists(self.path):
+            if is_running(self.path):
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+            os.unlink(self.path)  # left over by a daemon that did not exit cleanly
+        previous = os.umask(0o177)  # the socket is created with mode 0600
+        try:
+            server = _Server(self.path, _Handler)
+        finally:
+            os.umask(previous)
+        server.librarian = self
+        return server
+
+    def serve_forever(self) -> None:
+        """
+        Warm up, then serve until a "shutdown" request, SIGTERM or Ctrl+C; the socket is removed on exit.
+        """
+        self._server = self._bind()
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            t0 = time.perf_counter()
+            self.warm_up = warm_up(speech=self.speech)
+            print(f"Smart Librarian daemon {os.getpid()} ready on {self.path} "
+                  f"(warm-up {time.perf_counter() - t0:.2f}s: "
+                  + ", ".join(f"{name} {sec * 1000:.0f} ms" for name, sec in self.warm_up.items()) + ").",
+                  flush=True)
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            print("Smart Librarian daemon stopped.", flush=True)
+
+
+def request(message: dict, path: str = SOCKET_PATH, timeout: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Send one request to the daemon and yield its events as they arrive.
+
+    Args:
+        message: Protocol request, e.g. {"op": "ask", "query": "..."}.
+        path: Socket path.
+        timeout: Seconds to wait for each event (None: no limit).
+
+    Raises:
+        OSError: If no daemon listens on `path` (FileNotFoundError, ConnectionRefusedError).
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(path)
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as events:
+            for line in events:
+                yield json.loads(line)
+
+
+def is_running(path: str = SOCKET_PATH) -> bool:
+    """
+    Whether a daemon answers on `path`.
+    """
+    try:
+        return any(event.get("type") == "pong" for event in request({"op": "ping"}, path, timeout=CONNECT_TIMEOUT))
+    except (OSError, ValueError):
+        return False
+
+
+def ask(query: str, session: Optional[str] = None, model: str = DEFAULT_MODEL, speak: bool = False,
+        path: str = SOCKET_PATH, fallback: bool = True) -> Iterator[Dict]:
+    """
+    Answer `query` through the daemon, or in-process (cold) if none is running and `fallback` is set.
+
+    Yields:
+        `stream_agent` events, or {"type": "error", "error": message}.
+    """
+    message = {"op": "ask", "query": query, "model": model, "speak": speak}
+    if session:
+        message["session"] = session
+    try:
+        events = request(message, path)
+        first = next(events, None)  # connection errors surface here
+    except OSError:
+        if not fallback:
+            raise
+        yield from answer_events(query, model=model, speak=speak)
+        return
+
+    if first is not None:
+        yield first
+        yield from events
+
+
+def _print_answer(events: Iterator[Dict], timings: bool) -> int:
+    status = 1
+    for event in events:
+        if event["type"] == "text":
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "done":
+            print()
+            status = 0
+            if timings:
+                print(f"⏱️ primul raspuns: {event['ttfb'] * 1000:.0f} ms, total: {event['total'] * 1000:.0f} ms",
+                      file=sys.stderr)
+        elif event["type"] == "error":
+            print(f"Eroare: {event['error']}", file=sys.stderr)
+    return status
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="CLI_app.py", description="Smart Librarian warm daemon and thin client.")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix domain socket of the daemon")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    daemon = commands.add_parser("daemon", help="Start the warm process (runs in the foreground)")
+    daemon.add_argument("--no-speech", action="store_true", help="Do not start the text-to-speech engine")
+    daemon.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+
+    ask_cmd = commands.add_parser("ask", help="Print the answer to a query")
+    ask_cmd.add_argument("query", nargs="+")
+    ask_cmd.add_argument("--session", help="Conversation ID shared by follow-up queries (daemon only)")
+    ask_cmd.add_argument("--model", default=DEFAULT_MODEL)
+    ask_cmd.add_argument("--speak", action="store_true", help="Read the reply aloud")
+    ask_cmd.add_argument("--timings", action="store_true", help="Print time-to-first-byte and total to stderr")
+    ask_cmd.add_argument("--no-daemon", action="store_true", help="Answer in-process even if a daemon is running")
+    ask_cmd.add_argument("--require-daemon", action="store_true", help="Fail instead of answering in-process")
+
+    commands.add_parser("status", help="Print the daemon's counters (exit status 1 if it is not running)")
+    commands.add_parser("stop", help="Stop the daemon")
+    args = parser.parse_args(argv)
+
+    if args.command == "daemon":
+        try:
+            LibrarianDaemon(args.socket, max_sessions=args.max_sessions, speech=not args.no_speech).serve_forever()
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "ask":
+        query = " ".join(args.query)
+        if args.no_daemon:
+            events = answer_events(query, model=args.model, speak=args.speak)
+        else:
+            events = ask(query, session=args.session, model=args.model, speak=args.speak, path=args.socket,
+                         fallback=not args.require_daemon)
+        try:
+            return _print_answer(events, args.timings)
+        except OSError as e:
+            print(f"No daemon on {args.socket}: {e}", file=sys.stderr)
+            return 1
+
+    op = "stats" if args.command == "status" else "shutdown"
+    try:
+        for event in request({"op": op}, args.socket, timeout=CONNECT_TIMEOUT * 10):
+            print(json.dumps(event, ensure_ascii=False, indent=2) if op == "stats" else "Daemon stopped.")
+    except OSError:
+        print(f"No daemon on {args.socket}.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
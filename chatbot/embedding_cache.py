@@ -0,0 +1,149 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from chatbot.text_utils import normalize_text
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for query embeddings.
+
+    Two levels:
+      - an in-memory LRU (`max_memory_entries` vectors), checked first;
+      - a SQLite table on disk (`max_disk_entries` rows) that survives restarts.
+
+    Entries are keyed by sha256(model + normalized text). Vectors are stored as
+    packed float32 blobs. Both levels evict least-recently-used entries once full.
+
+    Args:
+        path: SQLite file for the persistent level (None keeps the cache in memory only).
+        max_memory_entries: Capacity of the in-memory LRU.
+        max_disk_entries: Capacity of the on-disk table.
+    """
+
+    def __init__(self, path: Optional[str] = "db/embedding_cache.sqlite3",
+                 max_memory_entries: int = 1024, max_disk_entries: int = 100_000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        """
+        Build the cache key for `text` embedded with `model`.
+        """
+        payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        """
+        Return the cached embedding for (`text`, `model`), or None on a miss.
+        """
+        key = self.make_key(text, model)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            db = self._db()
+            row = db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone() if db else None
+            if row is None:
+                self.misses += 1
+                return None
+
+            db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            vector = array("f", row[0]).tolist()
+            self._remember(key, vector)
+            self.hits += 1
+            self.disk_hits += 1
+            return vector
+
+    def put(self, text: str, model: str, vector: List[float]) -> None:
+        """
+        Store `vector` as the embedding of (`text`, `model`) in both levels.
+        """
+        key = self.make_key(text, model)
+        vector = [float(x) for x in vector]
+        with self._lock:
+            self._remember(key, vector)
+            db = self._db()
+            if db is None:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                (key, model, array("f", vector).tobytes(), time.time()),
+            )
+            overflow = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_disk_entries
+            if overflow > 0:
+                db.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+            db.commit()
+
+    def clear(self) -> None:
+        """
+        Drop every cached embedding (both levels) and reset the counters.
+        """
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM embeddings")
+                db.commit()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss counters for monitoring.
+
+        Returns:
+            dict with hits, disk_hits, misses, hit_rate and memory_entries.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
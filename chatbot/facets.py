@@ -0,0 +1,256 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from chatbot.text_utils import tokenize
+
+
+# numpy is imported on first use, so importing the retriever stays cheap
+
+# Filter fields accepted by `search_books(filters=...)`: every given constraint must hold
+# (all listed themes, and the language/author if given).
+FILTER_FIELDS = ("themes", "language", "author")
+
+# Metadata flag set on a book for each of its themes: "theme_<key>" -> True
+THEME_PREFIX = "theme_"
+
+# Romanian (diacritic-folded) word stems naming each catalogue theme; a query word starting
+# with a stem, or equal to the English theme itself, implies the theme (see `infer_filters`).
+THEME_SYNONYMS = {
+    "freedom": ["libertat", "liber"],
+    "control": ["control", "suprave", "totalitar"],
+    "truth": ["adevar"],
+    "friendship": ["prieten"],
+    "adventure": ["aventur"],
+    "transformation": ["transforma", "schimbar"],
+    "justice": ["justiti", "dreptat", "nedrept"],
+    "innocence": ["inocent", "nevinovat"],
+    "prejudice": ["prejudecat", "rasism", "discrimin"],
+    "magic": ["magie", "magic", "vraji", "vrajit"],
+    "identity": ["identitat"],
+    "war": ["razbo"],
+    "trauma": ["traum"],
+    "brotherhood": ["fratie", "fratern"],
+    "love": ["dragoste", "iubi", "romant"],
+    "discovery": ["descoper"],
+    "resistance": ["rezistent"],
+    "humanity": ["umanitat"],
+    "revolution": ["revolut"],
+    "power": ["putere", "puterii"],
+    "betrayal": ["tradar", "tradat"],
+    "pride": ["mandri"],
+    "social class": ["clasa sociala", "clase sociale"],
+    "journey": ["calator"],
+    "purpose": ["scop", "sensul"],
+    "spirituality": ["spiritual"],
+}
+
+# Fields stored as bitsets (few distinct values, each shared by many books); the others
+# (author) keep sorted posting lists, so the index stays small with one value per book
+BITSET_FIELDS = ("themes", "language")
+
+# Distinct filters whose candidate rows are kept
+ROWS_CACHE_SIZE = 256
+
+
+def facet_key(value: str) -> str:
+    """
+    Comparable form of a facet value: "Social Class" -> "social_class", "Război" -> "razboi".
+    """
+    return "_".join(tokenize(value))
+
+
+def theme_flags(themes: Sequence[str]) -> Dict[str, bool]:
+    """
+    Metadata flags for `themes`, e.g. ["war", "social class"] -> {"theme_war": True, "theme_social_class": True}.
+
+    One boolean per theme, because Chroma metadata values must be scalars and a flag can be
+    pushed down as a `where` equality.
+    """
+    return {THEME_PREFIX + facet_key(t): True for t in themes if facet_key(t)}
+
+
+def normalize_filters(filters: Optional[dict]) -> Optional[Dict]:
+    """
+    Canonical filters: {"themes": [keys...], "language": "en", "author": "george_orwell"}, or None if empty.
+
+    Raises:
+        ValueError: For a field not in `FILTER_FIELDS`.
+    """
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filter fields: {sorted(unknown)}; expected {FILTER_FIELDS}")
+
+    out = {}
+    themes = filters.get("themes") or []
+    if isinstance(themes, str):
+        themes = [themes]
+    themes = sorted({facet_key(t) for t in themes} - {""})
+    if themes:
+        out["themes"] = themes
+    for field in ("language", "author"):
+        if filters.get(field):
+            out[field] = facet_key(filters[field])
+
+    return out or None
+
+
+def to_where(filters: Optional[dict]) -> Optional[dict]:
+    """
+    Chroma `where` clause equivalent to `filters` (normalized with `normalize_filters`), or None.
+    """
+    filters = normalize_filters(filters)
+    if not filters:
+        return None
+
+    clauses = [{THEME_PREFIX + t: True} for t in filters.get("themes", [])]
+    if "language" in filters:
+        clauses.append({"language": filters["language"]})
+    if "author" in filters:
+        clauses.append({"author_key": filters["author"]})
+
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def infer_filters(query: str, known_themes: Iterable[str]) -> Optional[Dict]:
+    """
+    Theme filters implied by a (Romanian or English) query, limited to `known_themes`.
+
+    "Vreau o carte despre război" -> {"themes": ["war"]}
+
+    Returns:
+        Normalized filters, or None if the query names no known theme.
+    """
+    known = set(known_themes)
+    words = tokenize(query)
+    text = " ".join(words)
+    themes = set()
+    for theme, stems in THEME_SYNONYMS.items():
+        key = facet_key(theme)
+        if key not in known:
+            continue
+        if key in words or any((" " in stem and stem in text) or
+                               any(w.startswith(stem) for w in words) for stem in stems):
+            themes.add(key)
+    # Themes of the catalogue without a synonym entry still match by name
+    themes.update(k for k in known if k in words)
+
+    return {"themes": sorted(themes)} if themes else None
+
+
+def _bitset(rows: List[int], size: int) -> int:
+    import numpy as np
+
+    flags = np.zeros(size, dtype=bool)
+    flags[rows] = True
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+class FacetIndex:
+    """
+    Inverted facet indexes over the rows of a record list: facet value -> book rows.
+
+    Themes and language are stored as bitsets (Python ints, bit i set = row i has the
+    value), so a multi-constraint filter is one AND per constraint; authors keep sorted
+    row arrays. `rows` turns a filter into the sorted candidate rows a vector scan can be
+    restricted to (see `NumpyVectorIndex.query(candidate_rows=...)`); its cost depends on
+    the catalogue size only through the bitset width (size / 8 bytes), not through a
+    metadata scan. Rows follow the order of the metadatas given to `from_metadatas`.
+
+    Args:
+        size: Number of rows.
+        bitsets: (field, value key) -> bitset, for `BITSET_FIELDS`.
+        postings: (field, value key) -> sorted rows, for the other fields.
+    """
+
+    def __init__(self, size: int, bitsets: Dict[Tuple[str, str], int], postings: Dict[Tuple[str, str], List[int]]):
+        self.size = size
+        self.bitsets = bitsets
+        self.postings = postings
+        self._rows_cache: Dict[tuple, object] = {}
+
+    @classmethod
+    def from_metadatas(cls, metadatas: Sequence[dict]) -> "FacetIndex":
+        """
+        Build the index from record metadatas (`theme_<key>` flags, `language`, `author_key`).
+        """
+        rows: Dict[Tuple[str, str], List[int]] = {}
+        for row, meta in enumerate(metadatas):
+            meta = meta or {}
+            for key, value in meta.items():
+                if key.startswith(THEME_PREFIX) and value is True:
+                    rows.setdefault(("themes", key[len(THEME_PREFIX):]), []).append(row)
+            if meta.get("language"):
+                rows.setdefault(("language", facet_key(meta["language"])), []).append(row)
+            if meta.get("author_key"):
+                rows.setdefault(("author", meta["author_key"]), []).append(row)
+
+        size = len(metadatas)
+        bitsets = {k: _bitset(r, size) for k, r in rows.items() if k[0] in BITSET_FIELDS}
+        postings = {k: r for k, r in rows.items() if k[0] not in BITSET_FIELDS}
+        return cls(size, bitsets, postings)
+
+    def values(self, field: str) -> List[str]:
+        """
+        Distinct value keys of `field` in the catalogue.
+        """
+        store = self.bitsets if field in BITSET_FIELDS else self.postings
+        return sorted(value for f, value in store if f == field)
+
+    def count(self, field: str, value: str) -> int:
+        """
+        Books having `value` for `field`.
+        """
+        key = (field, facet_key(value))
+        if field in BITSET_FIELDS:
+            return bin(self.bitsets.get(key, 0)).count("1")
+        return len(self.postings.get(key, ()))
+
+    def rows(self, filters: Optional[dict]):
+        """
+        Sorted rows (int64 NumPy array) of the books matching every constraint of `filters`.
+
+        Returns:
+            None when `filters` is empty (no restriction), otherwise a possibly empty array.
+        """
+        import numpy as np
+
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+        cache_key = tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in sorted(filters.items()))
+        cached = self._rows_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        mask = None
+        for field in BITSET_FIELDS:
+            values = filters.get(field)
+            for value in ([values] if isinstance(values, str) else values or []):
+                bits = self.bitsets.get((field, value), 0)
+                mask = bits if mask is None else mask & bits
+
+        if mask is not None:
+            packed = np.frombuffer(mask.to_bytes((self.size + 7) // 8, "little"), dtype=np.uint8)
+            rows = np.flatnonzero(np.unpackbits(packed, bitorder="little"))
+        if "author" in filters:
+            posting = np.asarray(self.postings.get(("author", filters["author"]), []), dtype=np.int64)
+            rows = posting if mask is None else np.intersect1d(rows, posting, assume_unique=True)
+
+        if len(self._rows_cache) >= ROWS_CACHE_SIZE:
+            self._rows_cache.clear()
+        self._rows_cache[cache_key] = rows
+
+        return rows
+
+    def filter_rows(self, candidates: Sequence[int], filters: Optional[dict]) -> List[int]:
+        """
+        The `candidates` (in their order) that match `filters`.
+        """
+        import numpy as np
+
+        allowed = self.rows(filters)
+        if allowed is None or not len(candidates):
+            return list(candidates)
+        keep = np.isin(np.asarray(candidates), allowed, assume_unique=True)
+        return [c for c, k in zip(candidates, keep) if k]
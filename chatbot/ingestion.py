@@ -0,0 +1,227 @@
+import hashlib
+import json
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from chatbot.facets import facet_key, theme_flags
+from chatbot.text_utils import normalize_text, tokenize
+
+
+TITLE_MARKER = "## Title:"
+
+# Optional structured lines of a record, stored as metadata instead of summary text
+FIELD_MARKERS = {"author": "Author:", "language": "Language:"}
+
+# "... Themes: war, trauma, brotherhood." closing a summary
+_THEMES_LINE = re.compile(r"\bThemes?:\s*(.+?)\.?\s*$", re.IGNORECASE)
+
+# Function words telling Romanian summaries from English ones when no "Language:" line is given
+_LANGUAGE_HINTS = {
+    "ro": {"si", "este", "care", "de", "la", "un", "o", "cu", "pe", "in", "despre", "sunt", "lui", "sale"},
+    "en": {"the", "and", "is", "of", "a", "an", "to", "his", "her", "with", "about", "who", "in"},
+}
+
+# Records per upsert/delete request (one embedding request per upsert batch)
+INGEST_BATCH_SIZE = 100
+
+
+def book_id(title: str) -> str:
+    """
+    Stable record ID derived from the normalized title.
+
+    The same title always maps to the same ID, regardless of its position in the file.
+    """
+    return "book_" + hashlib.sha1(normalize_text(title).encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(title: str, summary: str) -> str:
+    """
+    Fingerprint of a record's content, used to detect edited summaries.
+    """
+    return hashlib.sha256(f"{title}\x00{summary}".encode("utf-8")).hexdigest()[:16]
+
+
+def detect_language(text: str) -> str:
+    """
+    "ro" or "en", whichever language's function words are more frequent in `text`.
+    """
+    words = tokenize(text)
+    counts = {lang: sum(w in hints for w in words) for lang, hints in _LANGUAGE_HINTS.items()}
+    return "ro" if counts["ro"] > counts["en"] else "en"
+
+
+def book_metadata(title: str, summary: str, fields: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Typed metadata of a record: title, content hash, language, themes and author.
+
+    - themes come from the "Themes: x, y, z" sentence closing the summary, kept both as
+      a display string ("themes") and as one `theme_<key>: True` flag per theme (filterable);
+    - language is the record's "Language:" line, or detected from the summary;
+    - author (and its comparable "author_key") only if the record has an "Author:" line.
+    """
+    fields = fields or {}
+    metadata = {"title": title, "content_hash": content_hash(title, summary)}
+
+    match = _THEMES_LINE.search(summary)
+    themes = [t.strip() for t in match.group(1).split(",") if t.strip()] if match else []
+    if themes:
+        metadata["themes"] = ", ".join(themes)
+        metadata.update(theme_flags(themes))
+
+    metadata["language"] = facet_key(fields.get("language") or "") or detect_language(summary)
+    if fields.get("author"):
+        metadata["author"] = fields["author"]
+        metadata["author_key"] = facet_key(fields["author"])
+
+    return metadata
+
+
+def iter_book_summaries(file_path: str) -> Iterator[Tuple[str, str, dict]]:
+    """
+    Stream (id, summary, metadata) records from a book summaries file.
+
+    The file is read line by line, so memory use does not grow with the catalogue.
+    Every line starting with '## Title:' opens a new record; the following
+    non-empty lines are joined into its summary, except "Author:" and "Language:"
+    lines, which become metadata (see `book_metadata`). Text before the first title is ignored.
+
+    Yields:
+        Tuple of (book_id, summary, metadata).
+    """
+    title = None
+    lines: List[str] = []
+    fields: Dict[str, str] = {}
+
+    def _record():
+        summary = " ".join(lines)
+        return book_id(title), summary, book_metadata(title, summary, fields)
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith(TITLE_MARKER):
+                if title:
+                    yield _record()
+                title = stripped[len(TITLE_MARKER):].strip()
+                lines = []
+                fields = {}
+            elif stripped and title is not None:
+                field = next((f for f, marker in FIELD_MARKERS.items() if stripped.startswith(marker)), None)
+                if field:
+                    fields[field] = stripped[len(FIELD_MARKERS[field]):].strip()
+                else:
+                    lines.append(stripped)
+
+    if title:
+        yield _record()
+
+
+def metadata_hash(metadata: dict) -> str:
+    """
+    Fingerprint of a record's whole metadata, used to detect records whose text is
+    unchanged but whose metadata (e.g. extracted themes) is not.
+    """
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def _existing_hashes(collection, page_size: int) -> Dict[str, Tuple[str, str]]:
+    """
+    Map every record ID in `collection` to its stored (content hash, metadata hash); "" if missing.
+    """
+    hashes: Dict[str, Tuple[str, str]] = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for rid, meta in zip(page["ids"], page["metadatas"]):
+            meta = meta or {}
+            hashes[rid] = (meta.get("content_hash", ""), metadata_hash(meta))
+        if len(page["ids"]) < page_size:
+            break
+        offset += page_size
+
+    return hashes
+
+
+def sync_collection(collection, file_path: str, batch_size: int = INGEST_BATCH_SIZE,
+                    keep: Optional[Callable[[str, dict], bool]] = None) -> Dict[str, int]:
+    """
+    Make `collection` mirror `file_path`, touching only what changed.
+
+    - New or edited records (by content hash) are upserted in batches of `batch_size`,
+      so only they are embedded.
+    - Records with unchanged text but different metadata (e.g. after the metadata
+      extraction changed) get a metadata-only update, without re-embedding.
+    - Records whose title disappeared from the file are deleted.
+    - Unchanged records are left alone.
+    - A title repeated in the file keeps its first occurrence.
+    - With `keep`, only the records it accepts belong in `collection` (e.g. one shard's
+      share of the catalogue); the others are treated as absent.
+
+    Args:
+        collection: Chroma collection (with an embedding function) to update.
+        file_path: Book summaries file in the '## Title:' format.
+        batch_size: Records per upsert/delete request.
+        keep: Optional (record id, metadata) -> bool filter.
+
+    Returns:
+        dict with counts for "added", "updated", "deleted" and "unchanged"
+        ("updated" includes metadata-only updates).
+    """
+    existing = _existing_hashes(collection, page_size=max(batch_size, 1000))
+    stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    seen = set()
+    batch_ids, batch_docs, batch_metas = [], [], []
+    relabel: Dict[str, dict] = {}
+
+    def _flush_relabel():
+        if relabel:
+            # Keys the new metadata no longer has are deleted by setting them to None
+            old = collection.get(ids=list(relabel), include=["metadatas"])
+            for rid, meta in zip(old["ids"], old["metadatas"]):
+                relabel[rid] = {**{k: None for k in (meta or {}) if k not in relabel[rid]}, **relabel[rid]}
+            collection.update(ids=list(relabel), metadatas=list(relabel.values()))
+            relabel.clear()
+
+    def _flush():
+        if batch_ids:
+            collection.upsert(ids=batch_ids, documents=batch_docs, metadatas=batch_metas)
+            batch_ids.clear()
+            batch_docs.clear()
+            batch_metas.clear()
+
+    for rid, summary, metadata in iter_book_summaries(file_path):
+        if rid in seen:
+            print(f"Skipping duplicate title: {metadata['title']}")
+            continue
+        if keep is not None and not keep(rid, metadata):
+            continue
+        seen.add(rid)
+
+        if rid not in existing:
+            stats["added"] += 1
+        elif existing[rid][0] != metadata["content_hash"]:
+            stats["updated"] += 1
+        elif existing[rid][1] != metadata_hash(metadata):
+            stats["updated"] += 1
+            relabel[rid] = metadata
+            if len(relabel) >= batch_size:
+                _flush_relabel()
+            continue
+        else:
+            stats["unchanged"] += 1
+            continue
+
+        batch_ids.append(rid)
+        batch_docs.append(summary)
+        batch_metas.append(metadata)
+        if len(batch_ids) >= batch_size:
+            _flush()
+    _flush()
+    _flush_relabel()
+
+    removed = [rid for rid in existing if rid not in seen]
+    for start in range(0, len(removed), batch_size):
+        collection.delete(ids=removed[start:start + batch_size])
+    stats["deleted"] = len(removed)
+
+    return stats
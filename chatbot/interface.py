@@ -1,17 +1,36 @@
-from chatbot.agent import run_agent
-import pyttsx3
+from chatbot.agent import stream_agent
+from chatbot.memory import ConversationMemory
+from chatbot.tracing import traced
 from tools.language_filter import is_clean
-from tools.image_generator import extract_chosen_title, generate_book_image
+from tools.image_generator import extract_chosen_title
+from tools.image_jobs import image_queue
+from tools.tts import tts_queue
 
 
+@traced("tts")
 def speak_text(text):
     """
-    Convert a given text string into spoken audio using pyttsx3.
+    Read a given text string aloud using pyttsx3.
+
+    Speech runs on the warm engine of a `tools.tts` worker process, so the
+    CLI neither re-initializes pyttsx3 nor waits for the speech to end.
+    """
+    tts_queue.speak(text)
+
+
+def report_finished_images(pending):
+    """
+    Print and drop every finished job from `pending` (list of image job IDs).
     """
-    engine = pyttsx3.init()
-    engine.setProperty('rate', 170)
-    engine.say(text)
-    engine.runAndWait()
+    for job_id in list(pending):
+        job = image_queue.status(job_id)
+        if job is None or job["status"] in ("queued", "running"):
+            continue
+        pending.remove(job_id)
+        if job["status"] == "done":
+            print(f"\nImagine generata pentru „{job['title']}”: {job['path']}")
+        else:
+            print(f"\nEroare generare imagine pentru „{job['title']}”: {job['error']}")
 
 
 def run_cli():
@@ -21,8 +40,11 @@ def run_cli():
     """
     print("📚 Bine ai venit la Smart Librarian!")
     print("💬 Pune o intrebare despre o carte sau scrie 'exit' pentru a iesi.")
+    pending_images = []
+    memory = ConversationMemory()  # follow-ups ("alta asemanatoare") build on earlier answers
     
     while True:
+        report_finished_images(pending_images)
         user_input = input("\n Tu: ")
         if user_input.lower() in {"exit", "quit"}:
             print("La revedere!")
@@ -35,8 +57,17 @@ def run_cli():
         print("🤖 Gandesc...")
 
         try:
-            response = run_agent(user_input)
-            print(f"\n Librarian:\n{response}")
+            # Stream the answer as it is produced; report time-to-first-byte separately
+            response = ""
+            print("\n Librarian:")
+            for event in stream_agent(user_input, memory=memory):
+                if event["type"] == "candidates" and event["titles"]:
+                    print(f"(candidati: {', '.join(event['titles'])})")
+                elif event["type"] == "text":
+                    print(event["text"], end="", flush=True)
+                elif event["type"] == "done":
+                    response = event["reply"]
+                    print(f"\n\n⏱️ primul raspuns: {event['ttfb'] * 1000:.0f} ms, total: {event['total'] * 1000:.0f} ms")
 
             play = input("Vrei sa citeasca raspunsul? (y/n): ").strip().lower()
             if play == "y":
@@ -47,8 +78,10 @@ def run_cli():
                 gen = input(f"Generez o ilustratie pentru „{title}”? (y/n): ").strip().lower()
                 if gen == "y":
                     try:
-                        image_path = generate_book_image(title, themes=None, size="1024x1024", lang="ro")
-                        print(f"Imagine generata: {image_path}")
+                        pending_images.append(
+                            image_queue.submit(title, themes=None, size="1024x1024", lang="ro")
+                        )
+                        print("Ilustratia se genereaza in fundal; te anunt cand este gata.")
                     except Exception as e:
                         print(f"Eroare generare imagine: {e}")
 
@@ -0,0 +1,169 @@
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from chatbot.text_utils import tokenize
+
+
+# Recent turns kept verbatim, and characters kept per message
+MEMORY_WINDOW = 6
+MEMORY_MAX_CHARS = 500
+
+# Recently recommended titles, left out of retrieval so follow-ups bring new books
+MEMORY_RECENT_TITLES = 5
+
+# Compact summary of the turns that left the window: the most salient query words,
+# with older words fading by SUMMARY_DECAY every time a turn is folded in
+SUMMARY_TERMS = 12
+SUMMARY_DECAY = 0.7
+
+# Characters of the last recommended book's summary used to steer a follow-up
+LAST_BOOK_CHARS = 240
+
+# A query containing one of these refers back to the conversation ("ceva ca ultima, dar mai sumbru")
+FOLLOW_UP_WORDS = frozenset({
+    "ultima", "ultimul", "precedenta", "precedentul", "aceeasi", "acelasi", "asemanator",
+    "asemanatoare", "similar", "similara", "alta", "altul", "altceva",
+    "last", "previous", "another", "same", "else",
+})
+
+# Words that carry no topic (requests, articles, prepositions), left out of the summary
+STOP_WORDS = frozenset({
+    "vreau", "carte", "carti", "despre", "recomanda", "recomanzi", "poveste", "povesti", "este",
+    "care", "pentru", "mai", "dar", "sau", "si", "cu", "din", "in", "la", "pe", "de", "un", "una",
+    "o", "ce", "ai", "am", "imi", "mi", "te", "rog", "book", "books", "about", "want", "with",
+    "ceva", "alt", "fie", "fi", "sa", "nu", "mult", "foarte", "dupa", "the", "and", "for", "but",
+    "something", "some", "recommend", "story", "stories", "like", "more", "than",
+}) | FOLLOW_UP_WORDS
+
+
+def _salient_words(query: str) -> List[str]:
+    # Topic words of a query, in order: no request/filler words, numbers or very short words
+    words = []
+    for word in tokenize(query):
+        if len(word) > 2 and word not in STOP_WORDS and not word.isdigit() and word not in words:
+            words.append(word)
+    return words
+
+
+class ConversationMemory:
+    """
+    Bounded memory of one chat session, used to steer retrieval on follow-up queries.
+
+    Keeps the last `window` turns verbatim (truncated), a compact summary of older
+    turns (the `summary_terms` most salient query words, with decay), the recently
+    recommended titles and an excerpt of the last recommended book. Every part has
+    a fixed size, so memory stays O(1) per session however long the chat gets, and
+    the history is never re-sent to the LLM.
+
+    Args:
+        window: Turns (query + reply) kept verbatim.
+        recent_titles: Recommended titles excluded from retrieval.
+        summary_terms: Words kept in the compact summary.
+    """
+
+    def __init__(self, window: int = MEMORY_WINDOW, recent_titles: int = MEMORY_RECENT_TITLES,
+                 summary_terms: int = SUMMARY_TERMS):
+        self.turns = deque(maxlen=window)
+        self.recent_titles = deque(maxlen=recent_titles)
+        self.summary_terms = summary_terms
+        self.topics: Dict[str, float] = {}
+        self.last_book: Optional[str] = None
+        self.turn_count = 0
+        self._lock = threading.Lock()
+
+    def add_turn(self, query: str, reply: str, title: Optional[str] = None) -> None:
+        """
+        Record one exchange; `title` is the recommended book, if any.
+        """
+        with self._lock:
+            if len(self.turns) == self.turns.maxlen:
+                self._fold(self.turns[0])
+            self.turns.append({"query": query[:MEMORY_MAX_CHARS], "reply": reply[:MEMORY_MAX_CHARS],
+                               "title": title})
+            self.turn_count += 1
+
+            if title:
+                if title in self.recent_titles:
+                    self.recent_titles.remove(title)
+                self.recent_titles.append(title)
+                summary = reply.split("\n\n", 1)[-1]
+                self.last_book = " ".join(summary.split())[:LAST_BOOK_CHARS]
+
+    def _fold(self, turn: Dict) -> None:
+        # Fade the summary, add the evicted query's words and keep only the strongest ones
+        topics = {term: weight * SUMMARY_DECAY for term, weight in self.topics.items()}
+        for term in _salient_words(turn["query"]):
+            topics[term] = topics.get(term, 0.0) + 1.0
+        self.topics = dict(sorted(topics.items(), key=lambda item: -item[1])[:self.summary_terms])
+
+    def summary(self) -> List[str]:
+        """
+        Topic words of the conversation, most recent first: those of the window, then the compact summary.
+        """
+        with self._lock:
+            words = []
+            for turn in reversed(self.turns):
+                words.extend(w for w in _salient_words(turn["query"]) if w not in words)
+            words.extend(w for w in self.topics if w not in words)
+
+        return words[:self.summary_terms]
+
+    def excluded_titles(self) -> List[str]:
+        """
+        Recently recommended titles, oldest first.
+        """
+        with self._lock:
+            return list(self.recent_titles)
+
+    def is_follow_up(self, query: str) -> bool:
+        """
+        True if `query` refers back to the conversation and there is something to refer to.
+        """
+        with self._lock:
+            if not self.turns:
+                return False
+        return any(word in FOLLOW_UP_WORDS for word in tokenize(query))
+
+    def contextualize(self, query: str) -> str:
+        """
+        `query` extended with the conversation context it refers to, for retrieval and selection.
+
+        A follow-up gets the last recommended title and an excerpt of its summary,
+        plus the compact summary of older turns; any other query is returned as is.
+        """
+        if not self.is_follow_up(query):
+            return query
+
+        topics = self.summary()
+        with self._lock:
+            parts = []
+            if self.recent_titles:
+                parts.append(f"previous book: {self.recent_titles[-1]}")
+                if self.last_book:
+                    parts.append(self.last_book)
+        if topics:
+            parts.append("earlier topics: " + ", ".join(topics))
+        if not parts:
+            return query
+
+        return f"{query}\n(Context: {'; '.join(parts)})"
+
+    def clear(self) -> None:
+        """
+        Forget the whole conversation.
+        """
+        with self._lock:
+            self.turns.clear()
+            self.recent_titles.clear()
+            self.topics = {}
+            self.last_book = None
+            self.turn_count = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Sizes of the memory parts (all bounded), for monitoring.
+        """
+        with self._lock:
+            return {"turns": self.turn_count, "window": len(self.turns), "recent_titles": len(self.recent_titles),
+                    "summary_terms": len(self.topics)}
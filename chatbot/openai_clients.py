@@ -0,0 +1,114 @@
+import os
+from typing import TYPE_CHECKING, Dict, Optional
+
+from chatbot.resilience import RequestLayer, ResilientClient, rate_limits_from_env
+
+# httpx and openai are imported on first use, so importing this module stays cheap
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+
+# Connection pool of the shared async client (one pool per worker process)
+ASYNC_MAX_CONNECTIONS = 200
+ASYNC_MAX_KEEPALIVE_CONNECTIONS = 50
+ASYNC_TIMEOUT_SECONDS = 60.0
+
+_client: Optional[ResilientClient] = None
+_async_client: Optional[ResilientClient] = None
+_layer: Optional[RequestLayer] = None
+
+
+def get_request_layer() -> RequestLayer:
+    """
+    Return the process-wide request layer (rate limits, retries, hedging, singleflight).
+
+    Both shared clients send their requests through it, so quotas and metrics are per process.
+    """
+    global _layer
+    if _layer is None:
+        _layer = RequestLayer(rate_limits=rate_limits_from_env())
+
+    return _layer
+
+
+def client_metrics() -> Dict[str, float]:
+    """
+    Snapshot of the request layer counters (requests, retries, throttling, hedges, coalesced calls).
+    """
+    return get_request_layer().metrics.snapshot()
+
+
+def client_usage() -> Dict[str, Dict[str, int]]:
+    """
+    Answered calls and reported prompt/completion tokens per model, through the request layer.
+    """
+    return get_request_layer().metrics.usage()
+
+
+def _wrap(client, is_async: bool) -> Optional[ResilientClient]:
+    if client is None or isinstance(client, ResilientClient):
+        return client
+    return ResilientClient(client, get_request_layer(), is_async=is_async)
+
+
+def get_client() -> "OpenAI":
+    """
+    Return the process-wide synchronous `OpenAI` client, creating it on first use.
+
+    The client is wrapped by the request layer (`get_request_layer`), which owns
+    retries, so the SDK's own retries are turned off.
+    """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+
+        _client = _wrap(OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0), is_async=False)
+
+    return _client
+
+
+def set_client(client: Optional["OpenAI"]) -> None:
+    """
+    Replace the shared synchronous client (None resets it to be re-created lazily).
+
+    The client is wrapped by the request layer like the default one.
+    """
+    global _client
+    _client = _wrap(client, is_async=False)
+
+
+def get_async_client() -> "AsyncOpenAI":
+    """
+    Return the process-wide `AsyncOpenAI` client, creating it on first use.
+
+    All async code paths share this client, and with it one pooled
+    `httpx.AsyncClient`, so concurrent requests reuse keep-alive connections.
+    `OPENAI_BASE_URL` is honoured by the SDK (useful for local mock servers).
+    Requests go through the request layer, like those of `get_client`.
+    """
+    global _async_client
+    if _async_client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=ASYNC_TIMEOUT_SECONDS,
+        )
+        _async_client = _wrap(
+            AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0),
+            is_async=True,
+        )
+
+    return _async_client
+
+
+def set_async_client(client: Optional["AsyncOpenAI"]) -> None:
+    """
+    Replace the shared async client (None resets it to be re-created lazily).
+    """
+    global _async_client
+    _async_client = _wrap(client, is_async=True)
@@ -0,0 +1,356 @@
+"""
+Offline precomputation of recommendations for a list of seed queries.
+
+Seed queries (popular searches, one per theme and title, ...) are streamed from a
+JSON lines file, one object per line: {"query": "...", "id": "..."?} (a bare JSON
+string is accepted too; without "id", the normalized query text is the key).
+Each one goes through `chatbot.agent.recommend` (retrieval, local rerank, LLM
+selection only when ambiguous, local summary) on a bounded thread pool, and the
+answers are written as a Parquet dataset (pyarrow, zstd): a directory of
+`part-NNNNN.parquet` files that `pyarrow.parquet.read_table(<dir>)` (or
+`pandas.read_parquet`) reads as one table.
+
+The parts are the checkpoint. Every `--flush-every` answers, a part is written
+atomically (temporary file + rename), together with `_checkpoint.json` (running
+totals). A restarted job skips every query key already in a part, so a crash
+loses at most the answers of the unwritten part. Queries that fail are not written
+(a rerun retries them); they are appended to `_errors.jsonl` in the output directory
+(files starting with "_" or "." are ignored by Parquet dataset readers).
+
+Usage:
+    python -m chatbot.precompute seeds.jsonl outputs/precomputed [--workers 8] [--model gpt-4o-mini]
+    python -m chatbot.precompute --seeds-from-catalogue seeds.jsonl   # one seed per title and theme
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from chatbot.text_utils import normalize_text
+
+
+# pyarrow is imported on first use, so importing this module stays cheap
+
+# Queries answered at the same time
+PRECOMPUTE_WORKERS = int(os.getenv("SMART_LIBRARIAN_PRECOMPUTE_WORKERS", "8"))
+# Answers per Parquet part (and checkpoint)
+FLUSH_EVERY = 500
+
+# Estimated list prices in USD per 1M tokens (input, output); update when they change.
+# Models missing here are reported with their token counts but no cost.
+PRICES_PER_MTOK: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+CHECKPOINT_FILE = "_checkpoint.json"
+ERRORS_FILE = "_errors.jsonl"
+
+
+def query_key(query: str) -> str:
+    """
+    Key of a seed without an "id": hash of the normalized query text.
+    """
+    return hashlib.sha1(normalize_text(query).encode("utf-8")).hexdigest()[:16]
+
+
+def iter_seeds(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (query_id, query) pairs from a JSON lines file, skipping blank lines and empty queries.
+
+    Raises:
+        ValueError: On a line that is neither a JSON string nor an object with a "query" string.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            query = item.get("query") if isinstance(item, dict) else None
+            if not isinstance(query, str):
+                raise ValueError(f"{path}:{line_no}: expected a string or an object with a 'query' string")
+            if query.strip():
+                yield str(item.get("id") or query_key(query)), query
+
+
+def catalogue_seeds(file_path: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    One seed per title ("Spune-mi despre <title>") and per theme ("Vreau o carte despre <theme>") of the catalogue.
+    """
+    from chatbot.ingestion import iter_book_summaries
+    from chatbot.retriever import BOOK_SUMMARIES_PATH
+
+    seeds, themes = [], {}
+    for rid, _, metadata in iter_book_summaries(file_path or BOOK_SUMMARIES_PATH):
+        seeds.append({"id": f"title:{rid}", "query": f"Spune-mi despre {metadata['title']}"})
+        for theme in filter(None, (t.strip() for t in metadata.get("themes", "").split(","))):
+            themes.setdefault(normalize_text(theme), theme)
+    seeds += [{"id": f"theme:{key}", "query": f"Vreau o carte despre {theme}"} for key, theme in sorted(themes.items())]
+
+    return seeds
+
+
+def estimate_cost(usage: Dict[str, Dict[str, int]]) -> Optional[float]:
+    """
+    Estimated USD cost of `usage` ({model: {"prompt_tokens", "completion_tokens", ...}}), None if no model is priced.
+    """
+    priced = [(PRICES_PER_MTOK[m], u) for m, u in usage.items() if m in PRICES_PER_MTOK]
+    if not priced:
+        return None
+    return sum((p_in * u["prompt_tokens"] + p_out * u["completion_tokens"]) / 1e6 for (p_in, p_out), u in priced)
+
+
+def _usage_delta(before: Dict[str, Dict[str, int]], after: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    delta = {}
+    for model, counts in after.items():
+        base = before.get(model, {})
+        diff = {field: value - base.get(field, 0) for field, value in counts.items()}
+        if any(diff.values()):
+            delta[model] = diff
+    return delta
+
+
+def _merge_usage(total: Dict[str, Dict[str, int]], extra: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    out = {model: dict(counts) for model, counts in total.items()}
+    for model, counts in extra.items():
+        target = out.setdefault(model, {})
+        for field, value in counts.items():
+            target[field] = target.get(field, 0) + value
+    return out
+
+
+class ParquetStore:
+    """
+    Append-only Parquet dataset directory with checkpoint (see the module docstring).
+
+    Args:
+        path: Output directory (created if missing).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._parts = len(self.part_files())
+
+    def part_files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def done_keys(self) -> set:
+        """
+        Query keys already written by previous runs.
+        """
+        import pyarrow.parquet as pq
+
+        keys = set()
+        for part in self.part_files():
+            keys.update(pq.read_table(part, columns=["query_id"]).column("query_id").to_pylist())
+        return keys
+
+    def load_checkpoint(self) -> Dict:
+        path = os.path.join(self.path, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_json(self, name: str, data: Dict) -> None:
+        tmp = os.path.join(self.path, name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, os.path.join(self.path, name))
+
+    def write_part(self, rows: List[Dict], checkpoint: Dict) -> None:
+        """
+        Write `rows` as the next part, then the checkpoint (each atomically).
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if rows:
+            self._parts += 1
+            table = pa.Table.from_pylist(rows, schema=_schema())
+            name = f"part-{self._parts:05d}.parquet"
+            tmp = os.path.join(self.path, f".{name}.tmp")
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, os.path.join(self.path, name))
+        self._write_json(CHECKPOINT_FILE, checkpoint)
+
+    def log_error(self, query_id: str, query: str, error: str) -> None:
+        with open(os.path.join(self.path, ERRORS_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"query_id": query_id, "query": query, "error": error, "at": time.time()},
+                               ensure_ascii=False) + "\n")
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("query_id", pa.string()),
+        ("query", pa.string()),
+        ("model", pa.string()),
+        ("title", pa.string()),
+        ("reply", pa.string()),
+        ("candidates", pa.list_(pa.string())),
+        ("llm_calls", pa.int8()),
+        ("cached", pa.bool_()),
+        ("latency_ms", pa.float32()),
+        ("created_at", pa.float64()),
+    ])
+
+
+def _answer(query_id: str, query: str, model: str, semantic_cache: bool) -> Dict:
+    from chatbot.agent import recommend
+
+    t0 = time.perf_counter()
+    result = recommend(query, model=model, semantic_cache=semantic_cache)
+    return {
+        "query_id": query_id,
+        "query": query,
+        "model": model,
+        "title": result["title"],
+        "reply": result["reply"],
+        "candidates": result["candidates"],
+        "llm_calls": result["llm_calls"],
+        "cached": result["cached"],
+        "latency_ms": (time.perf_counter() - t0) * 1000,
+        "created_at": time.time(),
+    }
+
+
+def run_precompute(seeds_path: str, out_dir: str, model: str = "gpt-4o-mini", workers: int = PRECOMPUTE_WORKERS,
+                   flush_every: int = FLUSH_EVERY, limit: Optional[int] = None,
+                   semantic_cache: bool = False) -> Dict:
+    """
+    Answer every seed of `seeds_path` not yet in `out_dir`, checkpointing as it goes.
+
+    Args:
+        seeds_path: JSON lines file of seed queries (see `iter_seeds`).
+        out_dir: Parquet dataset directory (resumed if it exists).
+        model: Chat model for ambiguous selections.
+        workers: Queries answered at the same time; at most `2 * workers` are queued.
+        flush_every: Answers per Parquet part / checkpoint.
+        limit: Stop after this many new queries (None: all).
+        semantic_cache: Serve paraphrases from the semantic cache; off by default, so every
+            seed gets its own answer instead of a near-duplicate's.
+
+    Returns:
+        Report of this run: "done", "skipped", "errors", "seconds", "queries_per_s",
+        "llm_calls", "usage", "cost_usd"; "total" holds the same counters over all runs.
+    """
+    from chatbot.openai_clients import client_usage
+
+    store = ParquetStore(out_dir)
+    done_keys = store.done_keys()
+    total = store.load_checkpoint().get("total", {})
+    report = {"done": 0, "skipped": 0, "errors": 0, "llm_calls": 0}
+    rows: List[Dict] = []
+    usage_before = client_usage()
+    start = time.perf_counter()
+
+    def _checkpoint() -> Dict:
+        run = dict(report, seconds=time.perf_counter() - start, usage=_usage_delta(usage_before, client_usage()))
+        merged = {key: total.get(key, 0) + run[key] for key in ("done", "errors", "llm_calls", "seconds")}
+        merged["usage"] = _merge_usage(total.get("usage", {}), run["usage"])
+        return {"seeds": os.path.abspath(seeds_path), "model": model, "updated_at": time.time(), "total": merged}
+
+    def _flush() -> None:
+        store.write_part(rows, _checkpoint())
+        rows.clear()
+
+    # Results are collected on the submitting thread only
+    def _collect(future, query_id: str, query: str) -> None:
+        try:
+            row = future.result()
+        except Exception as e:
+            print(f"Precompute failed for {query!r}: {e}")
+            store.log_error(query_id, query, f"{type(e).__name__}: {e}")
+            report["errors"] += 1
+            return
+        rows.append(row)
+        report["done"] += 1
+        report["llm_calls"] += row["llm_calls"]
+        if len(rows) >= flush_every:
+            _flush()
+
+    submitted = set()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="precompute") as pool:
+            pending = {}
+            for query_id, query in iter_seeds(seeds_path):
+                if query_id in done_keys or query_id in submitted:
+                    report["skipped"] += 1
+                    continue
+                if limit is not None and len(submitted) >= limit:
+                    break
+                submitted.add(query_id)
+                pending[pool.submit(_answer, query_id, query, model, semantic_cache)] = (query_id, query)
+                # Bounded queue: the seed file is streamed, never loaded whole
+                while len(pending) >= 2 * workers:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _collect(future, *pending.pop(future))
+            for future in list(pending):
+                _collect(future, *pending.pop(future))
+    finally:
+        _flush()
+
+    seconds = time.perf_counter() - start
+    report["seconds"] = seconds
+    report["queries_per_s"] = report["done"] / seconds if seconds else 0.0
+    report["usage"] = _usage_delta(usage_before, client_usage())
+    report["cost_usd"] = estimate_cost(report["usage"])
+    report["total"] = store.load_checkpoint().get("total", {})
+    report["total"]["cost_usd"] = estimate_cost(report["total"].get("usage", {}))
+
+    return report
+
+
+def print_report(report: Dict) -> None:
+    cost = report["cost_usd"]
+    print(f"Precomputed {report['done']} answers in {report['seconds']:.1f}s "
+          f"({report['queries_per_s']:.1f} queries/s), {report['skipped']} already done, "
+          f"{report['errors']} errors, {report['llm_calls']} LLM selections.")
+    for model, usage in sorted(report["usage"].items()):
+        print(f"  {model:<24} {usage['calls']:>7} calls {usage['prompt_tokens']:>10} prompt tok "
+              f"{usage['completion_tokens']:>9} completion tok")
+    print(f"Estimated API cost: {'n/a' if cost is None else f'${cost:.4f}'} "
+          f"(all runs: {report['total'].get('done', 0)} answers, "
+          f"${report['total'].get('cost_usd') or 0:.4f})")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute recommendations for seed queries into Parquet.")
+    parser.add_argument("seeds", help="JSON lines file of seed queries")
+    parser.add_argument("out", nargs="?", default="outputs/precomputed", help="Parquet dataset directory")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--workers", type=int, default=PRECOMPUTE_WORKERS)
+    parser.add_argument("--flush-every", type=int, default=FLUSH_EVERY)
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many new queries")
+    parser.add_argument("--semantic-cache", action="store_true", help="Serve paraphrases from the semantic cache")
+    parser.add_argument("--seeds-from-catalogue", action="store_true",
+                        help="Write one seed per catalogue title and theme to SEEDS and exit")
+    args = parser.parse_args(argv)
+
+    if args.seeds_from_catalogue:
+        seeds = catalogue_seeds()
+        with open(args.seeds, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(seed, ensure_ascii=False) + "\n" for seed in seeds)
+        print(f"Wrote {len(seeds)} seeds to {args.seeds}.")
+        return
+
+    print_report(run_precompute(args.seeds, args.out, model=args.model, workers=args.workers,
+                                flush_every=args.flush_every, limit=args.limit,
+                                semantic_cache=args.semantic_cache))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from typing import Dict, List, Optional
+
+from chatbot.retriever import get_bm25_index
+from chatbot.text_utils import tokenize
+from chatbot.tracing import span
+
+
+# Candidates retrieved for reranking
+RERANK_CANDIDATES = 5
+
+# score = cosine similarity + LEXICAL_WEIGHT * idf-weighted share of query terms found in the book.
+# The similarity comes from Chroma's L2 distance on unit-length embeddings (d = 2 - 2*cos).
+LEXICAL_WEIGHT = 0.1
+
+# A top candidate beyond the distance gate can still be picked locally when its overlap leads
+# the runner-up's by this much, i.e. most informative query words occur only in that book
+LEXICAL_MIN_LEAD = 0.5
+
+
+def lexical_overlap(query_terms: Dict[str, float], text: str) -> float:
+    """
+    Share of the query's IDF weight carried by terms that also occur in `text` (0.0 to 1.0).
+
+    Args:
+        query_terms: Query terms mapped to their IDF (terms no book contains are left out).
+        text: Candidate title and summary.
+    """
+    total = sum(query_terms.values())
+    if not total:
+        return 0.0
+    found = set(tokenize(text))
+
+    return sum(weight for term, weight in query_terms.items() if term in found) / total
+
+
+def rerank(query: str, results: dict) -> List[Dict]:
+    """
+    Rerank a `search_books` result by vector similarity plus lexical overlap with the summaries.
+
+    Query terms are weighted by their IDF in the BM25 index, so words shared by
+    every book (or by none, e.g. Romanian filler words against English summaries)
+    do not move the ranking.
+
+    Returns:
+        Candidates, best first, as dicts with title, document, distance, similarity,
+        overlap and score.
+    """
+    metadatas = (results.get("metadatas") or [[]])[0]
+    documents = (results.get("documents") or [[]])[0] or [""] * len(metadatas)
+    distances = (results.get("distances") or [[]])[0] or [2.0] * len(metadatas)
+
+    with span("rerank", candidates=len(metadatas)):
+        index = get_bm25_index()
+        query_terms = {term: index.term_idf(term) for term in set(tokenize(query))}
+        query_terms = {term: idf for term, idf in query_terms.items() if idf > 0}
+
+        candidates = []
+        for metadata, document, distance in zip(metadatas, documents, distances):
+            title = metadata.get("title", "")
+            similarity = 1.0 - distance / 2.0
+            overlap = lexical_overlap(query_terms, f"{title} {document or ''}")
+            candidates.append({
+                "title": title,
+                "document": document or "",
+                "distance": distance,
+                "similarity": similarity,
+                "overlap": overlap,
+                "score": similarity + LEXICAL_WEIGHT * overlap,
+            })
+
+        # Stable sort: ties keep the retrieval order
+        candidates.sort(key=lambda c: -c["score"])
+
+    return candidates
+
+
+def confident_pick(candidates: List[Dict], max_distance: float, min_margin: float,
+                   min_lead: float = LEXICAL_MIN_LEAD) -> Optional[str]:
+    """
+    Top reranked title if it is clearly the best candidate, else None (ask the LLM).
+
+    The top score must be `min_margin` ahead of the runner-up, and the top book
+    must either be within `max_distance` or lead the runner-up's lexical overlap
+    by `min_lead`.
+    """
+    if not candidates:
+        return None
+    top = candidates[0]
+    runner_up = candidates[1] if len(candidates) > 1 else {"score": float("-inf"), "overlap": 0.0}
+
+    if top["score"] - runner_up["score"] < min_margin:
+        return None
+    if top["distance"] > max_distance and top["overlap"] - runner_up["overlap"] < min_lead:
+        return None
+
+    return top["title"]
@@ -0,0 +1,513 @@
+"""
+Resilience layer shared by every OpenAI call: rate limiting, retries, hedging and request coalescing.
+
+`ResilientClient` wraps an `OpenAI` or `AsyncOpenAI` client (see `chatbot.openai_clients`)
+and keeps its call surface. `chat.completions.create`, `embeddings.create` and
+`images.generate` go through one process-wide `RequestLayer`; any other attribute
+is passed through to the wrapped client.
+
+For each request, the layer:
+- waits for the model's token buckets (requests and tokens per minute), so bursts
+  are smoothed locally instead of being answered with 429;
+- retries 429s, 5xx errors and connection errors with jittered exponential backoff,
+  honouring `Retry-After` (a 429 also pauses the model's bucket for every caller);
+- optionally hedges idempotent requests: if no answer arrived after
+  `HEDGE_AFTER_MS`, a second copy is sent and the first answer wins;
+- coalesces identical concurrent requests (singleflight), so they share one call.
+
+Streaming requests are throttled and retried, but never hedged or coalesced.
+Counters are kept in `ClientMetrics`; read them with `RequestLayer.metrics.snapshot()`
+(token usage per model with `RequestLayer.metrics.usage()`).
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from chatbot.tracing import current_span
+
+
+# Requests and tokens per minute per model (OpenAI usage tier 1). Override with
+# OPENAI_RATE_LIMITS="gpt-4o-mini=5000:4000000,dall-e-3=7", or "off" to disable.
+RATE_LIMITS: Dict[str, Tuple[int, Optional[int]]] = {
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-4.1-mini": (500, 200_000),
+    "gpt-4.1-nano": (500, 200_000),
+    "text-embedding-3-small": (3000, 1_000_000),
+    "dall-e-3": (5, None),
+}
+DEFAULT_RATE_LIMIT: Tuple[int, Optional[int]] = (500, 200_000)
+# Bucket capacity, in seconds of quota: larger bursts are spread out
+BURST_SECONDS = 10
+
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 20.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Send a second copy of an idempotent request that has not answered after this many
+# milliseconds and keep the first answer (0 disables hedging)
+HEDGE_AFTER_MS = float(os.getenv("OPENAI_HEDGE_AFTER_MS", "0"))
+HEDGE_MAX_WORKERS = 32
+
+# Calls routed through the layer: attribute path -> whether hedging is allowed
+WRAPPED_CALLS: Dict[Tuple[str, ...], bool] = {
+    ("chat", "completions", "create"): True,
+    ("embeddings", "create"): True,
+    ("images", "generate"): False,
+}
+
+
+def rate_limits_from_env() -> Optional[Dict[str, Tuple[int, Optional[int]]]]:
+    """
+    `RATE_LIMITS` with the overrides of `OPENAI_RATE_LIMITS` applied (None if set to "off").
+    """
+    value = os.getenv("OPENAI_RATE_LIMITS", "").strip()
+    if value.lower() == "off":
+        return None
+
+    limits = dict(RATE_LIMITS)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        model, _, quota = item.partition("=")
+        rpm, _, tpm = quota.partition(":")
+        limits[model.strip()] = (int(rpm), int(tpm) if tpm else None)
+    return limits
+
+
+def estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    """
+    Rough token cost of a request (about 4 characters per token, plus `max_tokens`).
+    """
+    chars = 0
+    for message in kwargs.get("messages") or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            chars += len(content)
+    for field in ("input", "prompt"):
+        value = kwargs.get(field)
+        if isinstance(value, str):
+            chars += len(value)
+        elif isinstance(value, list):
+            chars += sum(len(v) for v in value if isinstance(v, str))
+    return chars // 4 + 1 + int(kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0)
+
+
+def _request_key(path: Tuple[str, ...], kwargs: Dict[str, Any]) -> str:
+    return json.dumps([path, kwargs], sort_keys=True, ensure_ascii=False, default=repr)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `per_minute / 60` tokens per second.
+
+    It holds at most `BURST_SECONDS` of quota. `reserve` never blocks: it takes the
+    tokens (going into debt) and returns how long the caller must wait, so callers
+    are served in arrival order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens and return the seconds to wait before using them.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            return max(0.0, self.updated - now) + max(0.0, -self.tokens) / self.rate
+
+    def try_reserve(self, amount: float) -> bool:
+        """
+        Take `amount` tokens only if they are available right away.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.updated > now or self.tokens < amount:
+                return False
+            self.tokens -= amount
+            return True
+
+    def pause(self, seconds: float) -> None:
+        """
+        Empty the bucket and stop refilling it for `seconds` (e.g. after a 429).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = max(self.updated, now + seconds)
+
+
+class ClientMetrics:
+    """
+    Thread-safe counters of the request layer.
+
+    - requests: calls made by the application
+    - attempts: requests actually sent to the API (including retries and hedges)
+    - retries / failures: retried attempts / requests that failed for good
+    - throttled / throttle_wait_s: requests delayed by the token buckets, and total delay
+    - hedged / hedge_wins: hedges sent / hedges that answered first
+    - coalesced: requests served by an identical request already in flight
+
+    Per-model usage (answered attempts and the tokens their responses report) is kept
+    apart, see `usage`; streamed responses are counted without tokens.
+    """
+
+    FIELDS = ("requests", "attempts", "retries", "failures", "throttled", "throttle_wait_s",
+              "hedged", "hedge_wins", "coalesced")
+    USAGE_FIELDS = ("calls", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, float] = dict.fromkeys(self.FIELDS, 0)
+        self._usage: Dict[str, Dict[str, int]] = {}
+
+    def add(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counts[name] += value
+
+    def add_usage(self, model: str, usage) -> None:
+        """
+        Count one answered call of `model` and the tokens of its OpenAI `usage` object (if any).
+        """
+        with self._lock:
+            counts = self._usage.setdefault(model, dict.fromkeys(self.USAGE_FIELDS, 0))
+            counts["calls"] += 1
+            for field in ("prompt_tokens", "completion_tokens"):
+                counts[field] += getattr(usage, field, None) or 0
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        """
+        {model: {"calls", "prompt_tokens", "completion_tokens"}} since start (or the last `reset`).
+        """
+        with self._lock:
+            return {model: dict(counts) for model, counts in self._usage.items()}
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["throttle_wait_s"] = round(counts["throttle_wait_s"], 3)
+        return counts
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+            self._usage = {}
+
+
+class RequestLayer:
+    """
+    Throttling, retries, hedging and singleflight for OpenAI calls (see the module docstring).
+
+    One instance is shared by the sync and async clients of a process.
+
+    Args:
+        rate_limits: {model: (requests/min, tokens/min or None)}; None disables throttling.
+        max_retries: Retries after the first attempt.
+        hedge_after_ms: Hedging delay (0 disables hedging).
+    """
+
+    def __init__(self, rate_limits: Optional[Dict[str, Tuple[int, Optional[int]]]] = None,
+                 max_retries: int = MAX_RETRIES, hedge_after_ms: float = HEDGE_AFTER_MS):
+        self.rate_limits = rate_limits
+        self.max_retries = max_retries
+        self.hedge_after = hedge_after_ms / 1000.0
+        self.metrics = ClientMetrics()
+        self._buckets: Dict[str, Tuple[TokenBucket, Optional[TokenBucket]]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[Tuple[int, str], "asyncio.Task"] = {}
+        self._lock = threading.Lock()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+
+    def configure_rate_limits(self, rate_limits: Optional[Dict[str, Tuple[int, Optional[int]]]]) -> None:
+        """
+        Replace the per-model quotas (None disables throttling).
+        """
+        with self._lock:
+            self.rate_limits = rate_limits
+            self._buckets = {}
+
+    # --- throttling ---
+
+    def _buckets_for(self, model: str) -> Optional[Tuple[TokenBucket, Optional[TokenBucket]]]:
+        if self.rate_limits is None:
+            return None
+        with self._lock:
+            buckets = self._buckets.get(model)
+            if buckets is None:
+                rpm, tpm = self.rate_limits.get(model, DEFAULT_RATE_LIMIT)
+                buckets = self._buckets[model] = (TokenBucket(rpm), TokenBucket(tpm) if tpm else None)
+        return buckets
+
+    def _reserve(self, model: str, tokens: int) -> float:
+        buckets = self._buckets_for(model)
+        if buckets is None:
+            return 0.0
+        requests, token_bucket = buckets
+        delay = requests.reserve(1)
+        if token_bucket is not None:
+            delay = max(delay, token_bucket.reserve(tokens))
+        if delay > 0:
+            self.metrics.add("throttled")
+            self.metrics.add("throttle_wait_s", delay)
+        return delay
+
+    def _try_reserve(self, model: str, tokens: int) -> bool:
+        buckets = self._buckets_for(model)
+        if buckets is None:
+            return True
+        requests, token_bucket = buckets
+        # A hedge only uses spare quota: a token shortfall leaves its request unused, which is acceptable
+        return requests.try_reserve(1) and (token_bucket is None or token_bucket.try_reserve(tokens))
+
+    # --- retries ---
+
+    def _retry_delay(self, error: Exception, attempt: int, model: str) -> Optional[float]:
+        """
+        Backoff before the next attempt, or None if `error` must not be retried.
+        """
+        status = getattr(error, "status_code", None)
+        if status is None:
+            # Connection errors and timeouts (APIConnectionError, APITimeoutError)
+            retryable = type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+        else:
+            # An exhausted quota will not recover by retrying
+            retryable = status in RETRYABLE_STATUS and getattr(error, "code", None) != "insufficient_quota"
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        # The server's hint wins; otherwise full-jitter exponential backoff
+        delay = None
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                delay = float(headers["retry-after-ms"]) / 1000.0
+            elif headers.get("retry-after"):
+                delay = float(headers["retry-after"])
+        except ValueError:
+            pass
+        if delay is None or not 0 < delay <= RETRY_MAX_SECONDS:
+            delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+        if status == 429:
+            buckets = self._buckets_for(model)
+            if buckets is not None:
+                buckets[0].pause(delay)
+        return delay
+
+    def _note_retry(self, attempt: int) -> None:
+        self.metrics.add("retries")
+        current_span().set(retries=attempt + 1)
+
+    # --- sync path ---
+
+    def call(self, path: Tuple[str, ...], fn: Callable, kwargs: Dict[str, Any]):
+        """
+        Run `fn(**kwargs)` (the client method at `path`) through the layer.
+        """
+        self.metrics.add("requests")
+        hedge = WRAPPED_CALLS[path] and self.hedge_after > 0
+        if kwargs.get("stream"):
+            return self._with_retries(fn, kwargs, hedge=False)
+
+        key = _request_key(path, kwargs)
+        with self._lock:
+            leader = self._inflight.get(key)
+            if leader is None:
+                future = self._inflight[key] = Future()
+        if leader is not None:
+            self.metrics.add("coalesced")
+            return leader.result()
+
+        try:
+            result = self._with_retries(fn, kwargs, hedge)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _with_retries(self, fn: Callable, kwargs: Dict[str, Any], hedge: bool):
+        model = kwargs.get("model", "")
+        tokens = estimate_tokens(kwargs)
+        attempt = 0
+        while True:
+            delay = self._reserve(model, tokens)
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                return self._hedged(fn, kwargs, model, tokens) if hedge else self._attempt(fn, kwargs)
+            except Exception as e:
+                backoff = self._retry_delay(e, attempt, model)
+                if backoff is None:
+                    self.metrics.add("failures")
+                    raise
+                self._note_retry(attempt)
+                attempt += 1
+                time.sleep(backoff)
+
+    def _attempt(self, fn: Callable, kwargs: Dict[str, Any]):
+        self.metrics.add("attempts")
+        result = fn(**kwargs)
+        self.metrics.add_usage(kwargs.get("model", ""), getattr(result, "usage", None))
+        return result
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="openai-hedge")
+            return self._hedge_pool
+
+    def _hedged(self, fn: Callable, kwargs: Dict[str, Any], model: str, tokens: int):
+        pool = self._hedge_executor()
+        primary = pool.submit(self._attempt, fn, kwargs)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done or not self._try_reserve(model, tokens):
+            return primary.result()
+
+        # A thread cannot be cancelled: the slower copy finishes in the background and is dropped
+        self.metrics.add("hedged")
+        backup = pool.submit(self._attempt, fn, kwargs)
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    if f is backup:
+                        self.metrics.add("hedge_wins")
+                    return f.result()
+        return primary.result()
+
+    # --- async path ---
+
+    async def acall(self, path: Tuple[str, ...], fn: Callable, kwargs: Dict[str, Any]):
+        """
+        Async `call`, for methods of an `AsyncOpenAI` client.
+        """
+        self.metrics.add("requests")
+        hedge = WRAPPED_CALLS[path] and self.hedge_after > 0
+        if kwargs.get("stream"):
+            return await self._awith_retries(fn, kwargs, hedge=False)
+
+        key = (id(asyncio.get_running_loop()), _request_key(path, kwargs))
+        task = self._ainflight.get(key)
+        if task is not None:
+            self.metrics.add("coalesced")
+        else:
+            task = asyncio.ensure_future(self._awith_retries(fn, kwargs, hedge))
+            self._ainflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+        # A cancelled caller must not cancel the call other callers are waiting for
+        return await asyncio.shield(task)
+
+    def _release(self, key: Tuple[int, str], task: "asyncio.Task") -> None:
+        self._ainflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller went away
+
+    async def _awith_retries(self, fn: Callable, kwargs: Dict[str, Any], hedge: bool):
+        model = kwargs.get("model", "")
+        tokens = estimate_tokens(kwargs)
+        attempt = 0
+        while True:
+            delay = self._reserve(model, tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                if hedge:
+                    return await self._ahedged(fn, kwargs, model, tokens)
+                return await self._aattempt(fn, kwargs)
+            except Exception as e:
+                backoff = self._retry_delay(e, attempt, model)
+                if backoff is None:
+                    self.metrics.add("failures")
+                    raise
+                self._note_retry(attempt)
+                attempt += 1
+                await asyncio.sleep(backoff)
+
+    async def _aattempt(self, fn: Callable, kwargs: Dict[str, Any]):
+        self.metrics.add("attempts")
+        result = await fn(**kwargs)
+        self.metrics.add_usage(kwargs.get("model", ""), getattr(result, "usage", None))
+        return result
+
+    async def _ahedged(self, fn: Callable, kwargs: Dict[str, Any], model: str, tokens: int):
+        primary = asyncio.ensure_future(self._aattempt(fn, kwargs))
+        backup = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+            if done or not self._try_reserve(model, tokens):
+                return await primary
+
+            self.metrics.add("hedged")
+            backup = asyncio.ensure_future(self._aattempt(fn, kwargs))
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        if t is backup:
+                            self.metrics.add("hedge_wins")
+                        return t.result()
+            return primary.result()
+        finally:
+            # The slower copy is cancelled
+            for t in (primary, backup):
+                if t is not None and not t.done():
+                    t.cancel()
+
+
+class ResilientClient:
+    """
+    Proxy of an `OpenAI` / `AsyncOpenAI` client whose `WRAPPED_CALLS` go through `layer`.
+
+    Args:
+        client: The wrapped client.
+        layer: Shared request layer.
+        is_async: Whether `client` is an `AsyncOpenAI` client.
+    """
+
+    def __init__(self, client, layer: RequestLayer, is_async: bool, _path: Tuple[str, ...] = ()):
+        self._client = client
+        self._layer = layer
+        self._is_async = is_async
+        self._path = _path
+
+    @property
+    def wrapped(self):
+        """The underlying client."""
+        return self._client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        path = self._path + (name,)
+        if path in WRAPPED_CALLS:
+            if self._is_async:
+                return lambda **kwargs: self._layer.acall(path, attr, kwargs)
+            return lambda **kwargs: self._layer.call(path, attr, kwargs)
+        if any(call[:len(path)] == path for call in WRAPPED_CALLS):
+            return ResilientClient(attr, self._layer, self._is_async, path)
+        return attr
@@ -1,20 +1,178 @@
+import asyncio
 import os
-import chromadb
-from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Collection, Dict, List, Optional, Tuple
+from chatbot.bm25 import BM25Index, reciprocal_rank_fusion
+from chatbot.embedding_cache import EmbeddingCache
+from chatbot.facets import FacetIndex, infer_filters, normalize_filters, to_where
+from chatbot.ingestion import iter_book_summaries, sync_collection
+from chatbot.openai_clients import get_async_client, get_client
+from chatbot.tracing import span, traced
+from tools.summary_store import ensure_store
+
+# chromadb and numpy are imported on first use (see the accessors below), so
+# importing the retriever does not open the database or load either package
+if TYPE_CHECKING:
+    from chatbot.sharding import ShardedRetriever
+    from chatbot.vector_index import NumpyVectorIndex
 
 
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
-chroma_client = chromadb.PersistentClient(path="db/chroma_db")
-embedding_function = OpenAIEmbeddingFunction(
-    api_key=openai_api_key,
-    model_name="text-embedding-3-small"
-)
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Retrieval backend: "chroma" (default), "numpy" (in-process memory-mapped index) or
+# "sharded" (parallel fan-out over the Chroma shards of `SMART_LIBRARIAN_SHARDS`, see chatbot/sharding.py)
+RETRIEVER_BACKEND = os.getenv("SMART_LIBRARIAN_RETRIEVER", "chroma")
+NUMPY_INDEX_PATH = "db/numpy_index"
+_numpy_index = None
+_sharded_retriever = None
+
+# Hybrid retrieval: BM25 over titles and summaries, fused with the vector ranking by
+# reciprocal rank fusion. A query naming exactly one title skips the embedding call.
+RETRIEVER_HYBRID = os.getenv("SMART_LIBRARIAN_HYBRID", "1") != "0"
+HYBRID_CANDIDATES = 20
+RRF_K = 60
+BOOK_SUMMARIES_PATH = "data/book_summaries.txt"
+_bm25_index = None
+
+# Metadata filters (themes, language, author; see chatbot/facets.py). With
+# SMART_LIBRARIAN_INFER_FILTERS=1 and no explicit filters, a query naming catalogue themes
+# ("o carte despre razboi") is restricted to books with those themes, falling back to the
+# whole catalogue if none is left. Off by default, so unfiltered searches rank the whole catalogue.
+RETRIEVER_INFER_FILTERS = os.getenv("SMART_LIBRARIAN_INFER_FILTERS", "0") == "1"
+_facet_index = None
+
+# Callbacks run after a sync that changed the corpus (e.g. to drop answer caches)
+_reingest_callbacks: List[Callable[[], None]] = []
+
+# Keys of a `collection.query` result holding one list per query (the others, such as
+# "included", describe the whole result)
+PER_QUERY_KEYS = ("ids", "embeddings", "documents", "uris", "data", "metadatas", "distances")
+
+# Batch search: texts per embedding request, and max embedding requests in flight
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_MAX_WORKERS = 4
+
+CHROMA_PATH = "db/chroma_db"
+COLLECTION_NAME = "book_summaries"
+# Distance space of the Chroma collections. The fast-path and rerank thresholds, the
+# fused-rank worst case and the NumPy backend all assume squared L2 on unit vectors
+# (2 - 2cos), the space of the shipped store; pinned because Chroma may default a new
+# collection to cosine (1 - cos).
+CHROMA_SPACE = "l2"
+_chroma_client = None
+_embedding_function = None
+_collection = None
+
+# Query embeddings are cached in memory and in SQLite, keyed by (model, normalized text)
+embedding_cache = EmbeddingCache(path="db/embedding_cache.sqlite3")
+
+
+def get_chroma_client():
+    """
+    Return the process-wide Chroma `PersistentClient`, opening it on first use.
+    """
+    global _chroma_client
+    if _chroma_client is None:
+        import chromadb
+
+        _chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 
-collection = chroma_client.get_or_create_collection(
-    name="book_summaries",
-    embedding_function=embedding_function
-)
+    return _chroma_client
+
+
+def get_embedding_function():
+    """
+    Return the OpenAI embedding function used for documents and queries, creating it on first use.
+
+    Its requests are sent with the shared client (`chatbot.openai_clients.get_client`),
+    so they are rate limited, retried and counted like every other OpenAI call.
+    """
+    global _embedding_function
+    if _embedding_function is None:
+        from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+
+        _embedding_function = OpenAIEmbeddingFunction(
+            api_key=openai_api_key,
+            model_name=EMBEDDING_MODEL
+        )
+        _embedding_function.client = get_client()
+
+    return _embedding_function
+
+
+def set_embedding_function(function) -> None:
+    """
+    Replace the embedding function (None resets it to be re-created lazily).
+
+    The collection handle is dropped too, so it is re-opened with the new function.
+    """
+    global _embedding_function, _collection, _sharded_retriever
+    _embedding_function = function
+    _collection = None
+    if _sharded_retriever is not None:
+        _sharded_retriever.close()
+        _sharded_retriever = None
+
+
+def _open_collection(client, name: str):
+    # Open (or create, in `CHROMA_SPACE`) a collection; an existing collection keeps the
+    # space it was created with, so a mismatch is reported instead of silently changing scores
+    collection = client.get_or_create_collection(
+        name=name,
+        embedding_function=get_embedding_function(),
+        configuration={"hnsw": {"space": CHROMA_SPACE}},
+    )
+    space = ((collection.configuration_json or {}).get("hnsw") or {}).get("space", CHROMA_SPACE)
+    if space != CHROMA_SPACE:
+        print(f"Collection {name!r} uses the {space!r} distance instead of {CHROMA_SPACE!r}; "
+              f"delete it and re-run the ingestion so distance thresholds apply.")
+    return collection
+
+
+def get_collection():
+    """
+    Return the `book_summaries` Chroma collection, opening it on first use.
+    """
+    global _collection
+    if _collection is None:
+        _collection = _open_collection(get_chroma_client(), COLLECTION_NAME)
+
+    return _collection
+
+
+def get_sharded_retriever() -> "ShardedRetriever":
+    """
+    Return the process-wide `ShardedRetriever` over the shards of `SMART_LIBRARIAN_SHARDS`, opening it on first use.
+
+    Shards in `CHROMA_PATH` share the main Chroma client; other directories get their own.
+    """
+    global _sharded_retriever
+    if _sharded_retriever is None:
+        import chromadb
+        from chatbot.sharding import SHARDS_SPEC, ShardedRetriever, parse_shards
+
+        shards = {}
+        for name, (path, collection_name) in parse_shards(SHARDS_SPEC, CHROMA_PATH, COLLECTION_NAME).items():
+            client = get_chroma_client() if path == CHROMA_PATH else chromadb.PersistentClient(path=path)
+            shards[name] = _open_collection(client, collection_name)
+        _sharded_retriever = ShardedRetriever(shards)
+
+    return _sharded_retriever
+
+
+def __getattr__(name: str):
+    # `collection`, `chroma_client` and `embedding_function` used to be created at
+    # import; keep them readable as module attributes, resolved on first access.
+    if name == "collection":
+        return get_collection()
+    if name == "chroma_client":
+        return get_chroma_client()
+    if name == "embedding_function":
+        return get_embedding_function()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def parse_book_summaries(file_path: str):
@@ -30,62 +188,488 @@ def parse_book_summaries(file_path: str):
         ## Title: Another Title
         Another summary...
 
-    The function splits on '## Title:' and assumes:
-      - The first line after '## Title:' is the book title.
-      - The remaining lines in that chunk form the summary.
+    Records are streamed by `chatbot.ingestion.iter_book_summaries`; IDs are
+    derived from the title (see `book_id`), so they stay stable when the file
+    is reordered or edited.
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    chunks = content.split("## Title:")
     documents = []
     metadatas = []
     ids = []
 
-    for i, chunk in enumerate(chunks):
-        if chunk.strip() == "":
-            continue
-        lines = chunk.strip().split("\n")
-        title = lines[0].strip()
-        summary = " ".join(lines[1:]).strip()
+    for rid, summary, metadata in iter_book_summaries(file_path):
         documents.append(summary)
-        metadatas.append({"title": title})
-        ids.append(f"book_{i}")
+        metadatas.append(metadata)
+        ids.append(rid)
 
     return documents, metadatas, ids
 
 
-def populate_chroma():
+def on_reingest(callback: Callable[[], None]) -> None:
+    """
+    Register `callback` to run whenever `populate_chroma` changes the corpus.
+    """
+    _reingest_callbacks.append(callback)
+
+
+def _sync_shards(file_path: str) -> Dict[str, int]:
     """
-    Load book summaries from disk and insert them into the Chroma collection
-    — but only if the collection is currently empty.
+    Sync every shard with its share of `file_path` (see `ShardedRetriever.assign`); returns summed counts.
     """
-    file_path = "data/book_summaries.txt"
-    documents, metadatas, ids = parse_book_summaries(file_path)
-    existing = collection.count()
+    sharded = get_sharded_retriever()
+    total = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    for name, shard in sharded.shards.items():
+        stats = sync_collection(shard, file_path, keep=lambda rid, meta, name=name: sharded.assign(rid, meta) == name)
+        for key in total:
+            total[key] += stats[key]
 
-    if existing == 0:
-        collection.add(documents=documents, metadatas=metadatas, ids=ids)
-        print(f"Loaded {len(documents)} summaries into ChromaDB.")
+    return total
+
+
+def populate_chroma(file_path: str = BOOK_SUMMARIES_PATH):
+    """
+    Sync the Chroma collection with the book summaries file.
+
+    Only new or edited summaries are embedded and upserted; summaries removed
+    from the file are deleted. The BM25 index is rebuilt from the same file, and
+    the summary store (`tools.summary_store`) is regenerated if the file changed.
+    If anything changed and a NumPy index exists, it is re-exported so both
+    backends stay consistent, and every callback registered with `on_reingest` is run.
+    With the "sharded" backend, each shard is synced with its share of the file instead.
+    """
+    global _numpy_index
+    from chatbot.vector_index import NumpyVectorIndex
+
+    if RETRIEVER_BACKEND == "sharded":
+        stats = _sync_shards(file_path)
     else:
-        print(f"ChromaDB already populated with {existing} entries.")
+        stats = sync_collection(get_collection(), file_path)
+    changed = stats["added"] + stats["updated"] + stats["deleted"]
+
+    print(
+        f"ChromaDB synced: {stats['added']} added, {stats['updated']} updated, "
+        f"{stats['deleted']} deleted, {stats['unchanged']} unchanged."
+    )
+
+    build_bm25_index(file_path)
+    ensure_store(source=file_path)
 
+    if changed and RETRIEVER_BACKEND != "sharded" and (
+            _numpy_index is not None or NumpyVectorIndex.exists(NUMPY_INDEX_PATH)):
+        _numpy_index = export_numpy_index(NUMPY_INDEX_PATH)
 
-def search_books(query: str, n_results: int = 2):
+    if changed:
+        for callback in _reingest_callbacks:
+            callback()
+
+    return stats
+
+
+def export_numpy_index(path: str = NUMPY_INDEX_PATH) -> "NumpyVectorIndex":
+    """
+    Copy the embeddings already stored in the Chroma collection into a NumPy index.
+
+    No embedding requests are made: vectors, documents and metadatas are read
+    back with `collection.get`.
+    """
+    from chatbot.vector_index import NumpyVectorIndex
+
+    data = get_collection().get(include=["embeddings", "documents", "metadatas"])
+    index = NumpyVectorIndex.build(
+        path,
+        ids=data["ids"],
+        embeddings=data["embeddings"],
+        documents=data["documents"],
+        metadatas=data["metadatas"],
+    )
+    print(f"Exported {index.count()} vectors to {path}.")
+
+    return index
+
+
+def get_numpy_index() -> "NumpyVectorIndex":
+    """
+    Return the process-wide NumPy index, exporting it from Chroma on first use.
     """
-    Run a semantic search over the 'book_summaries' collection.
+    global _numpy_index
+    from chatbot.vector_index import NumpyVectorIndex
+
+    if _numpy_index is None:
+        if NumpyVectorIndex.exists(NUMPY_INDEX_PATH):
+            _numpy_index = NumpyVectorIndex.load(NUMPY_INDEX_PATH)
+        else:
+            _numpy_index = export_numpy_index(NUMPY_INDEX_PATH)
+
+    return _numpy_index
+
+
+def build_bm25_index(file_path: str = BOOK_SUMMARIES_PATH) -> BM25Index:
+    """
+    (Re)build the process-wide BM25 index from the book summaries file.
+    """
+    global _bm25_index, _facet_index
+    _bm25_index = BM25Index.from_records(iter_book_summaries(file_path))
+    _facet_index = FacetIndex.from_metadatas(_bm25_index.metadatas)
+
+    return _bm25_index
+
+
+def get_bm25_index() -> BM25Index:
+    """
+    Return the process-wide BM25 index, building it on first use.
+    """
+    if _bm25_index is None:
+        build_bm25_index()
+
+    return _bm25_index
+
+
+def get_facet_index() -> FacetIndex:
+    """
+    Return the facet index aligned with the BM25 index rows, building both on first use.
+    """
+    if _facet_index is None:
+        build_bm25_index()
+
+    return _facet_index
+
+
+def resolve_filters(query: str, filters: Optional[dict]) -> Tuple[Optional[dict], bool]:
+    """
+    Filters to apply to `query`: `filters` if given (`{}` for none), otherwise, with
+    `RETRIEVER_INFER_FILTERS`, the catalogue themes the query names (`infer_filters`).
+
+    Returns:
+        (normalized filters or None, whether they were inferred).
+    """
+    if filters is not None:
+        return normalize_filters(filters), False
+    if not RETRIEVER_INFER_FILTERS:
+        return None, False
+
+    inferred = infer_filters(query, get_facet_index().values("themes"))
+    return inferred, inferred is not None
+
+
+def title_match(query: str, filters: Optional[dict] = None) -> Optional[dict]:
+    """
+    Answer a query that names exactly one book title from the BM25 index.
+
+    Returns:
+        A single-match `collection.query`-shaped dict with distance 0.0, or
+        None if the query does not name exactly one title (or that book fails `filters`).
+    """
+    index = get_bm25_index()
+    with span("bm25", title_match=False) as s:
+        row = index.match_title(query)
+        if row is not None and filters and not get_facet_index().filter_rows([row], filters):
+            row = None
+        s.set(title_match=row is not None)
+    if row is None:
+        return None
+
+    return {
+        "ids": [[index.ids[row]]],
+        "documents": [[index.documents[row]]],
+        "metadatas": [[index.metadatas[row]]],
+        "distances": [[0.0]],
+    }
+
+
+def fuse_results(query: str, vector_results: dict, n_results: int, filters: Optional[dict] = None) -> dict:
+    """
+    Fuse a single-query vector result with the BM25 ranking of `query` (reciprocal rank fusion).
+
+    Books found only by BM25 have no vector distance of their own; they get
+    the distance of the farthest vector candidate, a lower bound on the real one.
+    BM25 candidates failing `filters` are dropped.
+    """
+    index = get_bm25_index()
+    with span("bm25", title_match=False):
+        rows = [row for row, _ in index.search(query, HYBRID_CANDIDATES)]
+        if filters:
+            rows = get_facet_index().filter_rows(rows, filters)
+        lexical = [index.ids[row] for row in rows]
+
+    vector_ids = vector_results["ids"][0]
+    distances = (vector_results.get("distances") or [[]])[0]
+    known = {
+        rid: (document, metadata, distance)
+        for rid, document, metadata, distance in zip(
+            vector_ids, vector_results["documents"][0], vector_results["metadatas"][0], distances
+        )
+    }
+    farthest = max(distances, default=2.0)
+
+    fused = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    for rid in reciprocal_rank_fusion([vector_ids, lexical], k=RRF_K):
+        if len(fused["ids"][0]) == n_results:
+            break
+        if rid in known:
+            document, metadata, distance = known[rid]
+        else:
+            row = index.rows[rid]
+            document, metadata, distance = index.documents[row], index.metadatas[row], farthest
+        fused["ids"][0].append(rid)
+        fused["documents"][0].append(document)
+        fused["metadatas"][0].append(metadata)
+        fused["distances"][0].append(distance)
+
+    return fused
+
+
+def query_index(query_embeddings, n_results: int = 2, filters: Optional[dict] = None):
+    """
+    Run a vector query against the configured backend (`RETRIEVER_BACKEND`).
+
+    All backends return the same `collection.query`-shaped dict. `filters` restrict the
+    candidates before the scan: the NumPy backend only scans the rows of its facet index
+    matching them, Chroma gets them as a `where` clause (each shard as either, see `ShardedRetriever`).
+    """
+    if RETRIEVER_BACKEND == "numpy":
+        index = get_numpy_index()
+        rows = index.facet_index().rows(filters) if filters else None
+        return index.query(query_embeddings, n_results=n_results, candidate_rows=rows)
+    if RETRIEVER_BACKEND == "sharded":
+        return get_sharded_retriever().query(query_embeddings, n_results=n_results, filters=filters)
+    if RETRIEVER_BACKEND != "chroma":
+        raise ValueError(f"Unknown retriever backend: {RETRIEVER_BACKEND!r}")
+
+    return get_collection().query(query_embeddings=query_embeddings, n_results=n_results, where=to_where(filters))
+
+
+def embed_query(query: str) -> List[float]:
+    """
+    Return the embedding of `query`, served from `embedding_cache` when possible.
+
+    On a miss the query is embedded with the embedding function and stored in the cache.
+    """
+    with span("embedding", model=EMBEDDING_MODEL) as s:
+        vector = embedding_cache.get(query, EMBEDDING_MODEL)
+        s.set(cache_hit=vector is not None)
+        if vector is None:
+            vector = [float(x) for x in get_embedding_function()([query])[0]]
+            embedding_cache.put(query, EMBEDDING_MODEL, vector)
+
+    return vector
+
+
+def drop_titles(results: dict, exclude: Collection[str], n_results: int) -> dict:
+    """
+    Remove the books titled in `exclude` from a single-query result and keep the first `n_results`.
+    """
+    keep = [i for i, m in enumerate(results["metadatas"][0]) if m.get("title") not in exclude][:n_results]
+
+    return {
+        key: [[results[key][0][i] for i in keep]]
+        for key in ("ids", "documents", "metadatas", "distances") if results.get(key) is not None
+    }
+
+
+def _search(query: str, n_results: int, exclude: Collection[str], filters: Optional[dict]) -> dict:
+    k = n_results + len(exclude)
+    if not RETRIEVER_HYBRID:
+        results = query_index([embed_query(query)], n_results=k, filters=filters)
+        return drop_titles(results, exclude, n_results) if exclude else results
+
+    results = title_match(query, filters)
+    if results is not None and results["metadatas"][0][0]["title"] in exclude:
+        results = None
+    if results is None:
+        results = query_index([embed_query(query)], n_results=max(k, HYBRID_CANDIDATES), filters=filters)
+        results = fuse_results(query, results, k, filters)
+        if exclude:
+            results = drop_titles(results, exclude, n_results)
+
+    return results
+
+
+@traced("search_books")
+def search_books(query: str, n_results: int = 2, exclude_titles: Optional[Collection[str]] = None,
+                 filters: Optional[dict] = None):
+    """
+    Run a semantic search over the book summaries (Chroma or NumPy backend).
+
+    With `RETRIEVER_HYBRID` (the default), a query naming exactly one title is
+    answered from the BM25 index without an embedding request; otherwise the
+    vector ranking is fused with the BM25 ranking (see `fuse_results`).
 
     Args:
         query: Natural language search string (any language).
         n_results: How many top matches to return.
+        exclude_titles: Titles to leave out (e.g. books already recommended in this
+            conversation); the index is over-fetched so `n_results` remain.
+        filters: Metadata constraints, e.g. {"themes": ["war"], "language": "en",
+            "author": "George Orwell"}, applied before the vector scan. If None and
+            `RETRIEVER_INFER_FILTERS` is on, they are inferred from the themes the query
+            names (see `resolve_filters`); `{}` always searches the whole catalogue.
 
     Returns:
-        The Chroma query result dict, including documents, metadatas, distances, and ids.
+        The Chroma-shaped query result dict, including documents, metadatas, distances, and ids.
     """
-    results = collection.query(query_texts=[query], n_results=n_results)
-    
+    exclude = set(exclude_titles or ())
+    filters, inferred = resolve_filters(query, filters)
+    results = _search(query, n_results, exclude, filters)
+    if inferred and not results["ids"][0]:
+        results = _search(query, n_results, exclude, None)
+
     return results
 
 
+async def aembed_query(query: str) -> List[float]:
+    """
+    Async `embed_query`, using the shared `AsyncOpenAI` client on a cache miss.
+    """
+    with span("embedding", model=EMBEDDING_MODEL) as s:
+        vector = embedding_cache.get(query, EMBEDDING_MODEL)
+        s.set(cache_hit=vector is not None)
+        if vector is None:
+            resp = await get_async_client().embeddings.create(model=EMBEDDING_MODEL, input=[query])
+            s.record_usage(getattr(resp, "usage", None))
+            vector = [float(x) for x in resp.data[0].embedding]
+            embedding_cache.put(query, EMBEDDING_MODEL, vector)
+
+    return vector
+
+
+async def _asearch(query: str, n_results: int, exclude: Collection[str], filters: Optional[dict]) -> dict:
+    if RETRIEVER_HYBRID:
+        results = title_match(query, filters)
+        if results is not None and results["metadatas"][0][0]["title"] not in exclude:
+            return results
+
+    k = n_results + len(exclude)
+    vector = await aembed_query(query)
+    loop = asyncio.get_running_loop()
+    if not RETRIEVER_HYBRID:
+        results = await loop.run_in_executor(None, partial(query_index, [vector], n_results=k, filters=filters))
+    else:
+        results = await loop.run_in_executor(
+            None, partial(query_index, [vector], n_results=max(k, HYBRID_CANDIDATES), filters=filters)
+        )
+        results = fuse_results(query, results, k, filters)
+
+    return drop_titles(results, exclude, n_results) if exclude else results
+
+
+@traced("search_books")
+async def asearch_books(query: str, n_results: int = 2, exclude_titles: Optional[Collection[str]] = None,
+                        filters: Optional[dict] = None):
+    """
+    Async `search_books`.
+
+    The embedding request is awaited on the shared async client; the blocking
+    vector query (Chroma or NumPy) runs in the event loop's default executor.
+    Hybrid retrieval, `exclude_titles` and `filters` work as in `search_books`.
+    """
+    exclude = set(exclude_titles or ())
+    filters, inferred = resolve_filters(query, filters)
+    results = await _asearch(query, n_results, exclude, filters)
+    if inferred and not results["ids"][0]:
+        results = await _asearch(query, n_results, exclude, None)
+
+    return results
+
+
+def embed_queries(queries: List[str], batch_size: int = EMBEDDING_BATCH_SIZE,
+                  max_workers: int = EMBEDDING_MAX_WORKERS) -> List[List[float]]:
+    """
+    Embed many queries, in input order, with chunked batch requests.
+
+    Cached queries are served from `embedding_cache`; the remaining distinct texts
+    are sent in chunks of `batch_size`, with at most `max_workers` requests in flight.
+    """
+    vectors = [embedding_cache.get(q, EMBEDDING_MODEL) for q in queries]
+
+    # Deduplicate misses so a repeated query is embedded once
+    missing: Dict[str, List[int]] = {}
+    for i, (q, vec) in enumerate(zip(queries, vectors)):
+        if vec is None:
+            missing.setdefault(EmbeddingCache.make_key(q, EMBEDDING_MODEL), []).append(i)
+
+    if missing:
+        positions = list(missing.values())
+        texts = [queries[p[0]] for p in positions]
+        chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+            embedded = [vec for chunk in pool.map(get_embedding_function(), chunks) for vec in chunk]
+
+        for text, same_text, vec in zip(texts, positions, embedded):
+            vec = [float(x) for x in vec]
+            embedding_cache.put(text, EMBEDDING_MODEL, vec)
+            for i in same_text:
+                vectors[i] = vec
+
+    return vectors
+
+
+@traced("search_books_batch")
+def search_books_batch(queries: List[str], n_results: int = 2,
+                       batch_size: int = EMBEDDING_BATCH_SIZE,
+                       max_workers: int = EMBEDDING_MAX_WORKERS,
+                       filters: Optional[dict] = None) -> List[dict]:
+    """
+    Run `search_books` for many queries at once.
+
+    Queries naming a title are answered from the BM25 index; the others are embedded
+    with `embed_queries` (chunked, bounded concurrency), looked up in a single bulk
+    query against the configured backend and fused with BM25 as in `search_books`.
+
+    Args:
+        queries: Natural language search strings.
+        n_results: How many top matches to return per query.
+        batch_size: Texts per embedding request.
+        max_workers: Maximum embedding requests in flight.
+        filters: Metadata constraints applied to every query, resolved per query as in
+            `search_books` (`resolve_filters`).
+
+    Returns:
+        One result dict per query, in input order, each shaped exactly like
+        the return value of `search_books`.
+    """
+    if not queries:
+        return []
+
+    resolved = [resolve_filters(q, filters) for q in queries]
+    per_query: List[Optional[dict]] = [
+        title_match(q, f) if RETRIEVER_HYBRID else None for q, (f, _) in zip(queries, resolved)
+    ]
+    pending = [i for i, result in enumerate(per_query) if result is None]
+    if not pending:
+        return per_query
+
+    embeddings = embed_queries([queries[i] for i in pending], batch_size=batch_size, max_workers=max_workers)
+    vectors = dict(zip(pending, embeddings))
+    k = max(n_results, HYBRID_CANDIDATES) if RETRIEVER_HYBRID else n_results
+
+    # One bulk query per distinct filter: a single one unless filters are inferred per query
+    # (normalized filters have a canonical repr)
+    groups: Dict[str, List[int]] = {}
+    for i in pending:
+        groups.setdefault(repr(resolved[i][0]), []).append(i)
+    for members in groups.values():
+        group_filters = resolved[members[0]][0]
+        results = query_index([vectors[i] for i in members], n_results=k, filters=group_filters)
+        for j, i in enumerate(members):
+            result = {
+                key: [value[j]] if key in PER_QUERY_KEYS and value is not None else value
+                for key, value in results.items()
+            }
+            if RETRIEVER_HYBRID:
+                result = fuse_results(queries[i], result, n_results, group_filters)
+            per_query[i] = result
+
+    # As in `search_books`, inferred filters that leave nothing fall back to the whole catalogue
+    # (the embeddings are cached by now)
+    retry = [i for i, (_, inferred) in enumerate(resolved) if inferred and not per_query[i]["ids"][0]]
+    if retry:
+        fallback = search_books_batch([queries[i] for i in retry], n_results=n_results, batch_size=batch_size,
+                                      max_workers=max_workers, filters={})
+        for i, result in zip(retry, fallback):
+            per_query[i] = result
+
+    return per_query
+
+
 if __name__ == "__main__":
 
      # Ensure the collection is populated before searching.
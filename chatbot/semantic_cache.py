@@ -0,0 +1,107 @@
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+
+# numpy is imported on first use, so importing the agent stays cheap
+
+# Cosine similarity from which a past query counts as the same request
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SMART_LIBRARIAN_SEMANTIC_CACHE_THRESHOLD", "0.9"))
+# Queries remembered per model (oldest overwritten first)
+SEMANTIC_CACHE_SIZE = int(os.getenv("SMART_LIBRARIAN_SEMANTIC_CACHE_SIZE", "2048"))
+# Off unless set to "1": it returns another user's answer above the threshold, so enable it
+# only after measuring the false-hit rate of the threshold with the production embeddings
+# (`python -m benchmarks.bench_semantic_cache --embeddings openai`)
+SEMANTIC_CACHE_ENABLED = os.getenv("SMART_LIBRARIAN_SEMANTIC_CACHE", "0") == "1"
+
+
+class SemanticCache:
+    """
+    Per-model cache of final answers keyed by query embedding, matched by cosine similarity.
+
+    Each model has its own ring buffer: a float32 `(capacity, dim)` NumPy array of
+    unit-length query vectors and the parallel list of answers. A lookup is one
+    matrix-vector product over the filled rows; the closest past query is a hit if
+    its similarity reaches `threshold`. Once a buffer is full, the oldest entry is
+    overwritten. Must be cleared when the corpus is re-ingested (see `clear`).
+
+    Args:
+        capacity: Entries per model.
+        threshold: Minimum cosine similarity for a hit.
+    """
+
+    def __init__(self, capacity: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._rings: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _unit(vector: Sequence[float]):
+        import numpy as np
+
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def get(self, model: str, vector: Sequence[float]) -> Optional[Tuple[Dict, float]]:
+        """
+        Answer stored for the most similar past query of `model`, with its similarity, or None.
+        """
+        q = self._unit(vector)
+        with self._lock:
+            ring = self._rings.get(model)
+            if ring is None or not ring["size"] or ring["vectors"].shape[1] != q.shape[0]:
+                self._counters["misses"] += 1
+                return None
+
+            similarities = ring["vectors"][:ring["size"]] @ q
+            best = int(similarities.argmax())
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._counters["misses"] += 1
+                return None
+
+            self._counters["hits"] += 1
+            return ring["answers"][best], similarity
+
+    def put(self, model: str, vector: Sequence[float], answer: Dict) -> None:
+        """
+        Remember `answer` for the query embedded as `vector`, evicting the oldest entry if full.
+        """
+        import numpy as np
+
+        q = self._unit(vector)
+        with self._lock:
+            ring = self._rings.get(model)
+            if ring is None or ring["vectors"].shape[1] != q.shape[0]:
+                ring = {"vectors": np.zeros((self.capacity, q.shape[0]), dtype=np.float32),
+                        "answers": [None] * self.capacity, "next": 0, "size": 0}
+                self._rings[model] = ring
+
+            slot = ring["next"]
+            if ring["size"] == self.capacity:
+                self._counters["evictions"] += 1
+            ring["vectors"][slot] = q
+            ring["answers"][slot] = answer
+            ring["next"] = (slot + 1) % self.capacity
+            ring["size"] = min(ring["size"] + 1, self.capacity)
+
+    def clear(self) -> None:
+        """
+        Drop every entry of every model (called after re-ingestion).
+        """
+        with self._lock:
+            self._rings.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss/eviction counters, hit rate and entries per model.
+        """
+        with self._lock:
+            out = dict(self._counters)
+            out["entries"] = {model: ring["size"] for model, ring in self._rings.items()}
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = out["hits"] / lookups if lookups else 0.0
+        return out
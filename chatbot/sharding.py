@@ -0,0 +1,173 @@
+import hashlib
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Sequence
+
+from chatbot.facets import to_where
+from chatbot.tracing import span
+
+
+# Shards of the "sharded" retriever backend: either a number N (N hash-partitioned collections
+# "<collection>_<i>" in the default Chroma directory) or "name=path[:collection],..." to spread
+# the catalogue over several persistent directories and/or collections.
+SHARDS_SPEC = os.getenv("SMART_LIBRARIAN_SHARDS", "4")
+# Seconds to wait for a shard; slower shards are left out of the merged result
+SHARD_TIMEOUT = float(os.getenv("SMART_LIBRARIAN_SHARD_TIMEOUT", "2.0"))
+# Shard queries in flight across all requests
+SHARD_MAX_WORKERS = int(os.getenv("SMART_LIBRARIAN_SHARD_WORKERS", "16"))
+
+_RESULT_KEYS = ("ids", "documents", "metadatas", "distances")
+
+
+def parse_shards(spec: str, default_path: str, default_collection: str) -> Dict[str, tuple]:
+    """
+    Parse a `SMART_LIBRARIAN_SHARDS` value into {name: (path, collection)}.
+
+    "3" -> {"0": (default_path, "<default_collection>_0"), "1": ..., "2": ...}
+    "ro=db/chroma_ro,en=db/chroma_en:books" -> {"ro": ("db/chroma_ro", default_collection),
+                                                "en": ("db/chroma_en", "books")}
+    """
+    spec = spec.strip()
+    if spec.isdigit():
+        return {str(i): (default_path, f"{default_collection}_{i}") for i in range(max(1, int(spec)))}
+
+    shards = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, location = item.partition("=")
+        path, _, collection = location.partition(":")
+        if not name or not path:
+            raise ValueError(f"Invalid shard {item!r}; expected name=path[:collection]")
+        shards[name.strip()] = (path.strip(), collection.strip() or default_collection)
+    if not shards:
+        raise ValueError("SMART_LIBRARIAN_SHARDS lists no shards")
+
+    return shards
+
+
+def hash_partition(names: Sequence[str]) -> Callable[[str, dict], str]:
+    """
+    Assignment function spreading records evenly (and stably, by ID) over the shards `names`.
+    """
+    names = list(names)
+
+    def _assign(record_id: str, metadata: dict) -> str:
+        digest = hashlib.sha1(record_id.encode("utf-8")).digest()
+        return names[int.from_bytes(digest[:8], "big") % len(names)]
+
+    return _assign
+
+
+def merge_results(results: List[dict], n_results: int) -> dict:
+    """
+    Merge `collection.query`-shaped results (each sorted by distance) into the global top `n_results`.
+
+    Each query's per-shard lists are k-way merged through a heap (`heapq.merge`),
+    so only `n_results` entries per query are materialized.
+    """
+    n_queries = max((len(r["ids"]) for r in results), default=0)
+    merged = {key: [] for key in _RESULT_KEYS}
+    for q in range(n_queries):
+        # (distance, shard, position) per match; each shard's list is already sorted
+        streams = [
+            [(distance, s, j) for j, distance in enumerate(r["distances"][q])]
+            for s, r in enumerate(results) if q < len(r["ids"])
+        ]
+        top = list(islice(heapq.merge(*streams), n_results))
+        for key in _RESULT_KEYS:
+            merged[key].append([results[s][key][q][j] for _, s, j in top])
+
+    return merged
+
+
+class ShardedRetriever:
+    """
+    Fan a vector query out to several shards in parallel and merge their top-k by distance.
+
+    A shard is anything with a `collection.query`-compatible `query(query_embeddings=...,
+    n_results=...)`: a Chroma collection (possibly in its own persistent directory) or
+    a `NumpyVectorIndex`. Metadata filters reach a Chroma shard as a `where` clause and
+    a NumPy shard as the `candidate_rows` of its facet index. Shards run on a shared thread pool; a shard that has not
+    answered within `timeout` seconds, or that fails, is left out of the result (the
+    answer degrades instead of failing) and counted in `stats()`.
+
+    Args:
+        shards: Shard name -> shard.
+        timeout: Seconds to wait for the shards of one query.
+        max_workers: Threads shared by all fan-outs.
+        assign: record (id, metadata) -> shard name, used for ingestion (default: hash partition).
+    """
+
+    def __init__(self, shards: Dict[str, object], timeout: float = SHARD_TIMEOUT,
+                 max_workers: int = SHARD_MAX_WORKERS,
+                 assign: Optional[Callable[[str, dict], str]] = None):
+        self.shards = dict(shards)
+        self.timeout = timeout
+        self.assign = assign or hash_partition(list(self.shards))
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard")
+        self._lock = threading.Lock()
+        self._counters = {name: {"queries": 0, "timeouts": 0, "errors": 0} for name in self.shards}
+
+    def _count(self, name: str, field: str) -> None:
+        with self._lock:
+            self._counters[name][field] += 1
+
+    @staticmethod
+    def _filter_kwargs(shard, filters: Optional[dict]) -> dict:
+        if not filters:
+            return {}
+        if hasattr(shard, "facet_index"):
+            return {"candidate_rows": shard.facet_index().rows(filters)}
+        return {"where": to_where(filters)}
+
+    def query(self, query_embeddings, n_results: int = 2, shards: Optional[Sequence[str]] = None,
+              filters: Optional[dict] = None) -> dict:
+        """
+        Top `n_results` per query across `shards` (default: all), as a `collection.query`-shaped dict.
+
+        Args:
+            query_embeddings: One embedding per query.
+            n_results: Matches returned per query.
+            shards: Names of the shards to query (route a query to part of the catalogue).
+            filters: Metadata constraints (see `chatbot.facets.normalize_filters`) applied by every shard.
+        """
+        names = list(shards) if shards is not None else list(self.shards)
+        with span("shard_fanout", shards=len(names)) as s:
+            futures = {
+                self._pool.submit(self.shards[name].query, query_embeddings=query_embeddings,
+                                  n_results=n_results, **self._filter_kwargs(self.shards[name], filters)): name
+                for name in names
+            }
+            done, not_done = wait(futures, timeout=self.timeout)
+
+            results = []
+            for future, name in futures.items():
+                self._count(name, "queries")
+                if future in not_done:
+                    self._count(name, "timeouts")
+                    print(f"Shard {name!r} timed out after {self.timeout:.2f}s; answering without it.")
+                    continue
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    self._count(name, "errors")
+                    print(f"Shard {name!r} failed: {e}")
+            s.set(answered=len(results))
+
+        if not results:
+            n_queries = len(query_embeddings)
+            return {key: [[] for _ in range(n_queries)] for key in _RESULT_KEYS}
+
+        return merge_results(results, n_results)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Per-shard query, timeout and error counters.
+        """
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._counters.items()}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,54 @@
+import re
+import unicodedata
+from typing import List
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a user query used as a cache key.
+
+    Applies Unicode NFC, casefolding and whitespace collapsing, so
+    "Ce este  1984?" and "ce este 1984?" map to the same key.
+
+    Args:
+        text: Raw input string.
+
+    Returns:
+        str: The normalized string.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    return _WHITESPACE.sub(" ", text.casefold()).strip()
+
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def fold_diacritics(text: str) -> str:
+    """
+    Remove combining marks, e.g. "război" -> "razboi", "ș" -> "s".
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into comparable words: normalized, diacritic-folded, punctuation dropped.
+
+    "Ce este «1984»?" -> ["ce", "este", "1984"]
+    """
+    return _NON_WORD.sub(" ", fold_diacritics(normalize_text(text))).split()
+
+
+def query_fingerprint(text: str) -> str:
+    """
+    Key for near-duplicate queries.
+
+    Normalizes case and whitespace, folds diacritics and drops punctuation, keeping
+    the words in order, so "Ce este «1984»?" and "ce este 1984" share a fingerprint
+    while "razboi, nu dragoste" and "dragoste, nu razboi" do not.
+    """
+    return " ".join(tokenize(text))
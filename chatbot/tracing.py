@@ -0,0 +1,274 @@
+"""
+Lightweight tracing for the agent pipeline.
+
+Wrap a stage in `span(...)` to record its wall time and attributes (token
+counts, cache hits, ...):
+
+    with span("choose_title_llm", model=model) as s:
+        resp = client.chat.completions.create(...)
+        s.record_usage(resp.usage)
+
+Spans are exported only when a sink is configured, otherwise `span` is a no-op:
+  - SMART_LIBRARIAN_TRACE_FILE=<path>  append one JSON line per span;
+  - SMART_LIBRARIAN_OTEL=1             also export through OpenTelemetry (OTLP/gRPC,
+                                       configured by the standard OTEL_* variables).
+
+Print p50/p95/p99 per stage from a JSON lines file with:
+    python -m chatbot.tracing outputs/traces/spans.jsonl
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+_trace_file: Optional[str] = os.getenv("SMART_LIBRARIAN_TRACE_FILE") or None
+_otel_enabled: bool = os.getenv("SMART_LIBRARIAN_OTEL") == "1"
+_otel_tracer = None
+_write_lock = threading.Lock()
+_current: contextvars.ContextVar = contextvars.ContextVar("smart_librarian_span", default=None)
+
+
+class Span:
+    """
+    One timed pipeline stage. Attributes set with `set`/`record_usage` are exported with it.
+    """
+
+    def __init__(self, name: str, attrs: Dict, parent: Optional["Span"]):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration = 0.0
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def record_usage(self, usage) -> None:
+        """
+        Copy prompt/completion token counts from an OpenAI `usage` object, if present.
+        """
+        if usage is None:
+            return
+        for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            value = getattr(usage, field, None)
+            if value is not None:
+                self.attrs[field] = value
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs) -> None:
+        pass
+
+    def record_usage(self, usage) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def configure(trace_file: Optional[str] = None, otel: bool = False) -> None:
+    """
+    Enable/disable span export at runtime (overrides the environment variables).
+    """
+    global _trace_file, _otel_enabled
+    _trace_file = trace_file
+    _otel_enabled = otel
+
+
+def enabled() -> bool:
+    return bool(_trace_file) or _otel_enabled
+
+
+def _get_otel_tracer():
+    """
+    OpenTelemetry tracer with an OTLP exporter, or None if the SDK is not installed.
+    """
+    global _otel_tracer, _otel_enabled
+    if _otel_tracer is None:
+        try:
+            from opentelemetry import trace
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            print("OpenTelemetry SDK not installed; disabling OTel export.")
+            _otel_enabled = False
+            return None
+
+        provider = TracerProvider(resource=Resource.create({"service.name": "smart-librarian"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+        _otel_tracer = trace.get_tracer("smart_librarian")
+
+    return _otel_tracer
+
+
+def _export(s: Span) -> None:
+    if not _trace_file:
+        return
+    directory = os.path.dirname(_trace_file)
+    line = json.dumps(s.to_dict(), ensure_ascii=False, default=str)
+    with _write_lock:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(_trace_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """
+    Time the enclosed block as a pipeline stage named `name`.
+
+    Nested spans share the trace ID of the enclosing span. Exceptions are
+    recorded in the "error" attribute and re-raised.
+    """
+    if not enabled():
+        yield _NOOP
+        return
+
+    s = Span(name, attrs, _current.get())
+    token = _current.set(s)
+    with ExitStack() as stack:
+        otel_span = None
+        tracer = _get_otel_tracer() if _otel_enabled else None
+        if tracer is not None:
+            otel_span = stack.enter_context(tracer.start_as_current_span(name))
+
+        t0 = time.perf_counter()
+        try:
+            yield s
+        except BaseException as e:
+            s.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            s.duration = time.perf_counter() - t0
+            _current.reset(token)
+            if otel_span is not None:
+                for key, value in s.attrs.items():
+                    if isinstance(value, (str, bool, int, float)):
+                        otel_span.set_attribute(key, value)
+            _export(s)
+
+
+def current_span():
+    """
+    The innermost active span (a no-op span when tracing is disabled).
+    """
+    return _current.get() or _NOOP
+
+
+def traced(name: str):
+    """
+    Decorator running the whole function (sync, async or generator) inside `span(name)`.
+
+    A generator's span lasts until it is exhausted or closed, not just until it is created.
+    """
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                with span(name):
+                    yield from fn(*args, **kwargs)
+            return generator_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(path: str) -> Dict[str, Dict[str, float]]:
+    """
+    Aggregate a spans JSON lines file into per-stage statistics.
+
+    Returns:
+        {stage: {"count", "p50_ms", "p95_ms", "p99_ms", "prompt_tokens",
+                 "completion_tokens", "cache_hit_rate" (None when not recorded)}}
+    """
+    durations: Dict[str, List[float]] = {}
+    tokens: Dict[str, List[int]] = {}
+    hits: Dict[str, List[bool]] = {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            name, attrs = record["name"], record.get("attrs", {})
+            durations.setdefault(name, []).append(record["duration_ms"])
+            t = tokens.setdefault(name, [0, 0])
+            t[0] += attrs.get("prompt_tokens", 0)
+            t[1] += attrs.get("completion_tokens", 0)
+            if "cache_hit" in attrs:
+                hits.setdefault(name, []).append(bool(attrs["cache_hit"]))
+
+    out = {}
+    for name, values in durations.items():
+        values.sort()
+        stage_hits = hits.get(name)
+        out[name] = {
+            "count": len(values),
+            "p50_ms": _percentile(values, 0.50),
+            "p95_ms": _percentile(values, 0.95),
+            "p99_ms": _percentile(values, 0.99),
+            "prompt_tokens": tokens[name][0],
+            "completion_tokens": tokens[name][1],
+            "cache_hit_rate": sum(stage_hits) / len(stage_hits) if stage_hits else None,
+        }
+
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else (_trace_file or "outputs/traces/spans.jsonl")
+    stats = summarize(path)
+
+    print(f"{'stage':<24} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'prompt tok':>10} {'compl tok':>9} {'cache hit':>9}")
+    for name, st in sorted(stats.items(), key=lambda kv: -kv[1]["p50_ms"]):
+        hit = "-" if st["cache_hit_rate"] is None else f"{st['cache_hit_rate']:.0%}"
+        print(f"{name:<24} {st['count']:>6} {st['p50_ms']:>9.1f} {st['p95_ms']:>9.1f} {st['p99_ms']:>9.1f} "
+              f"{st['prompt_tokens']:>10} {st['completion_tokens']:>9} {hit:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from chatbot.facets import FacetIndex
+
+
+class NumpyVectorIndex:
+    """
+    In-process exact vector index over a contiguous float32 matrix.
+
+    Rows are L2-normalized at build time and stored in `<path>/vectors.npy`,
+    which is memory-mapped on load, so cold start does not read the whole
+    matrix. Queries are a single matrix product followed by `np.argpartition`
+    top-k selection.
+
+    Distances are reported as squared L2 between normalized vectors
+    (2 - 2 * cosine), which matches what Chroma's default "l2" space returns
+    for normalized embeddings, so `query` results are interchangeable with
+    `collection.query` results.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    RECORDS_FILE = "records.json"
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], documents: List[str], metadatas: List[dict]):
+        self.vectors = vectors
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self._facets = None
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    @classmethod
+    def build(cls, path: str, ids: Sequence[str], embeddings, documents: Sequence[str],
+              metadatas: Sequence[dict]) -> "NumpyVectorIndex":
+        """
+        Write a new index to `path` and return it (memory-mapped).
+
+        Args:
+            path: Target directory (created if missing, existing files are overwritten).
+            ids: Record IDs, one per row.
+            embeddings: 2-D array-like of shape (len(ids), dim).
+            documents: Document text per row.
+            metadatas: Metadata dict per row.
+        """
+        os.makedirs(path, exist_ok=True)
+        vectors = cls._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        np.save(os.path.join(path, cls.VECTORS_FILE), vectors)
+        with open(os.path.join(path, cls.RECORDS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)},
+                      f, ensure_ascii=False)
+
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyVectorIndex":
+        """
+        Open an index previously written by `build`, memory-mapping the vectors.
+        """
+        vectors = np.load(os.path.join(path, cls.VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, cls.RECORDS_FILE), "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+        return cls(vectors, records["ids"], records["documents"], records["metadatas"])
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.exists(os.path.join(path, cls.VECTORS_FILE)) and \
+            os.path.exists(os.path.join(path, cls.RECORDS_FILE))
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def facet_index(self) -> "FacetIndex":
+        """
+        Facet index (theme/language/author -> rows) over this index's metadatas, built on first use.
+        """
+        if self._facets is None:
+            self._facets = FacetIndex.from_metadatas(self.metadatas)
+        return self._facets
+
+    def query(self, query_embeddings, n_results: int = 2,
+              candidate_rows: Optional[np.ndarray] = None) -> Dict[str, list]:
+        """
+        Exact top-k search, returning a `collection.query`-shaped dict.
+
+        Args:
+            query_embeddings: 2-D array-like, one row per query.
+            n_results: Matches returned per query.
+            candidate_rows: Optional row positions to restrict the scan to.
+
+        Returns:
+            dict with "ids", "documents", "metadatas" and "distances", each a list
+            (one entry per query) of lists (best match first).
+        """
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.vectors.shape[1]))
+        matrix = self.vectors if candidate_rows is None else self.vectors[candidate_rows]
+        out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        k = min(n_results, matrix.shape[0])
+        if k <= 0:
+            for key in out:
+                out[key] = [[] for _ in range(len(queries))]
+            return out
+
+        scores = queries @ matrix.T
+        if k < matrix.shape[0]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(matrix.shape[0]), (len(queries), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for rows, sims in zip(top, top_scores):
+            if candidate_rows is not None:
+                rows = candidate_rows[rows]
+            out["ids"].append([self.ids[r] for r in rows])
+            out["documents"].append([self.documents[r] for r in rows])
+            out["metadatas"].append([self.metadatas[r] for r in rows])
+            out["distances"].append([float(2.0 - 2.0 * s) for s in sims])
+
+        return out
@@ -9,7 +9,8 @@ Features included in the UI:
 - Optional DALL·E 3 illustration generation for the recommended title.
 - Text-to-Speech (TTS) playback of assistant responses (via pyttsx3).
 - Profanity filter on user input.
-- Chat history persistence within the session.
+- Chat history persistence within the session (bounded, paginated) and conversation memory
+  that steers follow-up queries.
 - Reset button to clear the conversation state.
 
 Run this file with:
@@ -19,8 +20,8 @@ Run this file with:
 import os
 import re
 import sys
+import uuid
 import streamlit as st
-import pyttsx3
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Import project modules (ensure project root is on sys.path)
@@ -30,9 +31,11 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 from chatbot.retriever import populate_chroma            
-from chatbot.agent import run_agent                      
+from chatbot.agent import stream_agent, stream_text
+from chatbot.memory import ConversationMemory
 from tools.language_filter import is_clean               
-from tools.image_generator import generate_book_image   
+from tools.image_jobs import image_queue
+from tools.tts import tts_queue
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -41,6 +44,8 @@ from tools.image_generator import generate_book_image
 ALLOWED_MODELS = ("gpt-4o-mini", "gpt-4.1-mini", "gpt-4.1-nano")  
 IMAGES_DIR = "outputs/images"
 AUDIO_DIR = "outputs/audio"
+HISTORY_PAGE_SIZE = 20        # messages rendered per page of chat history
+HISTORY_MAX_MESSAGES = 200    # older messages are dropped from the session
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -72,14 +77,24 @@ _init_once()
 # ──────────────────────────────────────────────────────────────────────────────
 if "messages" not in st.session_state:
     st.session_state.messages = []          # chat history: [{role: 'user'|'assistant', content: str}]
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1      # pages of history shown, newest first
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory()  # steers retrieval on follow-up queries
 if "last_reply" not in st.session_state:
     st.session_state.last_reply = ""       
 if "last_title" not in st.session_state:
     st.session_state.last_title = None  
 if "last_image_path" not in st.session_state:
     st.session_state.last_image_path = None
+if "image_job_id" not in st.session_state:
+    st.session_state.image_job_id = None    # background image generation job, if any
 if "last_tts_path" not in st.session_state:
     st.session_state.last_tts_path = None
+if "tts_job_id" not in st.session_state:
+    st.session_state.tts_job_id = None      # background TTS job, if any
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex  # names this session's audio file
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -89,14 +104,20 @@ with st.sidebar:
     st.subheader("Settings")
 
     model = st.selectbox("Models", ALLOWED_MODELS, index=0)
+    fast_mode = st.toggle("⚡ Fast mode", value=False, help="At most one LLM call per query")
 
     # Reset chat button: clears all chat-related session state, then reruns the app
     if st.button("♻️ Reset chat", help="Clean up conversation history and artifacts"):
         st.session_state.messages = []
+        st.session_state.history_pages = 1
+        st.session_state.memory.clear()
         st.session_state.last_reply = ""
         st.session_state.last_title = None
         st.session_state.last_image_path = None
+        st.session_state.image_job_id = None
         st.session_state.last_tts_path = None
+        st.session_state.tts_job_id = None
+        tts_queue.release_session(st.session_state.session_id)
         
         try:
             st.rerun()
@@ -117,13 +138,31 @@ with st.sidebar:
 # ──────────────────────────────────────────────────────────────────────────────
 def render_history() -> None:
     """
-    Render chat history as user/assistant bubbles.
+    Render the latest pages of chat history as user/assistant bubbles.
+
+    Only `history_pages * HISTORY_PAGE_SIZE` messages are rendered on a rerun;
+    a button loads an earlier page.
     """
-    for m in st.session_state.messages:
+    messages = st.session_state.messages
+    shown = st.session_state.history_pages * HISTORY_PAGE_SIZE
+    if len(messages) > shown:
+        if st.button(f"⬆️ Show earlier messages ({len(messages) - shown})", key="btn_history"):
+            st.session_state.history_pages += 1
+            shown += HISTORY_PAGE_SIZE
+
+    for m in messages[-shown:]:
         with st.chat_message("user" if m["role"] == "user" else "assistant"):
             st.markdown(m["content"])
 
 
+def add_message(role: str, content: str) -> None:
+    """
+    Append a message to the chat history, dropping the oldest beyond `HISTORY_MAX_MESSAGES`.
+    """
+    st.session_state.messages.append({"role": role, "content": content})
+    del st.session_state.messages[:-HISTORY_MAX_MESSAGES]
+
+
 def extract_title(reply: str) -> str | None:
     """
     Extract the recommended title from assistant reply.
@@ -140,20 +179,6 @@ def extract_title(reply: str) -> str | None:
     return None
 
 
-def tts_with_pyttsx3_to_wav(text: str) -> str:
-    """
-    Generate a WAV from the given text using pyttsx3 and return the file path.
-    Tip: If you have Romanian voices installed on your OS, pick them by name/id.
-    """
-    path = os.path.join(AUDIO_DIR, "tts_output.wav")
-    engine = pyttsx3.init()
-    engine.setProperty("rate", 170)
-
-    engine.save_to_file(text, path)
-    engine.runAndWait()
-    return path
-
-
 # ──────────────────────────────────────────────────────────────────────────────
 # Main chat UI: show history and input box
 # ──────────────────────────────────────────────────────────────────────────────
@@ -162,32 +187,48 @@ prompt = st.chat_input("Write your query here…")
 
 if prompt:
     # 1) Append and render user message
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    add_message("user", prompt)
     with st.chat_message("user"):
         st.markdown(prompt)
 
     # 2) Profanity/safety gate BEFORE calling the LLM
     if not is_clean(prompt):
         reply = "Te rog pastreaza un limbaj respectuos. Iti pot recomanda carti pe orice tema."
-        st.session_state.messages.append({"role": "assistant", "content": reply})
+        add_message("assistant", reply)
         with st.chat_message("assistant"):
             st.markdown(reply)
     else:
-        # 3) Call the agent (RAG → recommend title → tool: summary)
+        # 3) Stream the agent's answer (RAG → recommend title → summary)
         with st.chat_message("assistant"):
-            with st.spinner("Gandesc…"):
-                try:
-                    reply = run_agent(prompt, model=model)
-                except Exception as e:
-                    reply = f"❌ Eroare: {e}"
-            st.markdown(reply)
-            st.session_state.messages.append({"role": "assistant", "content": reply})
+            status = st.empty()
+            status.caption("Gandesc…")
+            done = {}
+
+            def _on_event(event: dict) -> None:
+                if event["type"] == "candidates" and event["titles"]:
+                    status.caption("Candidati: " + ", ".join(event["titles"]))
+                elif event["type"] == "done":
+                    done.update(event)
+
+            try:
+                events = stream_agent(prompt, model=model, fast=fast_mode, memory=st.session_state.memory)
+                reply = st.write_stream(stream_text(events, on_event=_on_event))
+            except Exception as e:
+                reply = f"❌ Eroare: {e}"
+                st.markdown(reply)
+
+            # Time-to-first-byte (perceived latency) vs. total latency
+            if done:
+                status.caption(f"⏱️ first byte {done['ttfb'] * 1000:.0f} ms · total {done['total'] * 1000:.0f} ms")
+            add_message("assistant", reply)
 
         # 4) Persist parsed artifacts for action buttons
         st.session_state.last_reply = reply
         st.session_state.last_title = extract_title(reply)
         st.session_state.last_image_path = None
+        st.session_state.image_job_id = None
         st.session_state.last_tts_path = None
+        st.session_state.tts_job_id = None
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -210,16 +251,38 @@ if col1.button(
         st.info("Nu am putut detecta titlul din raspuns.")
     else:
         try:
-            # BUGFIX: use correct keyword 'language' (not 'lang')
-            path = generate_book_image(title, themes=None, size="1024x1024", lang="ro")
-            st.session_state.last_image_path = path
-            st.success(f"Generated image: {path}")
+            # Non-blocking: the image is rendered by a background worker (cached if seen before)
+            st.session_state.image_job_id = image_queue.submit(title, themes=None, size="1024x1024", lang="ro")
+            st.session_state.last_image_path = None
         except Exception as e:
             st.error(f"Image generation error: {e}")
 
-# Show last generated image, if any
-if st.session_state.last_image_path:
-    st.image(st.session_state.last_image_path, caption=f"„{title or ''}” – ilustration DALL·E 3")
+
+@st.fragment(run_every=2)
+def render_image_job() -> None:
+    """
+    Poll the background image job (every 2s, without rerunning the whole app)
+    and show the last generated image, if any.
+    """
+    job_id = st.session_state.image_job_id
+    if job_id:
+        job = image_queue.status(job_id)
+        if job is None:
+            st.session_state.image_job_id = None
+        elif job["status"] == "done":
+            st.session_state.last_image_path = job["path"]
+            st.session_state.image_job_id = None
+        elif job["status"] == "error":
+            st.error(f"Image generation error: {job['error']}")
+            st.session_state.image_job_id = None
+        else:
+            st.info(f"Generating illustration… ({job['status']})")
+
+    if st.session_state.last_image_path:
+        st.image(st.session_state.last_image_path, caption=f"„{title or ''}” – ilustration DALL·E 3")
+
+
+render_image_job()
 
 # B) Text-to-Speech for last assistant reply
 if col2.button(
@@ -229,11 +292,34 @@ if col2.button(
     help="Play audio of the assistant's last response"
 ):
     try:
-        wav_path = tts_with_pyttsx3_to_wav(reply)
-        st.session_state.last_tts_path = wav_path
+        # Non-blocking: a warm TTS worker writes the WAV (instant if this answer was read before)
+        st.session_state.tts_job_id = tts_queue.submit(reply, session_id=st.session_state.session_id)
+        st.session_state.last_tts_path = None
     except Exception as e:
         st.error(f"TTS error: {e}")
 
-# Audio player (if we have a generated WAV)
-if st.session_state.last_tts_path:
-    st.audio(st.session_state.last_tts_path)
+
+@st.fragment(run_every=1)
+def render_tts_job() -> None:
+    """
+    Poll the background TTS job and show the audio player once the WAV is ready.
+    """
+    job_id = st.session_state.tts_job_id
+    if job_id:
+        job = tts_queue.status(job_id)
+        if job is None:
+            st.session_state.tts_job_id = None
+        elif job["status"] == "done":
+            st.session_state.last_tts_path = job["path"]
+            st.session_state.tts_job_id = None
+        elif job["status"] == "error":
+            st.error(f"TTS error: {job['error']}")
+            st.session_state.tts_job_id = None
+        else:
+            st.info("Generating audio…")
+
+    if st.session_state.last_tts_path:
+        st.audio(st.session_state.last_tts_path)
+
+
+render_tts_job()
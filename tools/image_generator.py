@@ -1,15 +1,13 @@
-import os, re, base64
-from io import BytesIO
+import os, re, base64, asyncio, hashlib, tempfile
 from typing import Optional, List
-from PIL import Image
-from openai import OpenAI
+from chatbot.openai_clients import get_async_client, get_client
+from chatbot.tracing import current_span, traced
 
 
-# Initialize OpenAI client using API key from local environment
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
+# Created on the first write, not at import
 OUTPUT_DIR = "outputs/images"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+IMAGE_MODEL = "dall-e-3"
 
 TITLE_HINT = re.compile(r"Recomandare:\s*(.+)", re.IGNORECASE | re.UNICODE)
 
@@ -82,14 +80,35 @@ def _build_prompt(title: str, themes: Optional[List[str]] = None, lang: str = "r
     )
 
 
+def image_cache_key(prompt: str, size: str, model: str = IMAGE_MODEL) -> str:
+    """
+    Content address of an image request: sha256 of (model, size, prompt), shortened.
+    """
+    return hashlib.sha256(f"{model}\x00{size}\x00{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+def image_path_for(title: str, themes: Optional[List[str]] = None, size: str = "1024x1024",
+                   lang: str = "ro") -> str:
+    """
+    Path where the PNG for this (title, themes, size, lang) request is cached.
+
+    The file name combines the title slug with `image_cache_key`, so different
+    themes, sizes or prompt languages never overwrite each other.
+    """
+    key = image_cache_key(_build_prompt(title, themes, lang), size)
+
+    return os.path.join(OUTPUT_DIR, f"{_slugify(title)}-{key}.png")
+
+
+@traced("generate_book_image")
 def generate_book_image(title: str, themes: Optional[List[str]] = None, size: str = "1024x1024", lang: str = "ro") -> str:
     """
     Generate an AI illustration for a book using OpenAI's DALL·E 3 model.
 
     - Builds a descriptive prompt from the given title and themes.
-    - Calls the OpenAI Images API to generate one image.
-    - Decodes the base64 response into an image.
-    - Saves the image as PNG inside `outputs/images/`.
+    - Returns the cached PNG right away if this exact request was rendered before.
+    - Otherwise calls the OpenAI Images API to generate one image.
+    - Writes the base64-decoded PNG bytes inside `outputs/images/`.
     - Returns the path to the saved file.
 
     Args:
@@ -108,19 +127,70 @@ def generate_book_image(title: str, themes: Optional[List[str]] = None, size: st
     if not title or not title.strip():
         raise ValueError("Nu am un titlu valid pentru generarea imaginii.")
     
-    # Step 1: Build prompt text
+    # Step 1: Build prompt text, serve from cache if already rendered
     prompt = _build_prompt(title, themes, lang)
+    path = image_path_for(title, themes, size, lang)
+    current_span().set(cache_hit=os.path.exists(path), size=size)
+    if os.path.exists(path):
+        return path
 
     # Step 2: Call OpenAI Images API
-    result = client.images.generate(
-        model="dall-e-3",
+    result = get_client().images.generate(
+        model=IMAGE_MODEL,
+        prompt=prompt,
+        size=size,
+        n=1,
+        response_format="b64_json"
+    )
+
+    # Steps 3-4: Defensive checks, write PNG bytes
+    return _save_image_result(path, result)
+
+
+@traced("generate_book_image")
+async def agenerate_book_image(title: str, themes: Optional[List[str]] = None, size: str = "1024x1024",
+                               lang: str = "ro") -> str:
+    """
+    Async `generate_book_image`, using the shared `AsyncOpenAI` client.
+
+    The PNG is written in the event loop's default executor.
+    Arguments, return value, caching and errors are the same as `generate_book_image`.
+    """
+    if not title or not title.strip():
+        raise ValueError("Nu am un titlu valid pentru generarea imaginii.")
+
+    prompt = _build_prompt(title, themes, lang)
+    path = image_path_for(title, themes, size, lang)
+    current_span().set(cache_hit=os.path.exists(path), size=size)
+    if os.path.exists(path):
+        return path
+
+    result = await get_async_client().images.generate(
+        model=IMAGE_MODEL,
         prompt=prompt,
         size=size,
         n=1,
         response_format="b64_json"
     )
 
-    # Step 3: Defensive checks
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _save_image_result, path, result)
+
+
+def _save_image_result(path: str, result) -> str:
+    """
+    Validate an Images API result and write its base64 PNG payload to `path`.
+
+    The API already returns PNG data, so the decoded bytes are written as-is
+    (no image re-encoding). The file is written to a temporary name and moved
+    into place, so readers never see a partial image.
+
+    Returns:
+        str: Path to the saved PNG file.
+
+    Raises:
+        RuntimeError: If no image payload is returned.
+    """
     if not result or not getattr(result, "data", None) or not result.data:
         raise RuntimeError("API nu a returnat niciun rezultat de imagine.")
     
@@ -130,12 +200,17 @@ def generate_book_image(title: str, themes: Optional[List[str]] = None, size: st
         rp = getattr(result.data[0], "revised_prompt", None)
         raise RuntimeError(f"Nu am primit payload de imagine. (revised_prompt={rp!r})")
 
-    # Step 4: Decode base64, save as PNG
-    img_bytes = base64.b64decode(b64)
-    img = Image.open(BytesIO(img_bytes)).convert("RGB")
-    filename = f"{_slugify(title)}.png"
-    path = os.path.join(OUTPUT_DIR, filename)
-    img.save(path, format="PNG")
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(base64.b64decode(b64))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     
     return path
 
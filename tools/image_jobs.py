@@ -0,0 +1,99 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from tools.image_generator import generate_book_image, image_path_for
+
+
+class ImageJobQueue:
+    """
+    Background queue for `generate_book_image`, so UIs never block on DALL·E.
+
+    - `submit` returns a job ID immediately; a worker thread renders the image.
+    - Identical requests (same title/themes/size/lang) that are already queued
+      or running share one job instead of calling the API twice.
+    - Requests whose PNG is already cached complete immediately.
+    - `status` is a cheap, non-blocking poll.
+
+    Args:
+        max_workers: Concurrent image generations.
+        max_jobs: Finished jobs kept for polling (oldest are forgotten first).
+    """
+
+    def __init__(self, max_workers: int = 2, max_jobs: int = 1000):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-job")
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def submit(self, title: str, themes: Optional[List[str]] = None, size: str = "1024x1024",
+               lang: str = "ro") -> str:
+        """
+        Queue an illustration for `title` and return its job ID.
+
+        Raises:
+            ValueError: If no valid title is provided.
+        """
+        if not title or not title.strip():
+            raise ValueError("Nu am un titlu valid pentru generarea imaginii.")
+
+        path = image_path_for(title, themes, size, lang)
+        with self._lock:
+            if path in self._inflight:
+                return self._inflight[path]
+
+            job_id = uuid.uuid4().hex
+            job = {"id": job_id, "title": title, "status": "queued", "path": None, "error": None}
+            self._jobs[job_id] = job
+            self._trim()
+
+            if os.path.exists(path):
+                job.update(status="done", path=path)
+                return job_id
+
+            self._inflight[path] = job_id
+
+        self._pool.submit(self._run, job_id, path, title, themes, size, lang)
+        return job_id
+
+    def _run(self, job_id: str, key: str, title: str, themes, size: str, lang: str) -> None:
+        self._update(job_id, status="running")
+        try:
+            path = generate_book_image(title, themes=themes, size=size, lang=lang)
+            self._update(job_id, status="done", path=path)
+        except Exception as e:
+            self._update(job_id, status="error", error=str(e))
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _trim(self) -> None:
+        # Forget the oldest finished jobs beyond `max_jobs` (caller holds the lock)
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["status"] in ("done", "error"):
+                del self._jobs[job_id]
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Snapshot of a job: {"id", "title", "status", "path", "error"}, or None if unknown.
+
+        `status` is one of "queued", "running", "done" or "error".
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+
+# Shared queue used by the CLI and the Streamlit app
+image_queue = ImageJobQueue(max_workers=2)
@@ -1,11 +1,181 @@
-from better_profanity import profanity
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+from chatbot.tracing import traced
 
 
-profanity.load_censor_words()
+# Word lists: better_profanity's default list (read from the package data, without
+# importing the package) plus an optional project-specific list, one entry per line.
+EXTRA_WORDLIST = "data/profanity_extra.txt"
 
+# Compiled pattern cache, rebuilt whenever the word lists or the normalization change
+CACHE_PATH = "db/profanity_regex.json"
+CACHE_VERSION = 3
 
+# Unambiguous leetspeak substitutions applied after casefolding
+LEET_MAP = str.maketrans({"4": "a", "!": "i", "0": "o", "3": "e", "$": "s", "5": "s", "7": "t"})
+
+# Characters that may stand for a letter of a listed word, as in better_profanity's
+# character map: masks ("f*ck", "b*tch") and ambiguous substitutions ("@" for a or o,
+# "1" for i or l). Matched in the pattern, since the text cannot be rewritten in one way.
+MASK_VARIANTS = {"a": "@*", "e": "*", "i": "*1l", "l": "1", "o": "*@", "u": "*v", "v": "*u"}
+MASK_SYMBOLS = "*@"
+
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]+")
+_TRAILING_BANGS = re.compile(r"!+(?!\w)")
+_SEPARATORS = re.compile(r"(?:[^\w*@]|_)+")
+# Mask symbols touching a letter are part of the word ("@ss", "sh*t"); runs standing alone are dropped
+_LONE_MASKS = re.compile(r"(?<!\S)[*@]+(?!\S)")
+
+
+def normalize_for_matching(text: str) -> str:
+    """
+    Canonical form shared by the word list and the checked text.
+
+    Casefolds, strips diacritics (NFKD, so Romanian ș/ş, ț/ţ, ă, â, î fold to s, t, a, a, i),
+    undoes unambiguous leetspeak (0→o, 3→e, $→s, ...; "!" only inside a word, so
+    "sh!t" is caught but "wow!" stays "wow"), keeps the mask symbols of `MASK_SYMBOLS`
+    that touch a word (see `MASK_VARIANTS`), drops standalone ones and turns every
+    run of other non-word characters into one space.
+    """
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = _TRAILING_BANGS.sub(" ", _COMBINING_MARKS.sub("", text)).translate(LEET_MAP)
+    text = _LONE_MASKS.sub(" ", _SEPARATORS.sub(" ", text))
+    return " ".join(text.split())
+
+
+def _default_wordlist_path() -> Optional[str]:
+    spec = importlib.util.find_spec("better_profanity")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(list(spec.submodule_search_locations)[0], "profanity_wordlist.txt")
+    return path if os.path.exists(path) else None
+
+
+def _read_words(paths: Iterable[str]) -> List[str]:
+    words = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                word = normalize_for_matching(line)
+                if word:
+                    words.add(word)
+    return sorted(words)
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regex alternation from a character trie, so shared prefixes are matched once
+    (e.g. ["ass", "asshole"] -> "ass(?:hole)?"). Letters of `MASK_VARIANTS` also match
+    their variants: "fuck" -> "f[u*v]ck".
+    """
+    def _chars(chars) -> str:
+        chars = sorted(chars)
+        return re.escape(chars[0]) if len(chars) == 1 else "[" + "".join(re.escape(c) for c in chars) + "]"
+
+    def _char(ch: str) -> str:
+        return _chars(ch + MASK_VARIANTS.get(ch, ""))
+
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _build(node: Dict) -> Optional[str]:
+        if list(node) == [""]:
+            return None
+        branches, singles = [], set()
+        for ch in sorted(k for k in node if k):
+            rest = _build(node[ch])
+            if rest is None:
+                singles.update(ch + MASK_VARIANTS.get(ch, ""))
+            else:
+                branches.append(_char(ch) + rest)
+        chars_only = not branches
+        if singles:
+            branches.append(_chars(singles))
+        result = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            result = result + "?" if chars_only and len(branches) == 1 else "(?:" + result + ")?"
+        return result
+
+    return _build(trie) or "(?!)"
+
+
+def build_matcher(paths: Optional[List[str]] = None, cache_path: Optional[str] = CACHE_PATH) -> re.Pattern:
+    """
+    Compile the profanity matcher, reusing the cached pattern when the word lists are unchanged.
+
+    Args:
+        paths: Word list files (default: better_profanity's list plus `EXTRA_WORDLIST` if present).
+        cache_path: JSON file holding the built pattern (None disables the cache).
+
+    Returns:
+        A compiled regex matching any listed word or phrase as whole words of
+        `normalize_for_matching` output.
+    """
+    if paths is None:
+        paths = [p for p in (_default_wordlist_path(), EXTRA_WORDLIST) if p and os.path.exists(p)]
+
+    digest = hashlib.sha256(str(CACHE_VERSION).encode("utf-8"))
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    key = digest.hexdigest()
+
+    pattern = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                pattern = cached["pattern"]
+        except (ValueError, KeyError, OSError):
+            pattern = None
+
+    if pattern is None:
+        pattern = r"(?<!\S)" + _trie_pattern(_read_words(paths)) + r"(?!\S)"
+        if cache_path:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "pattern": pattern}, f)
+
+    return re.compile(pattern)
+
+
+_matcher: Optional[re.Pattern] = None
+
+
+def get_matcher() -> re.Pattern:
+    """
+    Return the process-wide matcher, building (or loading) it on first use.
+    """
+    global _matcher
+    if _matcher is None:
+        _matcher = build_matcher()
+
+    return _matcher
+
+
+@traced("is_clean")
 def is_clean(text: str) -> bool:
     """
     Returns True if text is clean (no profanity detected).
     """
-    return not profanity.contains_profanity(text)
+    return get_matcher().search(normalize_for_matching(text)) is None
+
+
+def is_clean_many(texts: Iterable[str]) -> List[bool]:
+    """
+    `is_clean` for a batch of texts (e.g. moderation backfills), in input order.
+    """
+    search = get_matcher().search
+    return [search(normalize_for_matching(t)) is None for t in texts]
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from chatbot.ingestion import iter_book_summaries
+from chatbot.text_utils import tokenize
+
+
+# The catalogue (ingestion source) and optional full Romanian summaries keyed by the same
+# titles; a localized summary replaces the catalogue one when both exist.
+SOURCE_PATH = "data/book_summaries.txt"
+LOCALIZED_PATH = "data/book_summaries_ro.txt"
+
+STORE_PATH = "db/summary_store.sqlite3"
+STORE_VERSION = 1
+BUILD_BATCH_SIZE = 10_000
+
+# Fuzzy lookup: every title key is indexed with all of its one-character deletions
+# (hashed to 64-bit integers), so a key within one edit or transposition of a title
+# shares a variant with it. Shorter keys only match exactly.
+FUZZY_MIN_LENGTH = 5
+FUZZY_CANDIDATES = 200
+
+ARTICLES = {"the", "a", "an"}
+
+_SCHEMA = (
+    "CREATE TABLE books (id INTEGER PRIMARY KEY, book_id TEXT NOT NULL, title TEXT NOT NULL, summary TEXT NOT NULL)",
+    "CREATE TABLE title_keys (key TEXT NOT NULL, book INTEGER NOT NULL, PRIMARY KEY (key, book)) WITHOUT ROWID",
+    "CREATE TABLE variants (hash INTEGER NOT NULL, book INTEGER NOT NULL, PRIMARY KEY (hash, book)) WITHOUT ROWID",
+    "CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+
+
+def title_key(title: str) -> str:
+    """
+    Lookup key of a title: casefolded, diacritics and punctuation removed, words single-spaced.
+    """
+    return " ".join(tokenize(title))
+
+
+def _title_keys(title: str) -> List[str]:
+    key = title_key(title)
+    words = key.split(" ")
+    if len(words) > 1 and words[0] in ARTICLES:
+        return [key, " ".join(words[1:])]
+    return [key] if key else []
+
+
+def _variant_hashes(key: str) -> List[int]:
+    """
+    Hashes of `key` and of every string obtained by deleting one of its characters.
+    """
+    variants = {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+    return [
+        int.from_bytes(hashlib.blake2b(v.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+        for v in variants
+    ]
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance between `a` and `b`, or `max_distance + 1` once it is exceeded.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def _signature(paths: Iterable[str]) -> str:
+    files = []
+    for path in paths:
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            files.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    return json.dumps([STORE_VERSION, files])
+
+
+def build_store(source: str = SOURCE_PATH, path: str = STORE_PATH,
+                localized: Optional[str] = LOCALIZED_PATH) -> None:
+    """
+    Generate the summary store from the catalogue file (and the localized summaries, if present).
+
+    Records are streamed in batches of `BUILD_BATCH_SIZE`, so memory stays flat for
+    large catalogues. The database is written to a temporary file and moved into
+    place, so readers never see a partial store.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Per process: API workers warming up at the same time each build their own copy,
+    # and the last `os.replace` wins (every copy is complete)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+        def _flush(books, keys, variants):
+            conn.executemany("INSERT INTO books (id, book_id, title, summary) VALUES (?, ?, ?, ?)", books)
+            conn.executemany("INSERT OR IGNORE INTO title_keys (key, book) VALUES (?, ?)", keys)
+            conn.executemany("INSERT OR IGNORE INTO variants (hash, book) VALUES (?, ?)", variants)
+            books.clear()
+            keys.clear()
+            variants.clear()
+
+        books, keys, variants = [], [], []
+        for row, (rid, summary, metadata) in enumerate(iter_book_summaries(source), start=1):
+            title = metadata["title"]
+            books.append((row, rid, title, summary))
+            title_keys = _title_keys(title)
+            keys.extend((key, row) for key in title_keys)
+            if title_keys and len(title_keys[0]) >= FUZZY_MIN_LENGTH:
+                variants.extend((h, row) for h in _variant_hashes(title_keys[0]))
+            if len(books) >= BUILD_BATCH_SIZE:
+                _flush(books, keys, variants)
+        _flush(books, keys, variants)
+
+        if localized and os.path.exists(localized):
+            conn.executemany(
+                "UPDATE books SET summary = ? WHERE id IN (SELECT book FROM title_keys WHERE key = ?)",
+                ((summary, title_key(metadata["title"])) for _, summary, metadata in iter_book_summaries(localized)),
+            )
+
+        conn.execute("INSERT INTO meta (name, value) VALUES ('signature', ?)", (_signature([source, localized]),))
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+
+    os.replace(tmp_path, path)
+
+
+class SummaryStore:
+    """
+    Read-only, lazily opened view of the summary store built by `build_store`.
+
+    Lookups never load the catalogue into memory: an exact (normalized) title is
+    one index seek; otherwise the query's one-deletion variants are looked up in
+    the variant index and the candidates are compared by edit distance.
+
+    Args:
+        path: SQLite file written by `build_store`.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def signature(self) -> Optional[str]:
+        """
+        Version and source-file fingerprint the store was built from (None if unreadable).
+        """
+        try:
+            with self._lock:
+                row = self._db().execute("SELECT value FROM meta WHERE name = 'signature'").fetchone()
+        except sqlite3.DatabaseError:
+            return None
+        return row[0] if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def _exact(self, db: sqlite3.Connection, keys: List[str]) -> Optional[int]:
+        for key in keys:
+            rows = db.execute("SELECT book FROM title_keys WHERE key = ? LIMIT 2", (key,)).fetchall()
+            # A key shared by two books (e.g. after dropping "The") is ambiguous
+            if len(rows) == 1:
+                return rows[0][0]
+        return None
+
+    def _fuzzy(self, db: sqlite3.Connection, key: str) -> Optional[int]:
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None
+        hashes = _variant_hashes(key)
+        candidates = db.execute(
+            f"SELECT DISTINCT book FROM variants WHERE hash IN ({','.join('?' * len(hashes))}) LIMIT ?",
+            (*hashes, FUZZY_CANDIDATES),
+        ).fetchall()
+
+        # Shared variants only nominate candidates; the edit distance decides
+        best, best_distance = None, 3
+        for (book,) in candidates:
+            (title,) = db.execute("SELECT title FROM books WHERE id = ?", (book,)).fetchone()
+            for candidate in _title_keys(title):
+                distance = edit_distance(key, candidate, 2)
+                if distance < best_distance:
+                    best, best_distance = book, distance
+        return best
+
+    def find(self, title: str) -> Optional[Tuple[str, str]]:
+        """
+        Look up a book by title, tolerating case, diacritics, punctuation and a typo.
+
+        A typo is one inserted, deleted or replaced character or two swapped
+        characters, in titles of at least `FUZZY_MIN_LENGTH` characters.
+
+        Returns:
+            `(catalogue title, summary)`, or None if no book matches.
+        """
+        keys = _title_keys(title)
+        if not keys:
+            return None
+
+        with self._lock:
+            db = self._db()
+            book = self._exact(db, keys)
+            if book is None:
+                book = self._fuzzy(db, keys[0])
+            if book is None:
+                return None
+            row = db.execute("SELECT title, summary FROM books WHERE id = ?", (book,)).fetchone()
+
+        return (row[0], row[1]) if row else None
+
+
+_store: Optional[SummaryStore] = None
+_store_lock = threading.Lock()
+
+
+def ensure_store(source: str = SOURCE_PATH, path: str = STORE_PATH,
+                 localized: Optional[str] = LOCALIZED_PATH) -> SummaryStore:
+    """
+    Return the process-wide store, (re)building it if it is missing or its source files changed.
+    """
+    global _store
+    with _store_lock:
+        expected = _signature([source, localized])
+        if _store is not None and _store.path == path:
+            if _store.signature() == expected:
+                return _store
+            _store.close()
+
+        store = SummaryStore(path) if os.path.exists(path) else None
+        if store is None or store.signature() != expected:
+            if store is not None:
+                store.close()
+            build_store(source, path, localized)
+            store = SummaryStore(path)
+
+        _store = store
+        return _store
+
+
+def get_store() -> SummaryStore:
+    """
+    Return the process-wide store, opening (or building) it on first use.
+    """
+    if _store is None:
+        return ensure_store()
+    return _store
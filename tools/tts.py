@@ -0,0 +1,315 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from chatbot.tracing import span
+
+
+# Synthesized WAVs are cached by content hash; each session also gets one stable file
+# pointing at its latest audio, so sessions never overwrite each other's playback.
+CACHE_DIR = "outputs/audio/cache"
+SESSIONS_DIR = "outputs/audio/sessions"
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Session files not replayed or replaced for this long are deleted (sessions that were never reset)
+SESSION_MAX_AGE = 24 * 3600
+
+TTS_RATE = 170
+# Optional pyttsx3 voice id (e.g. a Romanian voice installed on the OS)
+TTS_VOICE = os.getenv("SMART_LIBRARIAN_TTS_VOICE")
+
+# pyttsx3 engine of a worker process, created once by `_init_worker`
+_engine = None
+
+
+def _init_worker(rate: int, voice: Optional[str]) -> None:
+    global _engine
+    import pyttsx3
+
+    _engine = pyttsx3.init()
+    _engine.setProperty("rate", rate)
+    if voice:
+        _engine.setProperty("voice", voice)
+
+
+def _synthesize_to_file(text: str, path: str) -> str:
+    # Runs in a worker process; the WAV is written under a temporary name and moved into place
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part.wav")
+    os.close(fd)
+    try:
+        _engine.save_to_file(text, tmp_path)
+        _engine.runAndWait()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def _speak(text: str) -> None:
+    # Runs in a worker process
+    _engine.say(text)
+    _engine.runAndWait()
+
+
+def _ready() -> bool:
+    # Runs in a worker process, once `_init_worker` has created the engine
+    return _engine is not None
+
+
+def audio_cache_key(text: str, rate: int = TTS_RATE, voice: Optional[str] = TTS_VOICE) -> str:
+    """
+    Content hash identifying the audio of `text` with the given rate and voice.
+    """
+    payload = f"{rate}\x00{voice or ''}\x00{text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+def audio_path_for(text: str, rate: int = TTS_RATE, voice: Optional[str] = TTS_VOICE) -> str:
+    """
+    Cache path of the WAV for `text`.
+    """
+    return os.path.join(CACHE_DIR, f"{audio_cache_key(text, rate, voice)}.wav")
+
+
+class TTSJobQueue:
+    """
+    Non-blocking text-to-speech on a pool of worker processes with warm pyttsx3 engines.
+
+    - Each worker process initializes its engine once; later jobs reuse it.
+    - `submit` returns a job ID immediately. Audio already in the content-hash cache
+      completes instantly, and identical texts in flight share one synthesis.
+    - With a `session_id`, the finished audio is also linked to
+      `SESSIONS_DIR/<session_id>.wav`, which stays playable even if the cache entry
+      is evicted later.
+    - The cache is trimmed to `max_bytes`, least recently used first; session files
+      untouched for `session_max_age` seconds are deleted.
+    - `status` is a cheap, non-blocking poll.
+
+    Workers are started lazily, on the first synthesis.
+
+    Args:
+        max_workers: Worker processes (engines).
+        max_bytes: Size bound of the audio cache.
+        max_jobs: Finished jobs kept for polling (oldest are forgotten first).
+        session_max_age: Seconds after which an untouched session file is deleted.
+    """
+
+    def __init__(self, max_workers: int = 1, max_bytes: int = CACHE_MAX_BYTES, max_jobs: int = 1000,
+                 rate: int = TTS_RATE, voice: Optional[str] = TTS_VOICE,
+                 session_max_age: float = SESSION_MAX_AGE):
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.max_jobs = max_jobs
+        self.session_max_age = session_max_age
+        self.rate = rate
+        self.voice = voice
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Caller holds the lock. "spawn" keeps workers independent of the parent's threads.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.rate, self.voice),
+            )
+        return self._pool
+
+    def submit(self, text: str, session_id: Optional[str] = None) -> str:
+        """
+        Queue the synthesis of `text` to a WAV file and return its job ID.
+
+        Raises:
+            ValueError: If `text` is empty.
+        """
+        if not text or not text.strip():
+            raise ValueError("Nu am un text pentru redare audio.")
+
+        path = audio_path_for(text, self.rate, self.voice)
+        with span("tts", cache_hit=os.path.exists(path)), self._lock:
+            job_id = uuid.uuid4().hex
+            job = {"id": job_id, "status": "queued", "path": None, "error": None, "session": session_id}
+            self._jobs[job_id] = job
+            self._trim()
+
+            if path in self._inflight:
+                job["status"] = "running"
+                self._inflight[path].append(job_id)
+                return job_id
+
+            if os.path.exists(path):
+                os.utime(path)
+                job.update(status="done", path=self._publish(path, session_id))
+                return job_id
+
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self._inflight[path] = [job_id]
+            job["status"] = "running"
+            try:
+                future = self._executor().submit(_synthesize_to_file, text, path)
+            except (BrokenProcessPool, RuntimeError) as e:
+                # Broken or shut-down pool: fail this job instead of leaving it "running",
+                # and start fresh workers on the next request
+                self._pool = None
+                self._inflight.pop(path)
+                job.update(status="error", error=str(e))
+                return job_id
+
+        future.add_done_callback(lambda f: self._finish(path, f))
+        return job_id
+
+    def speak(self, text: str) -> None:
+        """
+        Read `text` aloud on a worker engine, without waiting for it to finish.
+
+        A failure (e.g. no speech driver) is printed once the job ends.
+        """
+        if not text or not text.strip():
+            return
+        with self._lock:
+            future = self._executor().submit(_speak, text)
+        future.add_done_callback(self._spoken)
+
+    def warm(self) -> None:
+        """
+        Start the worker engines now instead of on the first request (blocks until they are up).
+
+        Raises:
+            BrokenProcessPool: If the engines cannot start (pyttsx3 or the speech driver is missing).
+        """
+        with self._lock:
+            pool = self._executor()
+        try:
+            for future in [pool.submit(_ready) for _ in range(self.max_workers)]:
+                future.result()
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+            raise
+
+    def _finish(self, path: str, future) -> None:
+        error = future.exception()
+        with self._lock:
+            if isinstance(error, BrokenProcessPool):
+                # e.g. pyttsx3 failed to start; start fresh workers on the next request
+                self._pool = None
+            for job_id in self._inflight.pop(path, []):
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if error is not None:
+                    job.update(status="error", error=str(error))
+                else:
+                    job.update(status="done", path=self._publish(path, job["session"]))
+            self._evict(keep=path)
+
+    def _spoken(self, future) -> None:
+        error = future.exception()
+        if error is None:
+            return
+        if isinstance(error, BrokenProcessPool):
+            # as in `_finish`: start fresh workers on the next request
+            with self._lock:
+                self._pool = None
+        print(f"\nEroare redare audio: {error}")
+
+    def _publish(self, path: str, session_id: Optional[str]) -> str:
+        # Link the cached WAV to the session's own file and return the file to play
+        if not session_id:
+            return path
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+        target = os.path.join(SESSIONS_DIR, f"{session_id}.wav")
+        tmp_path = f"{target}.{uuid.uuid4().hex}.part"
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                dst.write(src.read())
+        os.replace(tmp_path, target)
+        os.utime(target)
+        self._prune_sessions(keep=target)
+        return target
+
+    def _prune_sessions(self, keep: str) -> None:
+        # Delete session files untouched for `session_max_age` seconds, sparing `keep`
+        # (caller holds the lock)
+        cutoff = time.time() - self.session_max_age
+        for entry in os.scandir(SESSIONS_DIR):
+            if entry.path == keep or not entry.name.endswith(".wav"):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # released meanwhile (`release_session`)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        # Delete least recently used cache entries beyond `max_bytes`, sparing `keep`
+        # (the newest file) and in-flight ones (caller holds the lock)
+        try:
+            entries = [
+                e for e in os.scandir(CACHE_DIR)
+                if e.name.endswith(".wav") and not e.name.endswith(".part.wav") and e.is_file()
+            ]
+        except FileNotFoundError:
+            return
+        stats = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries))
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in stats:
+            if total <= self.max_bytes:
+                break
+            if path == keep or path in self._inflight:
+                continue
+            os.remove(path)
+            total -= size
+
+    def _trim(self) -> None:
+        # Forget the oldest finished jobs beyond `max_jobs` (caller holds the lock)
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["status"] in ("done", "error"):
+                del self._jobs[job_id]
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Snapshot of a job: {"id", "status", "path", "error"}, or None if unknown.
+
+        `status` is one of "queued", "running", "done" or "error".
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            return {key: job[key] for key in ("id", "status", "path", "error")}
+
+    def release_session(self, session_id: str) -> None:
+        """
+        Delete the per-session audio file of `session_id` (e.g. when the chat is reset).
+        """
+        path = os.path.join(SESSIONS_DIR, f"{session_id}.wav")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+# Shared queue used by the CLI and the Streamlit app
+tts_queue = TTSJobQueue(max_workers=1)